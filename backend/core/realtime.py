@@ -98,7 +98,12 @@ def emit_refresh_sync(user_id: int):
         traceback.print_exc()
 
 
-def _emit_event_from_sync(event: str, data: dict, room: str):
+def emit_broadcast_sync(event: str, data: dict):
+    """Emit event to every connected socket (thread-safe)."""
+    _emit_event_from_sync(event, data, None)
+
+
+def _emit_event_from_sync(event: str, data: dict, room: str | None):
     """Bridge to emit Socket.IO events from sync context."""
     global _event_loop
 
@@ -65,6 +65,37 @@ try:
 except Exception as e:
     print(f"⚠️  Erro ao migrar historico_status: {e}")
 
+# Adicionar colunas de prazo de SLA na tabela chamado
+try:
+    from ti.scripts.add_sla_deadline_columns import add_sla_deadline_columns
+    add_sla_deadline_columns()
+except Exception as e:
+    print(f"⚠️  Erro ao adicionar colunas de prazo de SLA: {e}")
+
+# Criar e popular (se vazia) a tabela de agregado diário de chamados
+try:
+    from ti.scripts.create_chamado_rollup_table import create_chamado_rollup_table, backfill_chamado_rollup
+    create_chamado_rollup_table()
+    backfill_chamado_rollup(somente_se_vazia=True)
+except Exception as e:
+    print(f"⚠️  Erro ao preparar agregado diário de chamados: {e}")
+
+# Criar e popular (se vazia) a tabela de percentis semanais de SLA
+try:
+    from ti.scripts.create_sla_percentiles_table import create_sla_percentiles_table, backfill_sla_percentiles
+    create_sla_percentiles_table()
+    backfill_sla_percentiles(somente_se_vazia=True)
+except Exception as e:
+    print(f"⚠️  Erro ao preparar percentis semanais de SLA: {e}")
+
+# Criar e popular (se vazia) a tabela do cubo de cumprimento de SLA
+try:
+    from ti.scripts.create_sla_compliance_cube_table import create_sla_compliance_cube_table, backfill_sla_compliance_cube
+    create_sla_compliance_cube_table()
+    backfill_sla_compliance_cube(somente_se_vazia=True)
+except Exception as e:
+    print(f"⚠️  Erro ao preparar cubo de cumprimento de SLA: {e}")
+
 # Criar tabela de configurações de notificações na inicialização
 try:
     from ti.scripts.setup_notification_settings import create_notification_settings_table
@@ -174,6 +205,14 @@ async def log_auth_requests(request: Request, call_next):
         print(f"[MIDDLEWARE] ❌ Exception occurred: {type(e).__name__}: {str(e)}")
         raise
 
+# Cache por requisição dos horários comerciais de SLA
+@_http.middleware("http")
+async def sla_business_hours_scope(request: Request, call_next):
+    from ti.services.sla_calendar import BusinessHoursSnapshot
+
+    with BusinessHoursSnapshot.request_scope():
+        return await call_next(request)
+
 @_http.get("/api/ping")
 def ping():
     return {"message": "pong"}
@@ -494,3 +533,36 @@ async def startup_event():
         print(f"[STARTUP] ✓ Event loop registered for Socket.IO: {loop}")
     except Exception as e:
         print(f"[STARTUP] ⚠️  Failed to register event loop: {e}")
+
+    # Produtor do snapshot de métricas: depende do loop registrado acima
+    # para enviar "metrics:updated" pelo Socket.IO
+    try:
+        from ti.services.metrics_snapshot import MetricsSnapshot
+        MetricsSnapshot.start()
+    except Exception as e:
+        print(f"[STARTUP] ⚠️  Failed to start metrics snapshot producer: {e}")
+
+    # Invalidações de cache entre workers (memória local de cada processo)
+    try:
+        from ti.services.cache_invalidation_bus import CacheInvalidationBus
+        import ti.services.sla_cache  # registra o handler do SLACacheManager
+        import ti.services.cache_debouncer  # registra o handler do debouncer
+        CacheInvalidationBus.start()
+    except Exception as e:
+        print(f"[STARTUP] ⚠️  Failed to start cache invalidation bus: {e}")
+
+
+@_http.on_event("shutdown")
+def shutdown_event():
+    """Grava a fila do write-behind do cache e envia as invalidações pendentes"""
+    try:
+        from ti.services.sla_cache import SLACacheManager
+        SLACacheManager.flush()
+    except Exception as e:
+        print(f"[SHUTDOWN] ⚠️  Failed to flush SLA cache write-behind queue: {e}")
+
+    try:
+        from ti.services.cache_invalidation_bus import CacheInvalidationBus
+        CacheInvalidationBus.stop()
+    except Exception as e:
+        print(f"[SHUTDOWN] ⚠️  Failed to stop cache invalidation bus: {e}")
@@ -62,9 +62,10 @@ EXPECTED: Dict[str, Dict[str, str]] = {
     "metrics_cache_db": {
         "id": "INT PRIMARY KEY AUTO_INCREMENT",
         "cache_key": "VARCHAR(100) NOT NULL UNIQUE KEY",
-        "cache_value": "TEXT NOT NULL",
+        "cache_value": "MEDIUMBLOB NOT NULL",
         "calculated_at": "DATETIME NULL",
         "expires_at": "DATETIME NULL",
+        "tags": "TEXT NULL",
     },
 }
 
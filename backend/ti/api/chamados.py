@@ -1,5 +1,5 @@
 from __future__ import annotations
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Body
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Body, Request
 from sqlalchemy.orm import Session
 from sqlalchemy import and_
 from core.db import get_db, engine
@@ -10,9 +10,20 @@ from ti.schemas.chamado import (
     ChamadoDeleteRequest,
     ALLOWED_STATUSES,
 )
-from ti.services.chamados import criar_chamado as service_criar
+from ti.services.chamados import (
+    criar_chamado as service_criar,
+    registrar_rollup,
+    registrar_percentis,
+    registrar_cubo_sla,
+)
+from ti.services.chamado_rollup import ChamadoRollup
+from ti.services.sla_percentiles import SLAPercentiles
+from ti.services.sla_compliance_cube import SLAComplianceCube
+from ti.services.data_version import DataVersion
 from ti.services.sla import SLACalculator
 from ti.services.sla_cache import SLACacheManager
+from ti.services.sla_clock import SLAClock
+from ti.services.sla_deadlines import SLADeadlines
 from ti.models.sla_config import HistoricoSLA
 from core.realtime import sio
 from werkzeug.security import check_password_hash
@@ -88,7 +99,9 @@ def _sincronizar_sla(db: Session, chamado: Chamado, status_anterior: str | None
         db.commit()
 
         # INVALIDA��ÃO DE CACHE: Quando um chamado é atualizado, invalida caches relacionados
-        SLACacheManager.invalidate_by_chamado(db, chamado.id)
+        # (atributos de antes e depois da mudança de status)
+        anterior = SLACacheManager.chamado_tags(chamado, status=status_anterior) if status_anterior else None
+        SLACacheManager.invalidate_by_chamado(db, chamado.id, anterior=anterior)
 
         # ATUALIZAÇÃO INCREMENTAL DE MÉTRICAS: Recalcula apenas o chamado afetado
         from ti.services.cache_manager_incremental import IncrementalMetricsCache
@@ -100,6 +113,18 @@ def _sincronizar_sla(db: Session, chamado: Chamado, status_anterior: str | None
         pass
 
 
+def _iniciar_sla(db: Session, chamado: Chamado) -> None:
+    """Cria o relógio de SLA e calcula os prazos de um chamado recém-aberto"""
+    try:
+        SLAClock.inicializar(db, chamado)
+        db.flush()
+        SLADeadlines.atualizar(db, chamado)
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        print(f"[SLA CLOCK] Erro ao iniciar relógio/prazos do chamado {chamado.id}: {e}")
+
+
 def _normalize_status(s: str) -> str:
     """
     Normaliza o status para o formato padrão.
@@ -154,7 +179,14 @@ def _table_exists(table_name: str) -> bool:
 
 
 @router.get("", response_model=list[ChamadoOut])
-def listar_chamados(db: Session = Depends(get_db)):
+def listar_chamados(request: Request, response: Response, db: Session = Depends(get_db)):
+    # Sem escrita em chamados desde o último poll: 304 sem consultar o banco
+    etag = DataVersion.etag("chamados")
+    not_modified = DataVersion.not_modified(request, etag)
+    if not_modified is not None:
+        return not_modified
+    response.headers.update(DataVersion.headers(etag))
+
     try:
         try:
             Chamado.__table__.create(bind=engine, checkfirst=True)
@@ -168,6 +200,33 @@ def listar_chamados(db: Session = Depends(get_db)):
         raise HTTPException(status_code=500, detail=f"Erro ao listar chamados: {e}")
 
 
+def _contribuicao_rollup(db: Session, chamado: Chamado):
+    """Contribuição do chamado ao agregado diário antes de uma alteração (None se falhar)"""
+    try:
+        return ChamadoRollup.contribuicao(db, chamado)
+    except Exception as e:
+        print(f"[ROLLUP] Erro ao ler contribuição do chamado {chamado.id}: {e}")
+        return None
+
+
+def _contribuicao_percentis(db: Session, chamado: Chamado):
+    """Contribuição do chamado aos percentis semanais antes de uma alteração (False se falhar)"""
+    try:
+        return SLAPercentiles.anterior(db, chamado)
+    except Exception as e:
+        print(f"[SLA PERCENTIS] Erro ao ler contribuição do chamado {chamado.id}: {e}")
+        return False
+
+
+def _contribuicao_cubo_sla(db: Session, chamado: Chamado):
+    """Contribuição do chamado ao cubo de cumprimento de SLA antes de uma alteração (False se falhar)"""
+    try:
+        return SLAComplianceCube.anterior(db, chamado)
+    except Exception as e:
+        print(f"[SLA CUBO] Erro ao ler contribuição do chamado {chamado.id}: {e}")
+        return False
+
+
 @router.post("", response_model=ChamadoOut)
 def criar_chamado(payload: ChamadoCreate, db: Session = Depends(get_db)):
     try:
@@ -177,12 +236,13 @@ def criar_chamado(payload: ChamadoCreate, db: Session = Depends(get_db)):
             pass
         ch = service_criar(db, payload)
 
-        # Sincroniza o chamado com a tabela de SLA
+        # Inicia relógio/prazos de SLA e sincroniza o chamado com a tabela de SLA
+        _iniciar_sla(db, ch)
         _sincronizar_sla(db, ch)
 
         # ATUALIZAÇÃO REAL-TIME: Incrementa contador de "chamados hoje"
         from ti.services.cache_manager_incremental import ChamadosTodayCounter
-        chamados_hoje = ChamadosTodayCounter.increment(db)
+        ChamadosTodayCounter.increment(db)
 
         try:
             Notification.__table__.create(bind=engine, checkfirst=True)
@@ -218,14 +278,6 @@ def criar_chamado(payload: ChamadoCreate, db: Session = Depends(get_db)):
                 "lido": n.lido,
                 "criado_em": n.criado_em.isoformat() if n.criado_em else None,
             })
-            # EMITE ATUALIZAÇÃO DE MÉTRICAS EM TEMPO REAL
-            from ti.services.cache_manager_incremental import IncrementalMetricsCache
-            metricas = IncrementalMetricsCache.get_metrics(db)
-            anyio.from_thread.run(sio.emit, "metrics:updated", {
-                "chamados_hoje": chamados_hoje,
-                "sla_metrics": metricas,
-                "timestamp": now_brazil_naive().isoformat(),
-            })
         except Exception as e:
             print(f"[WebSocket] Erro ao emitir eventos: {e}")
             pass
@@ -345,7 +397,8 @@ def criar_chamado_com_anexos(
         )
         ch = service_criar(db, payload)
 
-        # Sincroniza o chamado com a tabela de SLA
+        # Inicia relógio/prazos de SLA e sincroniza o chamado com a tabela de SLA
+        _iniciar_sla(db, ch)
         _sincronizar_sla(db, ch)
 
         if files:
@@ -447,20 +500,6 @@ def criar_chamado_com_anexos(
             # Mesmo com erro, continue com o resto da operação
             pass
 
-        # EMITE ATUALIZAÇÃO DE MÉTRICAS EM TEMPO REAL (sem dependência de db após refresh)
-        try:
-            from ti.services.cache_manager_incremental import IncrementalMetricsCache
-            metricas = IncrementalMetricsCache.get_metrics(db)
-            import anyio
-            anyio.from_thread.run(sio.emit, "metrics:updated", {
-                "chamados_hoje": 1,
-                "sla_metrics": metricas,
-                "timestamp": now_brazil_naive().isoformat(),
-            })
-        except Exception as e:
-            print(f"[WebSocket] Erro ao emitir eventos de métricas: {e}")
-            pass
-
         return ch
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erro ao criar chamado com anexos: {e}")
@@ -734,11 +773,31 @@ def atualizar_status(chamado_id: int, payload: ChamadoStatusUpdate, db: Session
         if not ch:
             raise HTTPException(status_code=404, detail="Chamado não encontrado")
         prev = ch.status or "Aberto"
+        rollup_anterior = _contribuicao_rollup(db, ch)
+        percentis_anterior = _contribuicao_percentis(db, ch)
+        cubo_anterior = _contribuicao_cubo_sla(db, ch)
         ch.status = novo
         if prev == "Aberto" and novo != "Aberto" and ch.data_primeira_resposta is None:
             ch.data_primeira_resposta = now_brazil_naive()
         if novo == "Concluído":
             ch.data_conclusao = now_brazil_naive()
+        if novo != prev:
+            # Avança o relógio e recalcula os prazos de SLA na mesma transação
+            # da mudança de status (ao sair de uma pausa o prazo é empurrado).
+            # Savepoint: falha não bloqueia o chamado
+            try:
+                with db.begin_nested():
+                    SLAClock.registrar_transicao(db, ch, prev)
+                    db.flush()
+                    SLADeadlines.atualizar(db, ch)
+            except Exception as e:
+                print(f"[SLA CLOCK] Erro ao registrar transição do chamado {ch.id}: {e}")
+            if rollup_anterior is not None:
+                registrar_rollup(db, rollup_anterior, ch)
+            if percentis_anterior is not False:
+                registrar_percentis(db, percentis_anterior, ch)
+            if cubo_anterior is not False:
+                registrar_cubo_sla(db, cubo_anterior, ch)
         db.add(ch)
         db.commit()  # garante persistência do status antes dos logs
         db.refresh(ch)
@@ -830,14 +889,6 @@ def atualizar_status(chamado_id: int, payload: ChamadoStatusUpdate, db: Session
                 "lido": n.lido,
                 "criado_em": n.criado_em.isoformat() if n.criado_em else None,
             })
-
-            # EMITE ATUALIZAÇÃO DE MÉTRICAS EM TEMPO REAL (quando status muda)
-            from ti.services.cache_manager_incremental import IncrementalMetricsCache
-            metricas = IncrementalMetricsCache.get_metrics(db)
-            anyio.from_thread.run(sio.emit, "metrics:updated", {
-                "sla_metrics": metricas,
-                "timestamp": now_brazil_naive().isoformat(),
-            })
         except Exception:
             db.rollback()
             pass
@@ -949,7 +1000,16 @@ def deletar_chamado(chamado_id: int, payload: ChamadoDeleteRequest = Body(...),
 
         # Soft delete: marcar como deletado
         agora = now_brazil_naive()
+        rollup_anterior = _contribuicao_rollup(db, ch)
+        percentis_anterior = _contribuicao_percentis(db, ch)
+        cubo_anterior = _contribuicao_cubo_sla(db, ch)
         ch.deletado_em = agora
+        if rollup_anterior is not None:
+            registrar_rollup(db, rollup_anterior, ch)
+        if percentis_anterior is not False:
+            registrar_percentis(db, percentis_anterior, ch)
+        if cubo_anterior is not False:
+            registrar_cubo_sla(db, cubo_anterior, ch)
         db.add(ch)
         db.commit()
         db.refresh(ch)
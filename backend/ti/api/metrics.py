@@ -1,30 +1,87 @@
-from fastapi import APIRouter, Depends
+from datetime import datetime, timedelta
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from sqlalchemy.orm import Session
 from core.db import get_db
 from core.utils import now_brazil_naive
 from ti.services.metrics import MetricsCalculator
+from ti.services.data_version import DataVersion
+from ti.services.metrics_snapshot import MetricsSnapshot
+from ti.services.dashboard_history import DashboardHistory
 
 router = APIRouter(prefix="/api", tags=["metrics"])
 
+# Timeout (segundos) de cada seção do dashboard consolidado
+DASHBOARD_SECTION_TIMEOUTS = {
+    "realtime": 5.0,
+    "sla": 20.0,
+    "performance": 15.0,
+}
+
+# Janela (segundos) somada ao ETag dos endpoints cujo valor muda com o relógio
+REALTIME_ETAG_TTL = 30
+SLA_ETAG_TTL = 60
+
+
+def _com_estado(secao: dict) -> dict:
+    """Valor da seção com stale/calculado_em (clientes sabem se o dado é do último cálculo)"""
+    return {**secao["valor"], "stale": secao["stale"], "calculado_em": secao["calculado_em"]}
+
+
+def _calculado_agora(valor: dict) -> dict:
+    return {**valor, "stale": False, "calculado_em": now_brazil_naive().isoformat()}
+
+
+def _calcular_realtime(db: Session) -> dict:
+    return {
+        "chamados_hoje": MetricsCalculator.get_chamados_abertos_hoje(db),
+        "comparacao_ontem": MetricsCalculator.get_comparacao_ontem(db),
+        "abertos_agora": MetricsCalculator.get_abertos_agora(db),
+        "timestamp": now_brazil_naive().isoformat(),
+    }
+
 
 @router.get("/metrics/realtime")
-def get_realtime_metrics(db: Session = Depends(get_db)):
+def get_realtime_metrics(
+    db: Session = Depends(get_db),
+    request: Request = None,
+    response: Response = None,
+):
     """
-    Retorna métricas instantâneas (sem cache, sem cálculos pesados).
+    Retorna métricas instantâneas (snapshot do produtor em background ou,
+    sem snapshot recente, cálculo direto).
 
     Endpoint consolidado para dados rápidos:
     - chamados_hoje: Quantidade de chamados abertos hoje
     - comparacao_ontem: Comparação com ontem
     - abertos_agora: Quantidade de chamados ativos
     - timestamp: Momento do cálculo
+    - stale / calculado_em: valor do último cálculo (timeout, erro ou dados
+      alterados depois do snapshot) e quando foi calculado
+
+    Suporta If-None-Match: sem escrita desde o último poll, responde 304
+    sem consultar o banco.
     """
+    # Com snapshot, o ETag é o da versão do snapshot (o corpo vem dele, que
+    # pode estar alguns segundos atrás da versão dos dados)
+    versionada = MetricsSnapshot.secao_versionada("realtime")
+    if versionada is not None:
+        secao, versao = versionada
+        etag = DataVersion.etag("realtime", versao=versao)
+    else:
+        secao = None
+        etag = DataVersion.etag("realtime", REALTIME_ETAG_TTL)
+    not_modified = DataVersion.not_modified(request, etag)
+    if not_modified is not None:
+        return not_modified
+    if response is not None:
+        response.headers.update(DataVersion.headers(etag))
+
+    # Snapshot do produtor em background: leitura sem custo de banco
+    if secao is not None:
+        return _com_estado(secao)
+
     try:
-        return {
-            "chamados_hoje": MetricsCalculator.get_chamados_abertos_hoje(db),
-            "comparacao_ontem": MetricsCalculator.get_comparacao_ontem(db),
-            "abertos_agora": MetricsCalculator.get_abertos_agora(db),
-            "timestamp": now_brazil_naive().isoformat(),
-        }
+        return _calculado_agora(_calcular_realtime(db))
     except Exception as e:
         print(f"[ERROR] Erro ao calcular métricas em tempo real: {e}")
         import traceback
@@ -46,8 +103,56 @@ def get_basic_metrics(db: Session = Depends(get_db)):
     return get_realtime_metrics(db)
 
 
+def _calcular_sla(db: Session) -> dict:
+    """Métricas de SLA com validação de tipos (lança TypeError/ValueError)"""
+    # Valida tipos esperados com exceções explícitas
+    tempo_resposta_mes, total_chamados_mes = MetricsCalculator.get_tempo_medio_resposta_mes(db)
+    if not isinstance(tempo_resposta_mes, str):
+        raise TypeError(f"tempo_resposta_mes deve ser string, recebido: {type(tempo_resposta_mes)}")
+    if not isinstance(total_chamados_mes, int):
+        raise TypeError(f"total_chamados_mes deve ser int, recebido: {type(total_chamados_mes)}")
+
+    tempo_resposta_24h = MetricsCalculator.get_tempo_medio_resposta_24h(db)
+    if not isinstance(tempo_resposta_24h, str):
+        raise TypeError(f"tempo_resposta_24h deve ser string, recebido: {type(tempo_resposta_24h)}")
+
+    sla_distribution = MetricsCalculator.get_sla_distribution(db)
+    if not isinstance(sla_distribution, dict):
+        raise TypeError(f"sla_distribution deve ser dict, recebido: {type(sla_distribution)}")
+
+    # Valida estrutura de sla_distribution
+    required_keys = {"dentro_sla", "fora_sla", "percentual_dentro", "percentual_fora", "total"}
+    if not required_keys.issubset(sla_distribution.keys()):
+        raise ValueError(f"sla_distribution falta chaves: {required_keys - set(sla_distribution.keys())}")
+
+    sla_24h = MetricsCalculator.get_sla_compliance_24h(db)
+    if not isinstance(sla_24h, int):
+        raise TypeError(f"sla_compliance_24h deve ser int, recebido: {type(sla_24h)}")
+    if not (0 <= sla_24h <= 100):
+        raise ValueError(f"sla_compliance_24h deve estar entre 0-100, recebido: {sla_24h}")
+
+    sla_mes = MetricsCalculator.get_sla_compliance_mes(db)
+    if not isinstance(sla_mes, int):
+        raise TypeError(f"sla_compliance_mes deve ser int, recebido: {type(sla_mes)}")
+    if not (0 <= sla_mes <= 100):
+        raise ValueError(f"sla_compliance_mes deve estar entre 0-100, recebido: {sla_mes}")
+
+    return {
+        "sla_compliance_24h": sla_24h,
+        "sla_compliance_mes": sla_mes,
+        "sla_distribution": sla_distribution,
+        "tempo_resposta_24h": tempo_resposta_24h,
+        "tempo_resposta_mes": tempo_resposta_mes,
+        "total_chamados_mes": total_chamados_mes,
+    }
+
+
 @router.get("/metrics/dashboard/sla")
-def get_sla_metrics(db: Session = Depends(get_db)):
+def get_sla_metrics(
+    db: Session = Depends(get_db),
+    request: Request = None,
+    response: Response = None,
+):
     """
     Retorna métricas de SLA (carrega SEPARADO - mais lento, mas com cache).
 
@@ -58,48 +163,30 @@ def get_sla_metrics(db: Session = Depends(get_db)):
     - tempo_resposta_24h: Tempo médio de primeira resposta 24h
     - tempo_resposta_mes: Tempo médio de primeira resposta mês
     - total_chamados_mes: Total de chamados deste mês
-    """
-    try:
-        # Valida tipos esperados com exceções explícitas
-        tempo_resposta_mes, total_chamados_mes = MetricsCalculator.get_tempo_medio_resposta_mes(db)
-        if not isinstance(tempo_resposta_mes, str):
-            raise TypeError(f"tempo_resposta_mes deve ser string, recebido: {type(tempo_resposta_mes)}")
-        if not isinstance(total_chamados_mes, int):
-            raise TypeError(f"total_chamados_mes deve ser int, recebido: {type(total_chamados_mes)}")
-
-        tempo_resposta_24h = MetricsCalculator.get_tempo_medio_resposta_24h(db)
-        if not isinstance(tempo_resposta_24h, str):
-            raise TypeError(f"tempo_resposta_24h deve ser string, recebido: {type(tempo_resposta_24h)}")
-
-        sla_distribution = MetricsCalculator.get_sla_distribution(db)
-        if not isinstance(sla_distribution, dict):
-            raise TypeError(f"sla_distribution deve ser dict, recebido: {type(sla_distribution)}")
-
-        # Valida estrutura de sla_distribution
-        required_keys = {"dentro_sla", "fora_sla", "percentual_dentro", "percentual_fora", "total"}
-        if not required_keys.issubset(sla_distribution.keys()):
-            raise ValueError(f"sla_distribution falta chaves: {required_keys - set(sla_distribution.keys())}")
+    - stale / calculado_em: como em /metrics/realtime
 
-        sla_24h = MetricsCalculator.get_sla_compliance_24h(db)
-        if not isinstance(sla_24h, int):
-            raise TypeError(f"sla_compliance_24h deve ser int, recebido: {type(sla_24h)}")
-        if not (0 <= sla_24h <= 100):
-            raise ValueError(f"sla_compliance_24h deve estar entre 0-100, recebido: {sla_24h}")
-
-        sla_mes = MetricsCalculator.get_sla_compliance_mes(db)
-        if not isinstance(sla_mes, int):
-            raise TypeError(f"sla_compliance_mes deve ser int, recebido: {type(sla_mes)}")
-        if not (0 <= sla_mes <= 100):
-            raise ValueError(f"sla_compliance_mes deve estar entre 0-100, recebido: {sla_mes}")
+    Suporta If-None-Match (304 sem consultar o banco).
+    """
+    # Com snapshot, o ETag é o da versão do snapshot (o corpo vem dele, que
+    # pode estar alguns segundos atrás da versão dos dados)
+    versionada = MetricsSnapshot.secao_versionada("sla")
+    if versionada is not None:
+        secao, versao = versionada
+        etag = DataVersion.etag("sla", versao=versao)
+    else:
+        secao = None
+        etag = DataVersion.etag("sla", SLA_ETAG_TTL)
+    not_modified = DataVersion.not_modified(request, etag)
+    if not_modified is not None:
+        return not_modified
+    if response is not None:
+        response.headers.update(DataVersion.headers(etag))
+
+    if secao is not None:
+        return _com_estado(secao)
 
-        return {
-            "sla_compliance_24h": sla_24h,
-            "sla_compliance_mes": sla_mes,
-            "sla_distribution": sla_distribution,
-            "tempo_resposta_24h": tempo_resposta_24h,
-            "tempo_resposta_mes": tempo_resposta_mes,
-            "total_chamados_mes": total_chamados_mes,
-        }
+    try:
+        return _calculado_agora(_calcular_sla(db))
     except (TypeError, ValueError) as e:
         # Logging de erro explícito - não mascara
         print(f"[VALIDATION ERROR] Erro ao validar métricas SLA: {e}")
@@ -121,8 +208,38 @@ def get_sla_metrics(db: Session = Depends(get_db)):
         )
 
 
+# Seções do dashboard consolidado (também produzidas em background pelo MetricsSnapshot)
+DASHBOARD_SECTIONS = {
+    "realtime": _calcular_realtime,
+    "sla": _calcular_sla,
+    "performance": MetricsCalculator.get_performance_metrics,
+}
+MetricsSnapshot.configurar(DASHBOARD_SECTIONS, DASHBOARD_SECTION_TIMEOUTS)
+
+
+def _parse_instante(valor: str, campo: str) -> datetime:
+    try:
+        return datetime.fromisoformat(valor)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"{campo} deve estar no formato ISO (YYYY-MM-DDTHH:MM)")
+
+
+def _dashboard_em(db: Session, as_of: str) -> dict:
+    """Dashboard da foto horária mais próxima de as_of, sem recalcular"""
+    instante = _parse_instante(as_of, "as_of")
+    foto = DashboardHistory.em(db, instante)
+    if foto is None:
+        raise HTTPException(status_code=404, detail="Nenhuma foto do dashboard registrada")
+    return {
+        **foto["payload"],
+        "timestamp": foto["capturado_em"],
+        "as_of": instante.isoformat(),
+        "snapshot_hora": foto["hora"],
+    }
+
+
 @router.get("/metrics/dashboard")
-def get_dashboard_metrics(db: Session = Depends(get_db)):
+def get_dashboard_metrics(db: Session = Depends(get_db), as_of: str | None = None):
     """
     Endpoint consolidado: Retorna TODAS as métricas do dashboard administrativo.
 
@@ -143,47 +260,59 @@ def get_dashboard_metrics(db: Session = Depends(get_db)):
     - abertos_agora: Quantidade de chamados ativos
     - tempo_resolucao_30dias: Tempo médio de resolução (30 dias)
     - timestamp: Momento do cálculo
+    - stale / secoes: quais seções vieram do último valor calculado por timeout ou erro
+
+    as_of (ISO): devolve a foto horária gravada mais próxima do instante
+    (campos snapshot_hora e as_of), sem recalcular.
     """
     try:
-        # Obtém todas as métricas
-        realtime = get_realtime_metrics(db)
-        sla = get_sla_metrics(db)
-        performance = MetricsCalculator.get_performance_metrics(db)
-
-        return {
-            # Realtime
-            "chamados_hoje": realtime["chamados_hoje"],
-            "comparacao_ontem": realtime["comparacao_ontem"],
-            "abertos_agora": realtime["abertos_agora"],
-
-            # SLA
-            "sla_compliance_24h": sla["sla_compliance_24h"],
-            "sla_compliance_mes": sla["sla_compliance_mes"],
-            "sla_distribution": sla["sla_distribution"],
-            "tempo_resposta_24h": sla["tempo_resposta_24h"],
-            "tempo_resposta_mes": sla["tempo_resposta_mes"],
-            "total_chamados_mes": sla["total_chamados_mes"],
-
-            # Performance
-            "tempo_resolucao_30dias": performance["tempo_resolucao_medio"],
-            "primeira_resposta_media": performance["primeira_resposta_media"],
-            "taxa_reaberturas": performance["taxa_reaberturas"],
-            "chamados_backlog": performance["chamados_backlog"],
-
-            # Metadata
-            "timestamp": now_brazil_naive().isoformat(),
-        }
+        if as_of:
+            return _dashboard_em(db, as_of)
+
+        # Snapshot do produtor em background; sem ele, seções calculadas em
+        # paralelo, cada uma com sua sessão (seção lenta devolve o último
+        # valor calculado, stale, em vez de travar o dashboard)
+        secoes = MetricsSnapshot.atual()
+        return DashboardHistory.montar_payload(secoes)
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"[ERROR] Erro ao calcular métricas do dashboard: {e}")
         import traceback
         traceback.print_exc()
-        from fastapi import HTTPException
         raise HTTPException(
             status_code=500,
             detail=f"Erro ao calcular métricas do dashboard: {str(e)}"
         )
 
 
+@router.get("/metrics/dashboard/history")
+def get_dashboard_history(
+    campos: str = "sla_compliance_mes,abertos_agora,tempo_resposta_mes,tempo_resolucao_30dias",
+    inicio: str | None = None,
+    fim: str | None = None,
+    db: Session = Depends(get_db),
+):
+    """
+    Série horária de campos do dashboard a partir das fotos gravadas pelo scheduler.
+
+    - campos: lista separada por vírgula; aceita caminho com pontos
+      (ex.: sla_distribution.percentual_dentro)
+    - inicio / fim: ISO (padrão: últimos 7 dias)
+    """
+    agora = now_brazil_naive()
+    data_fim = _parse_instante(fim, "fim") if fim else agora
+    data_inicio = _parse_instante(inicio, "inicio") if inicio else data_fim - timedelta(days=7)
+    lista_campos = [campo.strip() for campo in campos.split(",") if campo.strip()]
+    if not lista_campos:
+        raise HTTPException(status_code=400, detail="Informe ao menos um campo")
+
+    try:
+        return DashboardHistory.serie(db, data_inicio, data_fim, lista_campos)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erro ao obter histórico do dashboard: {e}")
+
+
 @router.get("/metrics/chamados-abertos")
 def get_chamados_abertos(db: Session = Depends(get_db)):
     """
@@ -378,7 +507,7 @@ def get_performance_metrics(db: Session = Depends(get_db)):
         return {
             "tempo_resolucao_medio": "—",
             "primeira_resposta_media": "—",
-            "taxa_reaberturas": "0%",
+            "taxa_reaberturas": "—",
             "chamados_backlog": 0
         }
 
@@ -1,5 +1,5 @@
 from __future__ import annotations
-from fastapi import APIRouter, Depends, HTTPException, Body
+from fastapi import APIRouter, Depends, HTTPException, Body, Query, Request, Response
 from sqlalchemy.orm import Session
 from sqlalchemy import and_, or_
 from core.db import get_db, engine
@@ -19,6 +19,12 @@ from ti.models.sla_config import SLAConfiguration, SLABusinessHours, SLAFeriado,
 from ti.models.chamado import Chamado
 from ti.services.sla import SLACalculator
 from ti.services.sla_cache import SLACacheManager
+from ti.services.sla_calendar import BusinessHoursSnapshot, SLACalendarIndex
+from ti.services.sla_business_hours import HolidayCalendar
+from ti.services.sla_deadlines import SLADeadlines
+from ti.services.sla_compliance_cube import SLAComplianceCube
+from ti.services.sla_config_changes import SLAConfigChanges
+from ti.services.sla_percentiles import SLAPercentiles
 from ti.services.sla_validator import SLAValidator
 from core.utils import now_brazil_naive
 from core.realtime import sio
@@ -83,6 +89,8 @@ def criar_sla_config(payload: SLAConfigurationCreate, db: Session = Depends(get_
             # Atualiza referência no banco para refresh
             config = result.data
             db.refresh(config)
+            # Prioridade passou a ter limites: prazos dos abertos e cubo
+            SLAConfigChanges.aplicar(db, [config.prioridade])
             return config
         else:
             raise HTTPException(status_code=500, detail=result.error)
@@ -137,6 +145,8 @@ def atualizar_sla_config(
         if result.success:
             config = result.data
             db.refresh(config)
+            # Limites mudaram: prazos dos abertos e cubo
+            SLAConfigChanges.aplicar(db, [config.prioridade])
             return config
         else:
             raise HTTPException(status_code=500, detail=result.error)
@@ -159,8 +169,12 @@ def deletar_sla_config(config_id: int, db: Session = Depends(get_db)):
         if not config:
             raise HTTPException(status_code=404, detail="Configuração de SLA não encontrada")
 
+        prioridade = config.prioridade
         db.delete(config)
+        SLACacheManager.invalidate_all_sla(db)
         db.commit()
+        # Prioridade ficou sem limites: limpa os prazos dos abertos e reconstrói o cubo
+        SLAConfigChanges.aplicar(db, [prioridade])
         return {"ok": True}
     except HTTPException:
         raise
@@ -208,6 +222,8 @@ def criar_business_hours(payload: SLABusinessHoursCreate, db: Session = Depends(
         db.add(bh)
         db.commit()
         db.refresh(bh)
+        BusinessHoursSnapshot.invalidate()
+        SLACalendarIndex.invalidate()
         return bh
     except HTTPException:
         raise
@@ -239,6 +255,8 @@ def atualizar_business_hours(
         db.add(bh)
         db.commit()
         db.refresh(bh)
+        BusinessHoursSnapshot.invalidate()
+        SLACalendarIndex.invalidate()
         return bh
     except HTTPException:
         raise
@@ -260,6 +278,8 @@ def deletar_business_hours(bh_id: int, db: Session = Depends(get_db)):
 
         db.delete(bh)
         db.commit()
+        BusinessHoursSnapshot.invalidate()
+        SLACalendarIndex.invalidate()
         return {"ok": True}
     except HTTPException:
         raise
@@ -290,6 +310,60 @@ def obter_sla_status_chamado(chamado_id: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=500, detail=f"Erro ao obter status de SLA: {e}")
 
 
+@router.get("/chamados/status", response_model=dict)
+def obter_sla_status_chamados(ids: str, db: Session = Depends(get_db)):
+    """
+    Status de SLA de vários chamados em uma chamada (ids separados por vírgula).
+
+    Ex.: /sla/chamados/status?ids=1,2,3
+    """
+    try:
+        try:
+            chamado_ids = [int(i) for i in ids.split(",") if i.strip()]
+        except ValueError:
+            raise HTTPException(status_code=400, detail="ids deve ser uma lista de inteiros separados por vírgula")
+
+        if len(chamado_ids) > 500:
+            raise HTTPException(status_code=400, detail="Máximo de 500 chamados por requisição")
+
+        status_por_chamado = SLACalculator.get_sla_status_many(db, chamado_ids)
+        return {
+            "total": len(status_por_chamado),
+            "chamados": {str(chamado_id): status for chamado_id, status in status_por_chamado.items()},
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erro ao obter status de SLA: {e}")
+
+
+@router.get("/prazos/proximos-vencer")
+def listar_prazos_proximos_vencer(horas: float = 2, db: Session = Depends(get_db)):
+    """Chamados abertos cujo prazo de resposta/resolução vence nas próximas `horas`"""
+    try:
+        chamados = SLADeadlines.proximos_a_vencer(db, horas)
+        return {
+            "horas": horas,
+            "total": len(chamados),
+            "chamados": [SLADeadlines.to_dict(c) for c in chamados],
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erro ao listar prazos próximos do vencimento: {e}")
+
+
+@router.get("/prazos/vencidos")
+def listar_prazos_vencidos(db: Session = Depends(get_db)):
+    """Chamados abertos com prazo de resposta/resolução já vencido"""
+    try:
+        chamados = SLADeadlines.vencidos(db)
+        return {
+            "total": len(chamados),
+            "chamados": [SLADeadlines.to_dict(c) for c in chamados],
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erro ao listar prazos vencidos: {e}")
+
+
 @router.get("/historico/{chamado_id}", response_model=list[HistoricoSLAOut])
 def obter_historico_sla(chamado_id: int, db: Session = Depends(get_db)):
     try:
@@ -602,6 +676,8 @@ def obter_stats_cache(db: Session = Depends(get_db)):
     """
     try:
         stats = SLACacheManager.get_stats(db)
+        stats["business_hours"] = BusinessHoursSnapshot.get_stats()
+        stats["calendario"] = SLACalendarIndex.get_stats()
         return stats
     except Exception as e:
         return {
@@ -876,6 +952,8 @@ def criar_feriado(payload: SLAFeriadoCreate, db: Session = Depends(get_db)):
         db.add(feriado)
         db.commit()
         db.refresh(feriado)
+        HolidayCalendar.invalidate()
+        SLACalendarIndex.invalidate()
         return feriado
     except HTTPException:
         raise
@@ -911,6 +989,8 @@ def atualizar_feriado(
         db.add(feriado)
         db.commit()
         db.refresh(feriado)
+        HolidayCalendar.invalidate()
+        SLACalendarIndex.invalidate()
         return feriado
     except HTTPException:
         raise
@@ -933,6 +1013,8 @@ def deletar_feriado(feriado_id: int, db: Session = Depends(get_db)):
 
         db.delete(feriado)
         db.commit()
+        HolidayCalendar.invalidate()
+        SLACalendarIndex.invalidate()
         return {"ok": True}
     except HTTPException:
         raise
@@ -1036,6 +1118,101 @@ def obter_tempo_medio_resolucao(db: Session = Depends(get_db)):
         raise HTTPException(status_code=500, detail=f"Erro ao obter tempo médio de resolução: {e}")
 
 
+@router.get("/metrics/percentiles")
+def obter_percentis_semanais(
+    request: Request = None,
+    response: Response = None,
+    semanas: int = Query(SLAPercentiles.SEMANAS_PADRAO, ge=1, le=SLAPercentiles.SEMANAS_MAXIMO),
+    agrupar: str = "prioridade",
+    prioridade: str | None = None,
+    unidade: str | None = None,
+    db: Session = Depends(get_db),
+):
+    """
+    Tendência semanal de P50/P90/P99 (horas úteis) dos tempos de resposta
+    e de resolução, por prioridade ou por unidade.
+
+    Lê os sketches semanais pré-calculados (sla_percentile_weekly), sem
+    recalcular horas úteis dos chamados.
+    """
+    from ti.services.data_version import DataVersion
+
+    etag = DataVersion.etag(f"sla-percentis-{semanas}-{agrupar}-{prioridade}-{unidade}", 300)
+    not_modified = DataVersion.not_modified(request, etag)
+    if not_modified is not None:
+        return not_modified
+    if response is not None:
+        response.headers.update(DataVersion.headers(etag))
+
+    try:
+        return SLAPercentiles.serie(db, semanas, agrupar, prioridade, unidade)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erro ao obter percentis semanais: {e}")
+
+
+@router.get("/metrics/compliance")
+def obter_cubo_cumprimento(
+    request: Request = None,
+    response: Response = None,
+    inicio: str | None = None,
+    fim: str | None = None,
+    dimensoes: str = "",
+    unidade: str | None = None,
+    problema: str | None = None,
+    prioridade: str | None = None,
+    db: Session = Depends(get_db),
+):
+    """
+    Cumprimento de SLA de chamados concluídos, recortado por dimensões.
+
+    Exemplo: ?dimensoes=unidade&prioridade=Alta (mês corrente por padrão)
+
+    - inicio / fim: datas YYYY-MM-DD inclusivas (conclusão)
+    - dimensoes: lista separada por vírgula de dia, mes, unidade, problema, prioridade
+    - unidade / problema / prioridade: filtros (aceitam lista separada por vírgula)
+
+    Lê o cubo pré-calculado (sla_compliance_cube), sem recalcular horas úteis.
+    """
+    from datetime import date
+    from ti.services.data_version import DataVersion
+
+    def _lista(valor: str | None) -> list[str]:
+        return [item.strip() for item in (valor or "").split(",") if item.strip()]
+
+    try:
+        hoje = now_brazil_naive().date()
+        data_inicio = date.fromisoformat(inicio) if inicio else hoje.replace(day=1)
+        data_fim = date.fromisoformat(fim) if fim else hoje
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Datas devem estar no formato YYYY-MM-DD")
+
+    etag = DataVersion.etag(
+        f"sla-cubo-{data_inicio}-{data_fim}-{dimensoes}-{unidade}-{problema}-{prioridade}"
+    )
+    not_modified = DataVersion.not_modified(request, etag)
+    if not_modified is not None:
+        return not_modified
+    if response is not None:
+        response.headers.update(DataVersion.headers(etag))
+
+    try:
+        return SLAComplianceCube.consultar(
+            db,
+            data_inicio,
+            data_fim,
+            _lista(dimensoes),
+            unidades=_lista(unidade),
+            problemas=_lista(problema),
+            prioridades=_lista(prioridade),
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erro ao consultar cubo de SLA: {e}")
+
+
 @router.post("/scheduler/recalcular-agora")
 def recalcular_sla_agora(db: Session = Depends(get_db)):
     """
@@ -15,6 +15,13 @@ from .session import Session
 from .sla_config import SLAConfiguration
 from .powerbi_dashboard import PowerBIDashboard
 from .metrics_cache import MetricsCacheDB
+from .sla_clock import ChamadoSLAClock
+from .chamado_rollup import ChamadoDailyRollup
+from .sla_percentile import SLAPercentileWeekly, SLAPercentileContribution
+from .sla_compliance import SLAComplianceDaily, SLAComplianceContribution
+from .dashboard_snapshot import DashboardSnapshot
+from .cache_invalidation import CacheInvalidationEvent
+from .data_version import DataVersionCounter
 
 __all__ = [
     "Chamado",
@@ -34,4 +41,13 @@ __all__ = [
     "SLAConfiguration",
     "PowerBIDashboard",
     "MetricsCacheDB",
+    "ChamadoSLAClock",
+    "ChamadoDailyRollup",
+    "SLAPercentileWeekly",
+    "SLAPercentileContribution",
+    "SLAComplianceDaily",
+    "SLAComplianceContribution",
+    "DashboardSnapshot",
+    "CacheInvalidationEvent",
+    "DataVersionCounter",
 ]
@@ -0,0 +1,24 @@
+from __future__ import annotations
+from datetime import datetime
+from sqlalchemy import Integer, String, DateTime
+from sqlalchemy.orm import Mapped, mapped_column
+from core.db import Base
+
+
+class CacheInvalidationEvent(Base):
+    """
+    Evento de invalidação de cache publicado por um worker.
+
+    Os demais workers leem os eventos com id maior que o último visto e
+    aplicam a invalidação no cache em memória local. Linhas antigas são
+    removidas periodicamente (é um log de curta duração, não um histórico).
+    """
+
+    __tablename__ = "cache_invalidation_log"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    # "chave" (igualdade), "prefixo" (startswith) ou "tags" (JSON de atributos)
+    tipo: Mapped[str] = mapped_column(String(10), nullable=False)
+    alvo: Mapped[str] = mapped_column(String(500), nullable=False)
+    origem: Mapped[str] = mapped_column(String(64), nullable=False)
+    criado_em: Mapped[datetime] = mapped_column(DateTime, nullable=False, index=True)
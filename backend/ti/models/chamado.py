@@ -25,6 +25,10 @@ class Chamado(Base):
     status: Mapped[str] = mapped_column(String(20), nullable=False, default="Aberto")
     prioridade: Mapped[str] = mapped_column(String(20), nullable=False, default="Normal")
 
+    # Prazos de SLA materializados (ver ti.services.sla_deadlines)
+    sla_prazo_resposta: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+    sla_prazo_resolucao: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+
     status_assumido_por_id: Mapped[int | None] = mapped_column(Integer, ForeignKey("user.id"), nullable=True)
     status_assumido_em: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
     concluido_por_id: Mapped[int | None] = mapped_column(Integer, ForeignKey("user.id"), nullable=True)
@@ -0,0 +1,30 @@
+from __future__ import annotations
+from datetime import date, datetime
+from sqlalchemy import Integer, String, Date, DateTime, Float
+from sqlalchemy.orm import Mapped, mapped_column
+from core.db import Base
+
+
+class ChamadoDailyRollup(Base):
+    """
+    Agregado diário de chamados por (data de abertura, unidade, problema,
+    prioridade, status).
+
+    Mantido incrementalmente na criação, mudança de status e exclusão do
+    chamado; os gráficos e comparações do dashboard leem daqui em vez de
+    varrer a tabela chamado.
+    """
+
+    __tablename__ = "chamado_daily_rollup"
+
+    data: Mapped[date] = mapped_column(Date, primary_key=True)
+    unidade: Mapped[str] = mapped_column(String(100), primary_key=True)
+    problema: Mapped[str] = mapped_column(String(100), primary_key=True)
+    prioridade: Mapped[str] = mapped_column(String(20), primary_key=True)
+    status: Mapped[str] = mapped_column(String(20), primary_key=True)
+    total: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    respondidos: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    soma_horas_resposta: Mapped[float] = mapped_column(Float, nullable=False, default=0.0)
+    resolvidos: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    soma_horas_resolucao: Mapped[float] = mapped_column(Float, nullable=False, default=0.0)
+    atualizado_em: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
@@ -0,0 +1,22 @@
+from __future__ import annotations
+from datetime import datetime
+from sqlalchemy import Integer, DateTime, Text
+from sqlalchemy.orm import Mapped, mapped_column
+from core.db import Base
+
+
+class DashboardSnapshot(Base):
+    """
+    Foto horária do payload do dashboard administrativo (/metrics/dashboard).
+
+    Uma linha por hora (hora truncada, única), com o payload em JSON
+    compacto. Permite séries de tendência e consulta "dashboard em X" sem
+    recalcular métricas.
+    """
+
+    __tablename__ = "dashboard_snapshot"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    hora: Mapped[datetime] = mapped_column(DateTime, nullable=False, unique=True, index=True)
+    capturado_em: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    payload: Mapped[str] = mapped_column(Text, nullable=False)
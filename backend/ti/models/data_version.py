@@ -0,0 +1,21 @@
+from __future__ import annotations
+from datetime import datetime
+from sqlalchemy import Integer, BigInteger, DateTime
+from sqlalchemy.orm import Mapped, mapped_column
+from core.db import Base
+
+
+class DataVersionCounter(Base):
+    """
+    Versão global dos dados de chamados/SLA (ver ti.services.data_version).
+
+    Uma única linha (id = 1) incrementada a cada commit que grava dados
+    rastreados. Compartilhada por todos os workers: ETags gerados em
+    workers diferentes para a mesma versão coincidem.
+    """
+
+    __tablename__ = "data_version"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=False)
+    versao: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+    atualizado_em: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
@@ -1,6 +1,6 @@
 from __future__ import annotations
 from datetime import datetime
-from sqlalchemy import Integer, String, DateTime, Text
+from sqlalchemy import Integer, String, DateTime, Text, LargeBinary
 from sqlalchemy.orm import Mapped, mapped_column
 from core.db import Base
 
@@ -10,6 +10,10 @@ class MetricsCacheDB(Base):
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     cache_key: Mapped[str] = mapped_column(String(100), nullable=False, unique=True, index=True)
-    cache_value: Mapped[str] = mapped_column(Text, nullable=False)
+    # Bytes de CacheCodec (byte de formato + JSON, comprimido acima do limiar)
+    cache_value: Mapped[bytes] = mapped_column(LargeBinary(length=16777215), nullable=False)  # MEDIUMBLOB
     calculated_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
     expires_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True, index=True)
+    # Dependências da entrada ({dimensão: [valores]} em JSON) para
+    # SLACacheManager.invalidate_by_tags; NULL em entradas sem tags
+    tags: Mapped[str | None] = mapped_column(Text, nullable=True)
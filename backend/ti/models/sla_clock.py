@@ -0,0 +1,25 @@
+from __future__ import annotations
+from datetime import datetime
+from sqlalchemy import Integer, String, DateTime, Float, ForeignKey
+from sqlalchemy.orm import Mapped, mapped_column
+from core.db import Base
+
+
+class ChamadoSLAClock(Base):
+    """
+    Relógio de SLA materializado por chamado.
+
+    Guarda os minutos úteis acumulados até a última transição de status;
+    o tempo decorrido atual é minutos_uteis + tempo útil desde ultima_transicao
+    (somente quando estado == "running").
+    """
+
+    __tablename__ = "chamado_sla_clock"
+
+    chamado_id: Mapped[int] = mapped_column(Integer, ForeignKey("chamado.id"), primary_key=True)
+    minutos_uteis: Mapped[float] = mapped_column(Float, nullable=False, default=0.0)
+    minutos_pausados: Mapped[float] = mapped_column(Float, nullable=False, default=0.0)
+    ultima_transicao: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    estado: Mapped[str] = mapped_column(String(10), nullable=False, default="running")
+    status_chamado: Mapped[str | None] = mapped_column(String(20), nullable=True)
+    atualizado_em: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
@@ -0,0 +1,61 @@
+from __future__ import annotations
+from datetime import date, datetime
+from sqlalchemy import Integer, String, Date, DateTime, Float
+from sqlalchemy.orm import Mapped, mapped_column
+from core.db import Base
+
+
+class SLAComplianceDaily(Base):
+    """
+    Cubo de cumprimento de SLA por (dia da conclusão, unidade, problema,
+    prioridade).
+
+    Contagens e somas de tempo aditivas: qualquer recorte (unidade no mês,
+    problema por prioridade, ...) é a soma das células, sem recalcular
+    horas úteis. Mantido incrementalmente na conclusão, reabertura e
+    exclusão do chamado.
+    """
+
+    __tablename__ = "sla_compliance_cube"
+
+    data: Mapped[date] = mapped_column(Date, primary_key=True)
+    unidade: Mapped[str] = mapped_column(String(100), primary_key=True)
+    problema: Mapped[str] = mapped_column(String(100), primary_key=True)
+    prioridade: Mapped[str] = mapped_column(String(20), primary_key=True)
+    concluidos: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    dentro_sla: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    fora_sla: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    soma_horas_resolucao: Mapped[float] = mapped_column(Float, nullable=False, default=0.0)
+    respondidos: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    resposta_dentro_sla: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    resposta_fora_sla: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    soma_horas_resposta: Mapped[float] = mapped_column(Float, nullable=False, default=0.0)
+    atualizado_em: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+
+
+class SLAComplianceContribution(Base):
+    """
+    Contribuição de cada chamado ao cubo (sla_compliance_cube), como foi
+    aplicada.
+
+    Reabertura e exclusão subtraem exatamente o que foi somado na
+    conclusão, mesmo que a configuração de SLA ou o histórico de pausas
+    tenham mudado depois.
+    """
+
+    __tablename__ = "sla_compliance_contribuicao"
+
+    chamado_id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=False)
+    data: Mapped[date] = mapped_column(Date, nullable=False)
+    unidade: Mapped[str] = mapped_column(String(100), nullable=False)
+    problema: Mapped[str] = mapped_column(String(100), nullable=False)
+    prioridade: Mapped[str] = mapped_column(String(20), nullable=False)
+    concluidos: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    dentro_sla: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    fora_sla: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    soma_horas_resolucao: Mapped[float] = mapped_column(Float, nullable=False, default=0.0)
+    respondidos: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    resposta_dentro_sla: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    resposta_fora_sla: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    soma_horas_resposta: Mapped[float] = mapped_column(Float, nullable=False, default=0.0)
+    atualizado_em: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
@@ -0,0 +1,48 @@
+from __future__ import annotations
+from datetime import date, datetime
+from sqlalchemy import Integer, String, Date, DateTime, Text, Float
+from sqlalchemy.orm import Mapped, mapped_column
+from core.db import Base
+
+
+class SLAPercentileWeekly(Base):
+    """
+    Resumo semanal de percentis de tempo de resposta e de resolução por
+    (semana da conclusão, prioridade, unidade).
+
+    Cada linha guarda dois sketches de quantis (DDSketch serializado em JSON),
+    mescláveis entre unidades/prioridades. Mantido incrementalmente na
+    conclusão, reabertura e exclusão do chamado.
+    """
+
+    __tablename__ = "sla_percentile_weekly"
+
+    semana: Mapped[date] = mapped_column(Date, primary_key=True)
+    prioridade: Mapped[str] = mapped_column(String(20), primary_key=True)
+    unidade: Mapped[str] = mapped_column(String(100), primary_key=True)
+    total: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    sketch_resposta: Mapped[str] = mapped_column(Text, nullable=False)
+    sketch_resolucao: Mapped[str] = mapped_column(Text, nullable=False)
+    atualizado_em: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+
+
+class SLAPercentileContribution(Base):
+    """
+    Contribuição de cada chamado aos sketches semanais (sla_percentile_weekly),
+    como foi aplicada.
+
+    Reabertura e exclusão removem exatamente os valores somados na
+    conclusão, mesmo que o calendário, os feriados, as pausas ou a primeira
+    resposta tenham mudado depois (DDSketch.remove no mesmo bin do add).
+    """
+
+    __tablename__ = "sla_percentile_contribuicao"
+
+    chamado_id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=False)
+    semana: Mapped[date] = mapped_column(Date, nullable=False)
+    prioridade: Mapped[str] = mapped_column(String(20), nullable=False)
+    unidade: Mapped[str] = mapped_column(String(100), nullable=False)
+    # Precisão dupla: o valor relido tem que cair no mesmo bin do sketch
+    horas_resposta: Mapped[float | None] = mapped_column(Float(precision=53), nullable=True)
+    horas_resolucao: Mapped[float] = mapped_column(Float(precision=53), nullable=False)
+    atualizado_em: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
@@ -0,0 +1,62 @@
+"""
+Adiciona as colunas de prazo de SLA (sla_prazo_resposta, sla_prazo_resolucao)
+e seus índices à tabela 'chamado'. Quando executado diretamente, também
+calcula os prazos dos chamados em aberto.
+
+Executa: python -m ti.scripts.add_sla_deadline_columns
+"""
+from sqlalchemy import text, inspect
+from core.db import engine, SessionLocal
+
+COLUMNS = [
+    ("sla_prazo_resposta", "DATETIME NULL"),
+    ("sla_prazo_resolucao", "DATETIME NULL"),
+]
+
+INDICES = [
+    ("idx_chamado_sla_prazo_resposta", ["sla_prazo_resposta"]),
+    ("idx_chamado_sla_prazo_resolucao", ["sla_prazo_resolucao"]),
+]
+
+
+def add_sla_deadline_columns():
+    """Adiciona colunas e índices de prazo de SLA se não existirem"""
+    inspector = inspect(engine)
+    if not inspector.has_table("chamado"):
+        print("⚠️  Tabela 'chamado' não existe, pulando colunas de prazo de SLA")
+        return
+
+    existing_cols = {c.get("name") for c in inspector.get_columns("chamado")}
+    existing_indices = {idx["name"] for idx in inspector.get_indexes("chamado")}
+
+    with engine.connect() as conn:
+        for column, ddl in COLUMNS:
+            if column in existing_cols:
+                continue
+            conn.execute(text(f"ALTER TABLE chamado ADD COLUMN {column} {ddl}"))
+            conn.commit()
+            print(f"✅ Coluna '{column}' adicionada em 'chamado'")
+
+        for index_name, columns in INDICES:
+            if index_name in existing_indices:
+                continue
+            conn.execute(text(f"CREATE INDEX {index_name} ON chamado ({', '.join(columns)})"))
+            conn.commit()
+            print(f"✅ Índice '{index_name}' criado em 'chamado'")
+
+
+def backfill_sla_deadlines():
+    """Calcula os prazos de todos os chamados em aberto"""
+    from ti.services.sla_deadlines import SLADeadlines
+
+    db = SessionLocal()
+    try:
+        total = SLADeadlines.recalcular_abertos(db)
+        print(f"✅ Prazos de SLA calculados para {total} chamados em aberto")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    add_sla_deadline_columns()
+    backfill_sla_deadlines()
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark do motor de horas de negócio (ti.services.sla_calendar).
+
+Mede a latência por chamada para os intervalos típicos de SLA:
+- mesmo dia
+- 1 semana
+- 3 meses
+
+para cada ponto de entrada que usa o motor:
+- SLACalculator.calculate_business_hours
+- BusinessHoursCalculator.calculate_business_hours
+- SLACalculator.calculate_business_hours_many (custo por item)
+
+Não acessa o banco: usa o calendário com horário comercial padrão.
+
+Para acompanhar regressões, salve uma linha de base e compare depois:
+    python -m ti.scripts.benchmark_business_hours --save baseline.json
+    python -m ti.scripts.benchmark_business_hours --compare baseline.json
+
+Com --compare, sai com código 1 se algum caso ficar mais de 20% (ou
+--tolerancia) mais lento que a linha de base.
+"""
+
+import sys
+import json
+import random
+import argparse
+import statistics
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, "/app/backend")
+
+from ti.services.sla import SLACalculator
+from ti.services.sla_business_hours import BusinessHoursCalculator
+
+
+SPANS = {
+    "mesmo_dia": timedelta(hours=8),
+    "1_semana": timedelta(days=7),
+    "3_meses": timedelta(days=90),
+}
+
+
+def _gerar_intervalos(span: timedelta, quantidade: int, seed: int = 7) -> list[tuple]:
+    rng = random.Random(seed)
+    base = datetime(2024, 1, 1, 8, 0)
+    intervalos = []
+    for _ in range(quantidade):
+        start = base + timedelta(days=rng.randint(0, 365), minutes=rng.randint(0, 10 * 60))
+        intervalos.append((start, start + span))
+    return intervalos
+
+
+def _medir(fn, repeticoes: int) -> float:
+    """Mediana (em µs) do tempo por chamada entre as repetições"""
+    amostras = []
+    for _ in range(repeticoes):
+        t0 = time.perf_counter()
+        n = fn()
+        amostras.append((time.perf_counter() - t0) / n * 1e6)
+    return statistics.median(amostras)
+
+
+def executar(quantidade: int, repeticoes: int) -> dict[str, float]:
+    # Aquece o calendário (compilação dos anos usados) fora da medição
+    SLACalculator.calculate_business_hours(datetime(2023, 12, 1), datetime(2025, 6, 1))
+
+    resultados = {}
+    for nome, span in SPANS.items():
+        intervalos = _gerar_intervalos(span, quantidade)
+        starts = [s for s, _ in intervalos]
+        ends = [e for _, e in intervalos]
+
+        def sla_escalar():
+            for s, e in intervalos:
+                SLACalculator.calculate_business_hours(s, e)
+            return len(intervalos)
+
+        def bh_escalar():
+            for s, e in intervalos:
+                BusinessHoursCalculator.calculate_business_hours(s, e)
+            return len(intervalos)
+
+        def sla_lote():
+            SLACalculator.calculate_business_hours_many(starts, ends)
+            return len(intervalos)
+
+        resultados[f"{nome}/sla"] = _medir(sla_escalar, repeticoes)
+        resultados[f"{nome}/business_hours"] = _medir(bh_escalar, repeticoes)
+        resultados[f"{nome}/lote"] = _medir(sla_lote, repeticoes)
+    return resultados
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do motor de horas de negócio")
+    parser.add_argument("--quantidade", type=int, default=2000, help="intervalos por caso")
+    parser.add_argument("--repeticoes", type=int, default=5)
+    parser.add_argument("--save", help="grava os resultados em JSON")
+    parser.add_argument("--compare", help="compara com uma linha de base em JSON")
+    parser.add_argument("--tolerancia", type=float, default=0.20)
+    args = parser.parse_args()
+
+    resultados = executar(args.quantidade, args.repeticoes)
+
+    base = {}
+    if args.compare:
+        with open(args.compare) as f:
+            base = json.load(f)
+
+    regressoes = []
+    print(f"{'caso':<28} {'µs/chamada':>12} {'base':>10}")
+    for caso, valor in resultados.items():
+        ref = base.get(caso)
+        marca = ""
+        if ref:
+            if valor > ref * (1 + args.tolerancia):
+                regressoes.append(caso)
+                marca = "  ✗"
+            print(f"{caso:<28} {valor:>12.2f} {ref:>10.2f}{marca}")
+        else:
+            print(f"{caso:<28} {valor:>12.2f} {'-':>10}")
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(resultados, f, indent=2)
+        print(f"✓ Resultados salvos em {args.save}")
+
+    if regressoes:
+        print(f"✗ {len(regressoes)} caso(s) acima da tolerância de {args.tolerancia:.0%}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark do codec do cache persistido (ti.services.cache_codec).
+
+Compara, para payloads típicos de MetricsCacheDB.cache_value:
+- sketch diário de P90 (SLAP90Incremental, DDSketch de resposta e resolução)
+- métricas do mês (IncrementalMetricsCache)
+- status de SLA de um chamado (chamado_sla_status:<id>)
+- distribuição de SLA (SLACacheManager)
+
+o formato antigo (json.dumps/json.loads em TEXT) com CacheCodec:
+latência de encode/decode por valor (µs) e tamanho gravado (bytes).
+
+Não acessa o banco.
+
+Para acompanhar regressões, salve uma linha de base e compare depois:
+    python -m ti.scripts.benchmark_cache_codec --save baseline.json
+    python -m ti.scripts.benchmark_cache_codec --compare baseline.json
+
+Com --compare, sai com código 1 se algum caso de latência ficar mais de
+20% (ou --tolerancia) mais lento, ou se algum tamanho crescer.
+"""
+
+import sys
+import json
+import random
+import argparse
+import statistics
+import time
+
+sys.path.insert(0, "/app/backend")
+
+from ti.services.cache_codec import CacheCodec
+from ti.services.quantile_sketch import DDSketch
+
+
+def _payload_p90(seed: int = 7) -> dict:
+    """Sketch diário com tempos de resposta/resolução (horas) de um dia movimentado"""
+    rng = random.Random(seed)
+    resposta, resolucao = DDSketch(), DDSketch()
+    for _ in range(400):
+        resposta.add(rng.lognormvariate(0.5, 1.2))
+        resolucao.add(rng.lognormvariate(2.5, 1.0))
+    return {"resposta": resposta.to_dict(), "resolucao": resolucao.to_dict()}
+
+
+PAYLOADS = {
+    "p90_sketch": _payload_p90(),
+    "metricas_mes": {
+        "total": 1843,
+        "dentro_sla": 1562,
+        "fora_sla": 281,
+        "percentual_dentro": 84,
+        "percentual_fora": 15,
+        "updated_at": "2024-05-17T14:32:08.512344",
+    },
+    "chamado_status": {"dentro_sla": True},
+    "sla_distribution": {
+        "dentro_sla": 1562,
+        "fora_sla": 281,
+        "percentual_dentro": 84,
+        "percentual_fora": 15,
+        "total": 1843,
+    },
+}
+
+
+def _medir(fn, repeticoes: int, quantidade: int) -> float:
+    """Mediana (em µs) do tempo por chamada entre as repetições"""
+    amostras = []
+    for _ in range(repeticoes):
+        t0 = time.perf_counter()
+        for _ in range(quantidade):
+            fn()
+        amostras.append((time.perf_counter() - t0) / quantidade * 1e6)
+    return statistics.median(amostras)
+
+
+def executar(quantidade: int, repeticoes: int) -> dict[str, float]:
+    resultados = {}
+    for nome, valor in PAYLOADS.items():
+        legado = json.dumps(valor)
+        novo = CacheCodec.encode(valor)
+        assert CacheCodec.decode(novo) == valor
+        assert CacheCodec.decode(legado.encode("utf-8")) == valor
+
+        resultados[f"{nome}/json/encode_us"] = _medir(lambda: json.dumps(valor), repeticoes, quantidade)
+        resultados[f"{nome}/json/decode_us"] = _medir(lambda: json.loads(legado), repeticoes, quantidade)
+        resultados[f"{nome}/codec/encode_us"] = _medir(lambda: CacheCodec.encode(valor), repeticoes, quantidade)
+        resultados[f"{nome}/codec/decode_us"] = _medir(lambda: CacheCodec.decode(novo), repeticoes, quantidade)
+        resultados[f"{nome}/json/bytes"] = len(legado.encode("utf-8"))
+        resultados[f"{nome}/codec/bytes"] = len(novo)
+    return resultados
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do codec do cache persistido")
+    parser.add_argument("--quantidade", type=int, default=2000, help="chamadas por repetição")
+    parser.add_argument("--repeticoes", type=int, default=5)
+    parser.add_argument("--save", help="grava os resultados em JSON")
+    parser.add_argument("--compare", help="compara com uma linha de base em JSON")
+    parser.add_argument("--tolerancia", type=float, default=0.20)
+    args = parser.parse_args()
+
+    resultados = executar(args.quantidade, args.repeticoes)
+
+    base = {}
+    if args.compare:
+        with open(args.compare) as f:
+            base = json.load(f)
+
+    regressoes = []
+    print(f"{'caso':<36} {'valor':>12} {'base':>10}")
+    for caso, valor in resultados.items():
+        ref = base.get(caso)
+        marca = ""
+        if ref:
+            # Tamanho é determinístico: qualquer aumento é regressão
+            limite = ref if caso.endswith("/bytes") else ref * (1 + args.tolerancia)
+            if valor > limite:
+                regressoes.append(caso)
+                marca = "  ✗"
+            print(f"{caso:<36} {valor:>12.2f} {ref:>10.2f}{marca}")
+        else:
+            print(f"{caso:<36} {valor:>12.2f} {'-':>10}")
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(resultados, f, indent=2)
+        print(f"✓ Resultados salvos em {args.save}")
+
+    if regressoes:
+        print(f"✗ {len(regressoes)} caso(s) acima da tolerância de {args.tolerancia:.0%}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
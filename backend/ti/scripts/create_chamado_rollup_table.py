@@ -0,0 +1,41 @@
+"""
+Cria a tabela chamado_daily_rollup e a reconstrói a partir dos chamados.
+
+Uso:
+    python -m ti.scripts.create_chamado_rollup_table          # cria e reconstrói
+    python -m ti.scripts.create_chamado_rollup_table --se-vazia  # só se estiver vazia
+"""
+
+import sys
+from sqlalchemy import inspect
+from core.db import SessionLocal, engine
+from ti.models.chamado_rollup import ChamadoDailyRollup
+from ti.services.chamado_rollup import ChamadoRollup
+
+
+def create_chamado_rollup_table():
+    insp = inspect(engine)
+    table_name = ChamadoDailyRollup.__tablename__
+    exists = insp.has_table(table_name)
+    ChamadoDailyRollup.__table__.create(bind=engine, checkfirst=True)
+    print({"ok": True, "action": "exists" if exists else "created", "table": table_name})
+
+
+def backfill_chamado_rollup(somente_se_vazia: bool = False):
+    db = SessionLocal()
+    try:
+        if somente_se_vazia and not ChamadoRollup.is_empty(db):
+            print({"ok": True, "action": "skip", "motivo": "rollup já populado"})
+            return
+        linhas = ChamadoRollup.backfill(db)
+        print({"ok": True, "action": "backfill", "linhas": linhas})
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    create_chamado_rollup_table()
+    backfill_chamado_rollup(somente_se_vazia="--se-vazia" in sys.argv)
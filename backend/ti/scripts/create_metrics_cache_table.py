@@ -1,4 +1,4 @@
-from sqlalchemy import inspect
+from sqlalchemy import inspect, text
 from core.db import engine
 from ti.models.metrics_cache import MetricsCacheDB
 
@@ -13,6 +13,41 @@ def create_metrics_cache_table():
     else:
         MetricsCacheDB.__table__.create(bind=engine, checkfirst=True)
         print({"ok": True, "action": "exists", "table": table_name})
+        add_tags_column()
+        convert_cache_value_column()
+
+
+def add_tags_column():
+    """Adiciona a coluna tags (dependências da entrada) se não existir"""
+    insp = inspect(engine)
+    table_name = MetricsCacheDB.__tablename__
+    existing_cols = {c.get("name") for c in insp.get_columns(table_name)}
+    if "tags" in existing_cols:
+        return
+    with engine.connect() as conn:
+        conn.execute(text(f"ALTER TABLE {table_name} ADD COLUMN tags TEXT NULL"))
+        conn.commit()
+    print({"ok": True, "action": "column_added", "table": table_name, "column": "tags"})
+
+
+def convert_cache_value_column():
+    """
+    Converte cache_value de TEXT para MEDIUMBLOB (CacheCodec).
+
+    As linhas existentes ficam com o JSON antigo, que CacheCodec.decode
+    continua lendo; são regravadas no formato novo na próxima escrita.
+    """
+    if engine.dialect.name != "mysql":
+        return
+    insp = inspect(engine)
+    table_name = MetricsCacheDB.__tablename__
+    coluna = next((c for c in insp.get_columns(table_name) if c.get("name") == "cache_value"), None)
+    if coluna is None or "BLOB" in str(coluna.get("type")).upper():
+        return
+    with engine.connect() as conn:
+        conn.execute(text(f"ALTER TABLE {table_name} MODIFY cache_value MEDIUMBLOB NOT NULL"))
+        conn.commit()
+    print({"ok": True, "action": "column_converted", "table": table_name, "column": "cache_value"})
 
 
 if __name__ == "__main__":
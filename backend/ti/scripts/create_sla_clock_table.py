@@ -0,0 +1,52 @@
+"""
+Cria a tabela chamado_sla_clock e reconstrói o relógio de SLA de todos os
+chamados a partir do histórico de status.
+
+Uso:
+    python -m ti.scripts.create_sla_clock_table
+"""
+
+from sqlalchemy import inspect
+from core.db import SessionLocal, engine
+from core.utils import now_brazil_naive
+from ti.models.chamado import Chamado
+from ti.models.sla_clock import ChamadoSLAClock
+from ti.services.sla_clock import SLAClock
+
+
+def create_sla_clock_table():
+    insp = inspect(engine)
+    table_name = ChamadoSLAClock.__tablename__
+    exists = insp.has_table(table_name)
+    ChamadoSLAClock.__table__.create(bind=engine, checkfirst=True)
+    print({"ok": True, "action": "exists" if exists else "created", "table": table_name})
+
+
+def backfill_sla_clock(batch_size: int = 500):
+    db = SessionLocal()
+    try:
+        agora = now_brazil_naive()
+        ids = [
+            row[0] for row in db.query(Chamado.id).filter(
+                Chamado.deletado_em.is_(None)
+            ).order_by(Chamado.id).all()
+        ]
+        total = 0
+        for offset in range(0, len(ids), batch_size):
+            chamados = db.query(Chamado).filter(
+                Chamado.id.in_(ids[offset:offset + batch_size])
+            ).all()
+            for chamado in chamados:
+                SLAClock.reconstruir(db, chamado, agora)
+            db.commit()
+            db.expunge_all()
+            total += len(chamados)
+            print(f"[SLA CLOCK] {total}/{len(ids)} relógios reconstruídos")
+        print({"ok": True, "action": "backfill", "chamados": total})
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    create_sla_clock_table()
+    backfill_sla_clock()
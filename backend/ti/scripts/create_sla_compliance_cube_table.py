@@ -0,0 +1,43 @@
+"""
+Cria as tabelas sla_compliance_cube e sla_compliance_contribuicao e
+reconstrói o cubo de cumprimento de SLA a partir dos chamados concluídos.
+
+Uso:
+    python -m ti.scripts.create_sla_compliance_cube_table             # cria e reconstrói
+    python -m ti.scripts.create_sla_compliance_cube_table --se-vazia  # só sem registros por chamado
+"""
+
+import sys
+from sqlalchemy import inspect
+from core.db import SessionLocal, engine
+from ti.models.sla_compliance import SLAComplianceDaily, SLAComplianceContribution
+from ti.services.sla_compliance_cube import SLAComplianceCube
+
+
+def create_sla_compliance_cube_table():
+    insp = inspect(engine)
+    table_name = SLAComplianceDaily.__tablename__
+    exists = insp.has_table(table_name)
+    SLAComplianceDaily.__table__.create(bind=engine, checkfirst=True)
+    SLAComplianceContribution.__table__.create(bind=engine, checkfirst=True)
+    print({"ok": True, "action": "exists" if exists else "created", "table": table_name})
+
+
+def backfill_sla_compliance_cube(somente_se_vazia: bool = False):
+    db = SessionLocal()
+    try:
+        if somente_se_vazia and not SLAComplianceCube.is_empty(db):
+            print({"ok": True, "action": "skip", "motivo": "cubo já populado"})
+            return
+        linhas = SLAComplianceCube.backfill(db)
+        print({"ok": True, "action": "backfill", "linhas": linhas})
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    create_sla_compliance_cube_table()
+    backfill_sla_compliance_cube(somente_se_vazia="--se-vazia" in sys.argv)
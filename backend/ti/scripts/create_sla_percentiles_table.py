@@ -0,0 +1,44 @@
+"""
+Cria as tabelas sla_percentile_weekly e sla_percentile_contribuicao e
+reconstrói os sketches semanais de percentis de SLA (últimas
+SLAPercentiles.SEMANAS_MAXIMO semanas) a partir dos chamados concluídos.
+
+Uso:
+    python -m ti.scripts.create_sla_percentiles_table             # cria e reconstrói
+    python -m ti.scripts.create_sla_percentiles_table --se-vazia  # só sem registros por chamado
+"""
+
+import sys
+from sqlalchemy import inspect
+from core.db import SessionLocal, engine
+from ti.models.sla_percentile import SLAPercentileWeekly, SLAPercentileContribution
+from ti.services.sla_percentiles import SLAPercentiles
+
+
+def create_sla_percentiles_table():
+    insp = inspect(engine)
+    table_name = SLAPercentileWeekly.__tablename__
+    exists = insp.has_table(table_name)
+    SLAPercentileWeekly.__table__.create(bind=engine, checkfirst=True)
+    SLAPercentileContribution.__table__.create(bind=engine, checkfirst=True)
+    print({"ok": True, "action": "exists" if exists else "created", "table": table_name})
+
+
+def backfill_sla_percentiles(somente_se_vazia: bool = False):
+    db = SessionLocal()
+    try:
+        if somente_se_vazia and not SLAPercentiles.is_empty(db):
+            print({"ok": True, "action": "skip", "motivo": "percentis já populados"})
+            return
+        linhas = SLAPercentiles.backfill(db)
+        print({"ok": True, "action": "backfill", "linhas": linhas})
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    create_sla_percentiles_table()
+    backfill_sla_percentiles(somente_se_vazia="--se-vazia" in sys.argv)
@@ -78,6 +78,9 @@ class SLARecalculator:
             tempos_resposta = []
             tempos_resolucao = []
 
+            # Calcula os tempos de SLA de todos os chamados em lote
+            sla_status_por_chamado = self._calculate_sla_status_batch(chamados, sla_configs)
+
             # Processa cada chamado
             for idx, chamado in enumerate(chamados, 1):
                 try:
@@ -86,7 +89,9 @@ class SLARecalculator:
                         print(f"⏳ Processando: {idx}/{len(chamados)}...")
 
                     # Calcula SLA atual
-                    sla_status = SLACalculator.get_sla_status(self.db, chamado)
+                    sla_status = sla_status_por_chamado.get(chamado.id)
+                    if sla_status is None:
+                        sla_status = SLACalculator.get_sla_status(self.db, chamado)
 
                     if sla_status.get("status_geral") == "sem_sla":
                         continue
@@ -146,6 +151,59 @@ class SLARecalculator:
             traceback.print_exc()
             return self.stats
 
+    def _calculate_sla_status_batch(self, chamados: list[Chamado], sla_configs: dict) -> dict:
+        """
+        Calcula o status de SLA dos chamados com configuração em lote.
+
+        Pausas são carregadas em uma query por bloco e os tempos de resposta
+        e resolução são resolvidos com SLACalculator.calculate_business_hours_many.
+        """
+        resultado = {}
+        agora = now_brazil_naive()
+        chunk_size = 500
+
+        for offset in range(0, len(chamados), chunk_size):
+            chunk = [
+                c for c in chamados[offset:offset + chunk_size]
+                if c.prioridade in sla_configs
+            ]
+            if not chunk:
+                continue
+
+            try:
+                pausas_por_chamado = SLACalculator.get_paused_intervals_bulk(
+                    self.db, [c.id for c in chunk]
+                )
+                intervalos = [SLACalculator._sla_intervals(c, agora) for c in chunk]
+
+                tempos_resposta = SLACalculator.calculate_business_hours_many(
+                    [abertura for abertura, _, _ in intervalos],
+                    [fim_resposta for _, fim_resposta, _ in intervalos],
+                    db=self.db,
+                )
+                tempos_resolucao = SLACalculator.calculate_business_hours_many(
+                    [abertura for abertura, _, _ in intervalos],
+                    [fim_resolucao for _, _, fim_resolucao in intervalos],
+                    [pausas_por_chamado.get(c.id) for c in chunk],
+                    self.db,
+                )
+
+                for chamado, (abertura, _, _), tempo_resposta, tempo_resolucao in zip(
+                    chunk, intervalos, tempos_resposta, tempos_resolucao
+                ):
+                    resultado[chamado.id] = SLACalculator._montar_sla_status(
+                        chamado,
+                        sla_configs[chamado.prioridade],
+                        abertura,
+                        tempo_resposta,
+                        tempo_resolucao,
+                    )
+            except Exception as e:
+                # Chamados do bloco caem no cálculo individual
+                print(f"⚠️  Erro no cálculo em lote (offset {offset}): {e}")
+
+        return resultado
+
     def _update_sla_history(self, chamado: Chamado, sla_status: dict, sla_configs: dict):
         """Atualiza ou cria registro de histórico de SLA"""
         try:
@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+"""
+Valida o cálculo de horas de negócio (escalar e em lote) contra uma
+referência independente.
+
+A referência percorre o intervalo dia a dia e soma a sobreposição com a
+janela comercial de cada dia útil, descontando a união das pausas. Não usa
+o índice de calendário (SLACalendarIndex), merge_intervals nem o bitmap de
+feriados: só DEFAULT_BUSINESS_HOURS e a lista de feriados nacionais
+(BrazilianHolidays), de forma que um erro no motor aparece como divergência
+nos dois caminhos, e não apenas entre eles.
+
+Casos verificados, para intervalos aleatórios (mesmo dia, semanas e meses,
+com e sem períodos em "Em análise") e bordas fixas (feriados, fins de
+semana, limites da janela, intervalos vazios e invertidos):
+- SLACalculator.calculate_business_hours
+- SLACalculator.calculate_business_hours_excluding_paused
+- SLACalculator.calculate_business_hours_many (com e sem pausas)
+
+Não acessa o banco: usa o calendário com horário comercial padrão e sem
+feriados de sla_feriados.
+
+Uso:
+    python -m ti.scripts.validate_business_hours_batch [quantidade] [--seed N]
+
+Sai com código 1 se houver qualquer divergência (pode ser usado no CI).
+"""
+
+import sys
+import random
+import argparse
+import time
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+sys.path.insert(0, "/app/backend")
+
+from ti.services.sla import SLACalculator
+from ti.services.sla_business_hours import BrazilianHolidays
+from ti.services.sla_calendar import DEFAULT_BUSINESS_HOURS
+
+
+def _sobreposicao(a_inicio: datetime, a_fim: datetime, b_inicio: datetime, b_fim: datetime) -> int:
+    """Segundos em comum entre [a_inicio, a_fim] e [b_inicio, b_fim]"""
+    inicio, fim = max(a_inicio, b_inicio), min(a_fim, b_fim)
+    return int((fim - inicio).total_seconds()) if fim > inicio else 0
+
+
+def _uniao(pausas: list[tuple[datetime, datetime]]) -> list[tuple[datetime, datetime]]:
+    """União das pausas (sem recorte), para não descontar sobreposições duas vezes"""
+    unidas = []
+    for inicio, fim in sorted(p for p in pausas if p[1] > p[0]):
+        if unidas and inicio <= unidas[-1][1]:
+            unidas[-1] = (unidas[-1][0], max(unidas[-1][1], fim))
+        else:
+            unidas.append((inicio, fim))
+    return unidas
+
+
+def horas_referencia(start: datetime, end: datetime, pausas: list[tuple[datetime, datetime]] = ()) -> float:
+    """
+    Horas de negócio por força bruta: soma, dia a dia, a parte de [start, end]
+    dentro da janela comercial, menos a parte coberta por pausas.
+
+    Mesmas regras de negócio do motor: segunda a sexta, fora de feriados
+    nacionais, resultado truncado em minutos inteiros.
+    """
+    if start >= end:
+        return 0.0
+
+    unidas = _uniao(pausas)
+    feriados = {}
+    segundos = 0
+    dia = start.date()
+    while dia <= end.date():
+        if dia.year not in feriados:
+            feriados[dia.year] = BrazilianHolidays.get_holidays_for_year(dia.year)
+        janela = DEFAULT_BUSINESS_HOURS.get(dia.weekday())
+        if janela and dia not in feriados[dia.year]:
+            abre = datetime.combine(dia, datetime.strptime(janela[0], "%H:%M").time())
+            fecha = datetime.combine(dia, datetime.strptime(janela[1], "%H:%M").time())
+            inicio, fim = max(start, abre), min(end, fecha)
+            if fim > inicio:
+                segundos += int((fim - inicio).total_seconds())
+                segundos -= sum(_sobreposicao(inicio, fim, p_inicio, p_fim) for p_inicio, p_fim in unidas)
+        dia += timedelta(days=1)
+
+    return (segundos // 60) / 60.0
+
+
+def _gerar_intervalos(quantidade: int, seed: int = 42) -> list[tuple]:
+    """
+    Gera (start, end, pausas) cobrindo intervalos curtos, médios e longos.
+
+    Os instantes são arredondados para segundos inteiros: o motor conta
+    segundos inteiros e a referência compara exatamente.
+    """
+    rng = random.Random(seed)
+    base = datetime(2024, 1, 1)
+    duracoes_max = [timedelta(hours=10), timedelta(days=7), timedelta(days=90)]
+
+    def _segundo(valor: datetime) -> datetime:
+        return valor.replace(microsecond=0)
+
+    intervalos = []
+    for i in range(quantidade):
+        start = base + timedelta(minutes=rng.randint(0, 2 * 365 * 24 * 60))
+        duracao_max = duracoes_max[i % len(duracoes_max)]
+        end = start + timedelta(seconds=rng.randint(0, int(duracao_max.total_seconds())))
+
+        pausas = []
+        for _ in range(rng.randint(0, 3)):
+            inicio = _segundo(start + (end - start) * rng.random())
+            fim = _segundo(inicio + (end - inicio) * rng.random())
+            pausas.append((inicio, fim))
+        # Algumas pausas que extrapolam o intervalo (devem ser recortadas)
+        if i % 7 == 0:
+            pausas.append((start - timedelta(hours=3), start + timedelta(hours=1)))
+        # Alguns intervalos invertidos/vazios para cobrir as bordas
+        if i % 50 == 0:
+            start, end = end, start
+        intervalos.append((start, end, pausas))
+    return intervalos
+
+
+def _casos_fixos() -> list[tuple]:
+    """Bordas conhecidas: feriados, fim de semana e limites da janela comercial"""
+    d = datetime
+    return [
+        # Dentro de um único dia útil, nos limites exatos da janela
+        (d(2024, 3, 5, 8, 0), d(2024, 3, 5, 18, 0), []),
+        (d(2024, 3, 5, 7, 0), d(2024, 3, 5, 8, 0), []),
+        (d(2024, 3, 5, 18, 0), d(2024, 3, 5, 23, 59), []),
+        (d(2024, 3, 5, 17, 59, 59), d(2024, 3, 6, 8, 0, 1), []),
+        # Sexta à noite -> segunda de manhã
+        (d(2024, 3, 8, 17, 0), d(2024, 3, 11, 9, 0), []),
+        # Carnaval, Sexta-feira Santa e Corpus Christi de 2024
+        (d(2024, 2, 12, 8, 0), d(2024, 2, 13, 18, 0), []),
+        (d(2024, 3, 28, 12, 0), d(2024, 4, 1, 12, 0), []),
+        (d(2024, 5, 30, 8, 0), d(2024, 5, 31, 18, 0), []),
+        # Virada de ano (feriado fixo) e Dia da Consciência Negra
+        (d(2024, 12, 31, 10, 0), d(2025, 1, 2, 10, 0), []),
+        (d(2024, 11, 19, 9, 0), d(2024, 11, 21, 9, 0), []),
+        # Pausas sobrepostas, adjacentes e fora do horário comercial
+        (d(2024, 3, 5, 8, 0), d(2024, 3, 7, 18, 0), [
+            (d(2024, 3, 5, 9, 0), d(2024, 3, 5, 11, 0)),
+            (d(2024, 3, 5, 10, 0), d(2024, 3, 5, 12, 0)),
+            (d(2024, 3, 5, 12, 0), d(2024, 3, 5, 13, 0)),
+            (d(2024, 3, 5, 20, 0), d(2024, 3, 6, 9, 30)),
+        ]),
+        # Pausa cobrindo o intervalo inteiro
+        (d(2024, 3, 5, 9, 0), d(2024, 3, 5, 17, 0), [(d(2024, 3, 4), d(2024, 3, 6))]),
+        # Vazio e invertido
+        (d(2024, 3, 5, 9, 0), d(2024, 3, 5, 9, 0), []),
+        (d(2024, 3, 6, 9, 0), d(2024, 3, 5, 9, 0), []),
+    ]
+
+
+def validar(intervalos: list[tuple]) -> tuple[list[tuple], dict[str, float]]:
+    """
+    Compara escalar, escalar com pausas e lote (com e sem pausas) com a
+    referência. Retorna (divergencias, tempos em segundos).
+    """
+    quantidade = len(intervalos)
+    starts = [s for s, _, _ in intervalos]
+    ends = [e for _, e, _ in intervalos]
+    pausas = [p for _, _, p in intervalos]
+    historicos_cache = {
+        idx: [
+            SimpleNamespace(status="Em análise", data_inicio=inicio, data_fim=fim)
+            for inicio, fim in p
+        ]
+        for idx, p in enumerate(pausas)
+    }
+
+    t0 = time.perf_counter()
+    referencia = [horas_referencia(s, e) for s, e in zip(starts, ends)]
+    referencia_pausas = [horas_referencia(s, e, p) for s, e, p in intervalos]
+    tempo_referencia = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    escalar = [SLACalculator.calculate_business_hours(s, e) for s, e in zip(starts, ends)]
+    escalar_pausas = [
+        SLACalculator.calculate_business_hours_excluding_paused(idx, s, e, None, historicos_cache)
+        if historicos_cache[idx] else SLACalculator.calculate_business_hours(s, e)
+        for idx, (s, e) in enumerate(zip(starts, ends))
+    ]
+    tempo_escalar = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    lote = SLACalculator.calculate_business_hours_many(starts, ends)
+    lote_pausas = SLACalculator.calculate_business_hours_many(starts, ends, pausas)
+    tempo_lote = time.perf_counter() - t0
+
+    comparacoes = [
+        ("escalar", referencia, escalar),
+        ("escalar_pausas", referencia_pausas, escalar_pausas),
+        ("lote", referencia, lote),
+        ("lote_pausas", referencia_pausas, lote_pausas),
+    ]
+    divergencias = [
+        (caminho, starts[i], ends[i], esperado[i], obtido[i])
+        for caminho, esperado, obtido in comparacoes
+        for i in range(quantidade)
+        if abs(esperado[i] - obtido[i]) > 1e-9
+    ]
+    tempos = {"referencia": tempo_referencia, "escalar": tempo_escalar, "lote": tempo_lote}
+    return divergencias, tempos
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Valida horas de negócio contra referência por força bruta")
+    parser.add_argument("quantidade", type=int, nargs="?", default=5000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    intervalos = _casos_fixos() + _gerar_intervalos(args.quantidade, args.seed)
+    divergencias, tempos = validar(intervalos)
+
+    print(f"Intervalos: {len(intervalos)} (seed {args.seed})")
+    print(
+        f"Referência: {tempos['referencia'] * 1000:.1f}ms | "
+        f"Escalar: {tempos['escalar'] * 1000:.1f}ms | Lote: {tempos['lote'] * 1000:.1f}ms"
+    )
+
+    if divergencias:
+        print(f"✗ {len(divergencias)} divergência(s) encontradas:")
+        for caminho, start, end, esperado, obtido in divergencias[:10]:
+            print(f"  [{caminho}] {start} -> {end}: referência={esperado} obtido={obtido}")
+        sys.exit(1)
+
+    print("✓ Escalar e lote idênticos à referência")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Codec versionado de MetricsCacheDB.cache_value
+
+O valor é gravado como bytes com um byte de formato na frente:
+- 0x01: JSON compacto (UTF-8)
+- 0x02: JSON compacto comprimido com zlib (valores acima de LIMIAR_ZLIB)
+
+Linhas antigas (JSON puro, sem byte de formato) continuam legíveis: JSON
+nunca começa com um byte de controle 0x01-0x08, então qualquer outro
+primeiro byte é tratado como JSON legado. Novos formatos usam os próximos
+bytes livres (0x03...).
+
+JSON + zlib em vez de msgpack: msgpack não está nas dependências, e o
+tamanho dos payloads grandes (sketches de P90, métricas por período) cai
+mais com a compressão do que com a troca de serialização.
+"""
+
+from __future__ import annotations
+import json
+import os
+import zlib
+from typing import Any
+
+
+class CacheCodec:
+    """Codifica/decodifica valores do cache persistido"""
+
+    FORMATO_JSON = 0x01
+    FORMATO_JSON_ZLIB = 0x02
+    # Bytes reservados para formatos (nenhum JSON válido começa com eles)
+    FORMATOS_RESERVADOS = range(0x01, 0x09)
+
+    # Abaixo disso (bytes de JSON) a compressão não compensa
+    LIMIAR_ZLIB = int(os.getenv("CACHE_CODEC_ZLIB_MIN_BYTES", "512"))
+    NIVEL_ZLIB = 6
+
+    @classmethod
+    def encode_json(cls, texto: str) -> bytes:
+        """Codifica um valor já serializado em JSON"""
+        dados = texto.encode("utf-8")
+        if len(dados) >= cls.LIMIAR_ZLIB:
+            comprimido = zlib.compress(dados, cls.NIVEL_ZLIB)
+            if len(comprimido) < len(dados):
+                return bytes((cls.FORMATO_JSON_ZLIB,)) + comprimido
+        return bytes((cls.FORMATO_JSON,)) + dados
+
+    @classmethod
+    def encode(cls, valor: Any) -> bytes:
+        return cls.encode_json(json.dumps(valor, separators=(",", ":"), ensure_ascii=False))
+
+    @classmethod
+    def decode(cls, bruto: bytes | str | None) -> Any:
+        """Valor a partir do que está no banco (formato novo ou JSON legado)"""
+        if bruto is None:
+            return None
+        if isinstance(bruto, str):
+            # Coluna ainda TEXT (antes da migração): só JSON legado
+            return json.loads(bruto)
+        if isinstance(bruto, memoryview):
+            bruto = bruto.tobytes()
+        if not bruto:
+            raise ValueError("valor de cache vazio")
+
+        formato = bruto[0]
+        if formato == cls.FORMATO_JSON:
+            return json.loads(bruto[1:])
+        if formato == cls.FORMATO_JSON_ZLIB:
+            return json.loads(zlib.decompress(bruto[1:]))
+        if formato in cls.FORMATOS_RESERVADOS:
+            raise ValueError(f"formato de cache desconhecido: 0x{formato:02x}")
+        return json.loads(bruto)
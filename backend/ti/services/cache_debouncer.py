@@ -11,6 +11,7 @@ import threading
 import time
 from typing import Optional, Callable, Any
 from datetime import datetime, timedelta
+from ti.services.cache_invalidation_bus import CacheInvalidationBus
 
 
 class CacheDebouncer:
@@ -124,6 +125,19 @@ class CacheDebouncer:
             if key in self._last_result:
                 del self._last_result[key]
     
+    def invalidate_prefix(self, prefix: str) -> None:
+        """Invalida cache para todas as chaves com o prefixo"""
+        with self._lock:
+            for key in [k for k in self._last_result if k.startswith(prefix)]:
+                del self._last_result[key]
+    
+    def apply_remote_invalidation(self, tipo: str, alvo: str, em: datetime) -> None:
+        """Handler do CacheInvalidationBus (invalidação feita em outro worker)"""
+        if tipo == "chave":
+            self.invalidate(alvo)
+        elif tipo == "prefixo":
+            self.invalidate_prefix(alvo)
+    
     def is_in_progress(self, key: str) -> bool:
         """Verifica se cálculo está em progresso"""
         with self._lock:
@@ -140,6 +154,7 @@ class CacheDebouncer:
 
 # Instância global
 _debouncer = CacheDebouncer()
+CacheInvalidationBus.subscribe(_debouncer.apply_remote_invalidation)
 
 
 def get_debouncer() -> CacheDebouncer:
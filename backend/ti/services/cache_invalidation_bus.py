@@ -0,0 +1,426 @@
+"""
+Barramento de invalidação de cache entre workers
+
+Cada worker (processo do uvicorn/gunicorn) mantém caches em memória próprios
+(SLACacheManager._memory_cache, CacheDebouncer._last_result). Sem
+coordenação, uma invalidação feita em um worker não chega aos outros, que
+continuam servindo o valor antigo até o TTL (24h para as métricas de SLA).
+
+O barramento propaga as invalidações:
+- publish(tipo, alvos): tipo "chave" (igualdade), "prefixo" (startswith)
+  ou "tags" (atributos em JSON, ver SLACacheManager.invalidate_by_tags);
+  "versao" avisa escrita em chamados/SLA (DataVersion, alvo = nova versão)
+- uma thread por processo envia os eventos pendentes e lê os dos outros
+  workers a cada POLL_INTERVAL segundos; eventos do próprio processo
+  (mesma ORIGEM) são ignorados, porque já foram aplicados localmente
+- cada cache registra um handler com subscribe(); o handler só mexe na
+  memória local (o banco já foi tratado pelo worker de origem)
+
+Backends (variável SLA_CACHE_BUS):
+- "db" (padrão): tabela cache_invalidation_log, lida por faixa de id
+  (uma consulta pela chave primária por ciclo); linhas antigas são removidas
+- "redis": pub/sub em REDIS_URL (requer o pacote redis; sem ele, cai para "db")
+- "local": LocalPubSub, substituto em processo do cliente redis (um único
+  worker, desenvolvimento)
+- "off": desligado
+Outro backend pode ser injetado com configurar(backend).
+"""
+
+from __future__ import annotations
+import json
+import os
+import queue
+import socket
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Callable
+from core.utils import now_brazil_naive
+
+
+# handler(tipo, alvo, instante da invalidação no worker de origem)
+Handler = Callable[[str, str, datetime], None]
+
+
+class DBInvalidationBackend:
+    """Eventos na tabela cache_invalidation_log, lidos por polling do id"""
+
+    nome = "db"
+
+    # Eventos são mantidos por esse tempo (segundos) e depois removidos
+    RETENCAO_SEGUNDOS = 600
+    LIMPEZA_INTERVALO = 60
+    LOTE_LEITURA = 500
+    # Ids abaixo do último lido que ainda são consultados: no MySQL um id
+    # menor pode ser confirmado depois de um maior (transações concorrentes)
+    JANELA_IDS = 200
+
+    def __init__(self):
+        self._ultimo_id: int | None = None
+        self._vistos: set[int] = set()
+        self._ultima_limpeza = 0.0
+
+    def iniciar(self) -> None:
+        from sqlalchemy import func
+        from core.db import SessionLocal, engine
+        from ti.models.cache_invalidation import CacheInvalidationEvent
+
+        CacheInvalidationEvent.__table__.create(bind=engine, checkfirst=True)
+        db = SessionLocal()
+        try:
+            # Eventos anteriores à partida não interessam (memória vazia)
+            ultimo = db.query(func.max(CacheInvalidationEvent.id)).scalar() or 0
+            self._vistos = {
+                linha.id for linha in db.query(CacheInvalidationEvent.id).filter(
+                    CacheInvalidationEvent.id > ultimo - self.JANELA_IDS
+                ).all()
+            }
+            self._ultimo_id = ultimo
+        finally:
+            db.close()
+
+    def publicar(self, eventos: list[dict]) -> None:
+        from sqlalchemy import insert
+        from core.db import SessionLocal
+        from ti.models.cache_invalidation import CacheInvalidationEvent
+
+        db = SessionLocal()
+        try:
+            db.execute(insert(CacheInvalidationEvent), [
+                {
+                    "tipo": evento["tipo"],
+                    "alvo": evento["alvo"][:500],
+                    "origem": evento["origem"],
+                    "criado_em": evento["em"],
+                }
+                for evento in eventos
+            ])
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def receber(self) -> list[dict]:
+        from core.db import SessionLocal
+        from ti.models.cache_invalidation import CacheInvalidationEvent as E
+
+        if self._ultimo_id is None:
+            self.iniciar()
+
+        db = SessionLocal()
+        try:
+            rows = db.query(E.id, E.tipo, E.alvo, E.origem, E.criado_em).filter(
+                E.id > self._ultimo_id - self.JANELA_IDS
+            ).order_by(E.id).limit(self.LOTE_LEITURA + self.JANELA_IDS).all()
+
+            eventos = []
+            for row in rows:
+                if row.id in self._vistos:
+                    continue
+                self._vistos.add(row.id)
+                eventos.append({"tipo": row.tipo, "alvo": row.alvo, "origem": row.origem, "em": row.criado_em})
+            if rows:
+                self._ultimo_id = max(self._ultimo_id, rows[-1].id)
+                piso = self._ultimo_id - self.JANELA_IDS
+                self._vistos = {id_ for id_ in self._vistos if id_ > piso}
+
+            if time.monotonic() - self._ultima_limpeza >= self.LIMPEZA_INTERVALO:
+                self._ultima_limpeza = time.monotonic()
+                limite = now_brazil_naive() - timedelta(seconds=self.RETENCAO_SEGUNDOS)
+                db.query(E).filter(E.criado_em < limite).delete(synchronize_session=False)
+                db.commit()
+            return eventos
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+
+class PubSubInvalidationBackend:
+    """
+    Eventos por pub/sub no protocolo do cliente redis-py: usa apenas
+    cliente.publish(canal, mensagem) e cliente.pubsub() com subscribe() e
+    get_message(). Uma mensagem por lote de eventos.
+    """
+
+    nome = "pubsub"
+    CANAL = "sla_cache:invalidacao"
+    LOTE_LEITURA = 500
+
+    def __init__(self, cliente, canal: str = CANAL):
+        self.cliente = cliente
+        self.canal = canal
+        self._assinatura = None
+
+    def iniciar(self) -> None:
+        self._assinatura = self.cliente.pubsub()
+        self._assinatura.subscribe(self.canal)
+
+    def publicar(self, eventos: list[dict]) -> None:
+        mensagem = json.dumps([
+            [evento["tipo"], evento["alvo"], evento["origem"], evento["em"].isoformat()]
+            for evento in eventos
+        ], separators=(",", ":"))
+        self.cliente.publish(self.canal, mensagem)
+
+    def receber(self) -> list[dict]:
+        if self._assinatura is None:
+            self.iniciar()
+
+        eventos = []
+        while len(eventos) < self.LOTE_LEITURA:
+            mensagem = self._assinatura.get_message(ignore_subscribe_messages=True, timeout=0)
+            if mensagem is None:
+                break
+            if mensagem.get("type") != "message":
+                continue
+            dados = mensagem["data"]
+            if isinstance(dados, bytes):
+                dados = dados.decode("utf-8")
+            for tipo, alvo, origem, em in json.loads(dados):
+                eventos.append({"tipo": tipo, "alvo": alvo, "origem": origem, "em": datetime.fromisoformat(em)})
+        return eventos
+
+
+class LocalPubSub:
+    """
+    Substituto em processo do cliente redis para PubSubInvalidationBackend
+    (publish / pubsub().subscribe / get_message). Útil com um único worker
+    e para exercitar o caminho de pub/sub sem servidor.
+    """
+
+    _instancia: "LocalPubSub | None" = None
+
+    def __init__(self):
+        self._assinantes: dict[str, list[queue.Queue]] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def instancia(cls) -> "LocalPubSub":
+        if cls._instancia is None:
+            cls._instancia = cls()
+        return cls._instancia
+
+    def publish(self, canal: str, mensagem: str) -> int:
+        with self._lock:
+            filas = list(self._assinantes.get(canal, []))
+        for fila in filas:
+            fila.put({"type": "message", "channel": canal, "data": mensagem})
+        return len(filas)
+
+    def pubsub(self) -> "_LocalAssinatura":
+        return _LocalAssinatura(self)
+
+
+class _LocalAssinatura:
+    def __init__(self, cliente: LocalPubSub):
+        self._cliente = cliente
+        self._fila: queue.Queue = queue.Queue()
+        self._canais: list[str] = []
+
+    def subscribe(self, *canais: str) -> None:
+        with self._cliente._lock:
+            for canal in canais:
+                self._cliente._assinantes.setdefault(canal, []).append(self._fila)
+                self._canais.append(canal)
+
+    def get_message(self, ignore_subscribe_messages: bool = False, timeout: float = 0.0) -> dict | None:
+        try:
+            return self._fila.get(timeout=timeout) if timeout else self._fila.get_nowait()
+        except queue.Empty:
+            return None
+
+    def close(self) -> None:
+        with self._cliente._lock:
+            for canal in self._canais:
+                filas = self._cliente._assinantes.get(canal, [])
+                if self._fila in filas:
+                    filas.remove(self._fila)
+        self._canais = []
+
+
+class CacheInvalidationBus:
+    """Propaga invalidações de cache para os outros workers"""
+
+    BACKEND = os.getenv("SLA_CACHE_BUS", "db").lower()
+    POLL_INTERVAL = float(os.getenv("SLA_CACHE_BUS_POLL_INTERVAL", "1"))
+
+    # Identifica este processo nos eventos
+    ORIGEM = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"[-64:]
+
+    _backend = None
+    _backend_pronto = False
+    _handlers: list[Handler] = []
+
+    # Eventos a enviar pela thread (publish não faz I/O no caller)
+    _saida: list[dict] = []
+    _lock = threading.Lock()
+
+    _thread: threading.Thread | None = None
+    _parar = threading.Event()
+    _acordar = threading.Event()
+
+    _stats = {
+        "publicados": 0,
+        "recebidos": 0,
+        "proprios_ignorados": 0,
+        "erros_envio": 0,
+        "erros_recebimento": 0,
+        "erros_handler": 0,
+    }
+
+    @classmethod
+    def subscribe(cls, handler: Handler) -> None:
+        """Registra um handler chamado para cada evento vindo de outro worker"""
+        if handler not in cls._handlers:
+            cls._handlers.append(handler)
+
+    @classmethod
+    def configurar(cls, backend) -> None:
+        """Troca o backend (objeto com iniciar/publicar/receber)"""
+        with cls._lock:
+            cls._backend = backend
+            cls._backend_pronto = False
+
+    @classmethod
+    def _criar_backend(cls):
+        if cls.BACKEND == "off":
+            return None
+        if cls.BACKEND == "local":
+            return PubSubInvalidationBackend(LocalPubSub.instancia())
+        if cls.BACKEND == "redis":
+            try:
+                import redis
+                cliente = redis.Redis.from_url(os.getenv("REDIS_URL", "redis://localhost:6379/0"))
+                return PubSubInvalidationBackend(cliente)
+            except ImportError:
+                print("[CACHE BUS] Pacote redis não instalado, usando backend db")
+        return DBInvalidationBackend()
+
+    @classmethod
+    def _obter_backend(cls):
+        if cls._backend is None:
+            cls._backend = cls._criar_backend()
+            cls._backend_pronto = False
+        if cls._backend is not None and not cls._backend_pronto:
+            try:
+                cls._backend.iniciar()
+                cls._backend_pronto = True
+            except Exception as e:
+                print(f"[CACHE BUS] Erro ao iniciar backend {cls._backend.nome}: {e}")
+        return cls._backend
+
+    @classmethod
+    def ativo(cls) -> bool:
+        return cls._thread is not None and cls._thread.is_alive() and not cls._parar.is_set()
+
+    @classmethod
+    def publish(cls, tipo: str, alvos: list[str]) -> None:
+        """Publica a invalidação de alvos (tipo "chave", "prefixo" ou "tags") para os outros workers"""
+        if not alvos or (cls.BACKEND == "off" and cls._backend is None):
+            return
+        em = now_brazil_naive()
+        eventos = [{"tipo": tipo, "alvo": alvo, "origem": cls.ORIGEM, "em": em} for alvo in alvos]
+
+        if cls.ativo():
+            with cls._lock:
+                cls._saida.extend(eventos)
+            cls._acordar.set()
+            return
+
+        # Sem a thread (scripts, testes): envia direto
+        cls._enviar(eventos)
+
+    @classmethod
+    def _enviar(cls, eventos: list[dict]) -> None:
+        backend = cls._obter_backend()
+        if backend is None or not eventos:
+            return
+        try:
+            backend.publicar(eventos)
+            cls._stats["publicados"] += len(eventos)
+        except Exception as e:
+            cls._stats["erros_envio"] += 1
+            print(f"[CACHE BUS] Erro ao publicar {len(eventos)} invalidações: {e}")
+
+    @classmethod
+    def start(cls) -> None:
+        """Inicia a thread de envio/recebimento (idempotente)"""
+        with cls._lock:
+            if cls._thread is not None and cls._thread.is_alive():
+                return
+            cls._parar.clear()
+            cls._thread = threading.Thread(
+                target=cls._loop,
+                daemon=True,
+                name="CacheInvalidationBusThread",
+            )
+            cls._thread.start()
+        print(f"[CACHE BUS] Barramento iniciado (backend {cls.BACKEND}, intervalo {cls.POLL_INTERVAL}s)")
+
+    @classmethod
+    def stop(cls) -> None:
+        """Para a thread e envia o que ainda estiver na fila"""
+        cls._parar.set()
+        cls._acordar.set()
+        with cls._lock:
+            eventos, cls._saida = cls._saida, []
+        cls._enviar(eventos)
+
+    @classmethod
+    def _loop(cls) -> None:
+        cls._obter_backend()
+        while not cls._parar.is_set():
+            cls.ciclo()
+            cls._acordar.wait(cls.POLL_INTERVAL)
+            cls._acordar.clear()
+
+    @classmethod
+    def ciclo(cls) -> int:
+        """Envia os eventos pendentes e aplica os recebidos; retorna quantos foram aplicados"""
+        with cls._lock:
+            eventos, cls._saida = cls._saida, []
+        cls._enviar(eventos)
+
+        backend = cls._obter_backend()
+        if backend is None:
+            return 0
+        try:
+            recebidos = backend.receber()
+        except Exception as e:
+            cls._stats["erros_recebimento"] += 1
+            print(f"[CACHE BUS] Erro ao ler invalidações: {e}")
+            return 0
+        return cls._despachar(recebidos)
+
+    @classmethod
+    def _despachar(cls, eventos: list[dict]) -> int:
+        aplicados = 0
+        for evento in eventos:
+            if evento["origem"] == cls.ORIGEM:
+                cls._stats["proprios_ignorados"] += 1
+                continue
+            cls._stats["recebidos"] += 1
+            for handler in list(cls._handlers):
+                try:
+                    handler(evento["tipo"], evento["alvo"], evento["em"])
+                except Exception as e:
+                    cls._stats["erros_handler"] += 1
+                    print(f"[CACHE BUS] Erro ao aplicar invalidação {evento['tipo']}={evento['alvo']}: {e}")
+            aplicados += 1
+        return aplicados
+
+    @classmethod
+    def get_stats(cls) -> dict:
+        return {
+            **cls._stats,
+            "backend": cls._backend.nome if cls._backend is not None else cls.BACKEND,
+            "origem": cls.ORIGEM,
+            "ativo": cls.ativo(),
+            "handlers": len(cls._handlers),
+            "pendentes_envio": len(cls._saida),
+        }
@@ -21,6 +21,7 @@ from ti.models.chamado import Chamado
 from ti.models.metrics_cache import MetricsCacheDB
 from ti.models.sla_config import SLAConfiguration
 from ti.models.historico_status import HistoricoStatus
+from ti.services.cache_codec import CacheCodec
 from core.utils import now_brazil_naive
 import json
 from typing import Optional, Dict, Any
@@ -57,7 +58,7 @@ class ChamadosTodayCounter:
             
             if cached and cached.expires_at and cached.expires_at > now_brazil_naive():
                 try:
-                    return int(json.loads(cached.cache_value))
+                    return int(CacheCodec.decode(cached.cache_value))
                 except:
                     return 0
             
@@ -86,7 +87,7 @@ class ChamadosTodayCounter:
 
             # Incrementa o valor existente
             try:
-                current_value = int(json.loads(cached.cache_value))
+                current_value = int(CacheCodec.decode(cached.cache_value))
             except:
                 current_value = 0
 
@@ -98,7 +99,7 @@ class ChamadosTodayCounter:
                 hour=0, minute=0, second=0, microsecond=0
             )
 
-            cached.cache_value = json.dumps(new_value)
+            cached.cache_value = CacheCodec.encode(new_value)
             cached.calculated_at = agora
             cached.expires_at = proximo_dia
             db.add(cached)
@@ -128,7 +129,7 @@ class ChamadosTodayCounter:
                 return ChamadosTodayCounter._recalculate(db)
             
             try:
-                current_value = int(json.loads(cached.cache_value))
+                current_value = int(CacheCodec.decode(cached.cache_value))
             except:
                 current_value = 0
             
@@ -140,7 +141,7 @@ class ChamadosTodayCounter:
             )
 
             try:
-                cached.cache_value = json.dumps(new_value)
+                cached.cache_value = CacheCodec.encode(new_value)
                 cached.calculated_at = agora
                 cached.expires_at = proximo_dia
                 db.add(cached)
@@ -186,14 +187,14 @@ class ChamadosTodayCounter:
                 ).first()
 
                 if existing:
-                    existing.cache_value = json.dumps(count)
+                    existing.cache_value = CacheCodec.encode(count)
                     existing.calculated_at = agora
                     existing.expires_at = proximo_dia
                     db.add(existing)
                 else:
                     new_cache = MetricsCacheDB(
                         cache_key=cache_key,
-                        cache_value=json.dumps(count),
+                        cache_value=CacheCodec.encode(count),
                         calculated_at=agora,
                         expires_at=proximo_dia,
                     )
@@ -262,7 +263,7 @@ class IncrementalMetricsCache:
 
                 if cached and cached.expires_at and cached.expires_at > now_brazil_naive():
                     try:
-                        metrics = json.loads(cached.cache_value)
+                        metrics = CacheCodec.decode(cached.cache_value)
                         # Validação básica
                         if all(k in metrics for k in ["total", "dentro_sla", "fora_sla"]):
                             return metrics
@@ -336,7 +337,7 @@ class IncrementalMetricsCache:
             estava_dentro = True
             if historico_anterior:
                 try:
-                    data_anterior = json.loads(historico_anterior.cache_value)
+                    data_anterior = CacheCodec.decode(historico_anterior.cache_value)
                     estava_dentro = data_anterior.get("dentro_sla", True)
                     
                     # Remove contagem anterior
@@ -448,7 +449,7 @@ class IncrementalMetricsCache:
             expire_time = IncrementalMetricsCache.get_expire_time_for_month()
 
             agora = now_brazil_naive()
-            cache_value = json.dumps(metricas)
+            cache_value = CacheCodec.encode(metricas)
 
             try:
                 existing = db.query(MetricsCacheDB).filter(
@@ -495,7 +496,7 @@ class IncrementalMetricsCache:
             expire_time = IncrementalMetricsCache.get_expire_time_for_month()
             agora = now_brazil_naive()
 
-            cache_value = json.dumps({"dentro_sla": dentro_sla})
+            cache_value = CacheCodec.encode({"dentro_sla": dentro_sla})
 
             try:
                 existing = db.query(MetricsCacheDB).filter(
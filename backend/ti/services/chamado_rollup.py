@@ -0,0 +1,271 @@
+"""
+Agregado diário de chamados (tabela chamado_daily_rollup)
+
+Cada chamado contribui para exatamente uma linha do agregado, identificada
+por (data de abertura, unidade, problema, prioridade, status atual), com:
+- total: 1
+- respondidos / soma_horas_resposta: se já teve primeira resposta
+- resolvidos / soma_horas_resolucao: se está concluído
+
+Criação, mudança de status e exclusão aplicam a diferença entre a
+contribuição anterior e a nova na mesma transação da alteração do chamado.
+Gráficos e comparações leem o agregado em O(buckets), sem varrer chamado.
+
+Backfill: python -m ti.scripts.create_chamado_rollup_table
+"""
+
+from __future__ import annotations
+from datetime import date, datetime
+from sqlalchemy.orm import Session
+from sqlalchemy import and_, func
+from core.db import engine
+from core.utils import now_brazil_naive
+from ti.models.chamado import Chamado
+from ti.models.chamado_rollup import ChamadoDailyRollup
+
+
+class ChamadoRollup:
+    """Mantém e consulta o agregado diário de chamados"""
+
+    RESOLVED_STATUSES = {"Concluído", "Concluido"}
+    METRICAS = ("total", "respondidos", "soma_horas_resposta", "resolvidos", "soma_horas_resolucao")
+
+    _table_ready = False
+
+    @classmethod
+    def ensure_table(cls) -> None:
+        if cls._table_ready:
+            return
+        try:
+            ChamadoDailyRollup.__table__.create(bind=engine, checkfirst=True)
+            cls._table_ready = True
+        except Exception as e:
+            print(f"[ROLLUP] Erro ao criar tabela: {e}")
+
+    @staticmethod
+    def chave(chamado: Chamado) -> tuple:
+        """(data, unidade, problema, prioridade, status) da linha do chamado"""
+        abertura = chamado.data_abertura or now_brazil_naive()
+        return (
+            abertura.date(),
+            chamado.unidade or "",
+            chamado.problema or "",
+            chamado.prioridade or "Normal",
+            chamado.status or "Aberto",
+        )
+
+    @staticmethod
+    def contribuicao(db: Session, chamado: Chamado) -> tuple[tuple, dict] | None:
+        """
+        Contribuição atual do chamado para o agregado: (chave, métricas).
+
+        Retorna None para chamados excluídos.
+        """
+        from ti.services.sla import SLACalculator
+        from ti.services.sla_clock import SLAClock
+
+        if chamado.deletado_em is not None:
+            return None
+
+        valores = dict.fromkeys(ChamadoRollup.METRICAS, 0)
+        valores["total"] = 1
+
+        abertura = chamado.data_abertura
+        if abertura and chamado.data_primeira_resposta:
+            valores["respondidos"] = 1
+            valores["soma_horas_resposta"] = SLACalculator.calculate_business_hours(
+                abertura, chamado.data_primeira_resposta, db
+            )
+
+        if abertura and chamado.status in ChamadoRollup.RESOLVED_STATUSES and chamado.data_conclusao:
+            horas = SLAClock.tempo_resolucao_horas(db, chamado.id, chamado.data_conclusao)
+            if horas is None:
+                horas = SLACalculator.calculate_business_hours_excluding_paused(
+                    chamado.id, abertura, chamado.data_conclusao, db
+                )
+            valores["resolvidos"] = 1
+            valores["soma_horas_resolucao"] = horas
+
+        return ChamadoRollup.chave(chamado), valores
+
+    @staticmethod
+    def aplicar(db: Session, contribuicao: tuple[tuple, dict] | None, sinal: int = 1) -> None:
+        """Soma (sinal=1) ou subtrai (sinal=-1) uma contribuição do agregado (sem commit)"""
+        if contribuicao is None:
+            return
+        ChamadoRollup.ensure_table()
+        chave, valores = contribuicao
+        deltas = {metrica: valores[metrica] * sinal for metrica in ChamadoRollup.METRICAS}
+        agora = now_brazil_naive()
+
+        if db.get_bind().dialect.name == "mysql":
+            # Incremento atômico: evita corrida entre requisições na mesma linha
+            from sqlalchemy.dialects.mysql import insert as mysql_insert
+
+            data, unidade, problema, prioridade, status = chave
+            stmt = mysql_insert(ChamadoDailyRollup).values(
+                data=data,
+                unidade=unidade,
+                problema=problema,
+                prioridade=prioridade,
+                status=status,
+                atualizado_em=agora,
+                **deltas,
+            )
+            stmt = stmt.on_duplicate_key_update(
+                atualizado_em=stmt.inserted.atualizado_em,
+                **{
+                    metrica: getattr(ChamadoDailyRollup, metrica) + getattr(stmt.inserted, metrica)
+                    for metrica in ChamadoRollup.METRICAS
+                },
+            )
+            db.execute(stmt)
+            return
+
+        linha = db.get(ChamadoDailyRollup, chave)
+        if linha is None:
+            data, unidade, problema, prioridade, status = chave
+            linha = ChamadoDailyRollup(
+                data=data,
+                unidade=unidade,
+                problema=problema,
+                prioridade=prioridade,
+                status=status,
+                **dict.fromkeys(ChamadoRollup.METRICAS, 0),
+            )
+            db.add(linha)
+        for metrica, delta in deltas.items():
+            setattr(linha, metrica, (getattr(linha, metrica) or 0) + delta)
+        linha.atualizado_em = agora
+
+    @staticmethod
+    def registrar_novo(db: Session, chamado: Chamado) -> None:
+        """Chamado criado: soma sua contribuição (sem commit)"""
+        ChamadoRollup.aplicar(db, ChamadoRollup.contribuicao(db, chamado), 1)
+
+    @staticmethod
+    def registrar_alteracao(db: Session, anterior: tuple[tuple, dict] | None, chamado: Chamado) -> None:
+        """
+        Chamado alterado (status/exclusão): troca a contribuição anterior,
+        capturada antes da alteração, pela atual (sem commit).
+        """
+        atual = ChamadoRollup.contribuicao(db, chamado)
+        if anterior == atual:
+            return
+        ChamadoRollup.aplicar(db, anterior, -1)
+        ChamadoRollup.aplicar(db, atual, 1)
+
+    @staticmethod
+    def contagem_por_dia_status(
+        db: Session,
+        inicio: date,
+        fim: date,
+        statuses: list[str] | None = None,
+    ) -> dict[tuple[date, str], int]:
+        """Chamados abertos em [inicio, fim) por (dia, status)"""
+        ChamadoRollup.ensure_table()
+        filtros = [
+            ChamadoDailyRollup.data >= inicio,
+            ChamadoDailyRollup.data < fim,
+        ]
+        if statuses:
+            filtros.append(ChamadoDailyRollup.status.in_(statuses))
+
+        rows = db.query(
+            ChamadoDailyRollup.data,
+            ChamadoDailyRollup.status,
+            func.sum(ChamadoDailyRollup.total),
+        ).filter(and_(*filtros)).group_by(
+            ChamadoDailyRollup.data,
+            ChamadoDailyRollup.status,
+        ).all()
+
+        return {(dia, status): int(total or 0) for dia, status, total in rows if total}
+
+    @staticmethod
+    def backfill(db: Session, batch_size: int = 500) -> int:
+        """
+        Reconstrói o agregado a partir da tabela chamado.
+
+        Tempos calculados em lote por bloco (relógio de SLA quando existir,
+        senão histórico de pausas), sem queries por chamado.
+        """
+        from ti.services.sla import SLACalculator
+        from ti.services.sla_clock import SLAClock
+
+        ChamadoRollup.ensure_table()
+        ids = [
+            row[0] for row in db.query(Chamado.id).filter(
+                Chamado.deletado_em.is_(None)
+            ).order_by(Chamado.id).all()
+        ]
+
+        agregado: dict[tuple, dict] = {}
+        for offset in range(0, len(ids), batch_size):
+            bloco_ids = ids[offset:offset + batch_size]
+            chamados = db.query(Chamado).filter(Chamado.id.in_(bloco_ids)).all()
+
+            respondidos = [c for c in chamados if c.data_abertura and c.data_primeira_resposta]
+            horas_resposta = SLACalculator.calculate_business_hours_many(
+                [c.data_abertura for c in respondidos],
+                [c.data_primeira_resposta for c in respondidos],
+            )
+            resposta_por_id = {c.id: h for c, h in zip(respondidos, horas_resposta)}
+
+            resolvidos = [
+                c for c in chamados
+                if c.data_abertura and c.data_conclusao and c.status in ChamadoRollup.RESOLVED_STATUSES
+            ]
+            clocks = SLAClock.get_many(db, [c.id for c in resolvidos])
+            resolucao_por_id: dict[int, float] = {}
+            sem_clock = []
+            for c in resolvidos:
+                clock = clocks.get(c.id)
+                if clock is not None:
+                    minutos = SLAClock.minutos_decorridos(clock, c.data_conclusao, db)
+                    resolucao_por_id[c.id] = int(minutos + 1e-6) / 60.0
+                else:
+                    sem_clock.append(c)
+            if sem_clock:
+                pausas = SLACalculator.get_paused_intervals_bulk(db, [c.id for c in sem_clock])
+                horas = SLACalculator.calculate_business_hours_many(
+                    [c.data_abertura for c in sem_clock],
+                    [c.data_conclusao for c in sem_clock],
+                    [pausas.get(c.id) for c in sem_clock],
+                )
+                resolucao_por_id.update({c.id: h for c, h in zip(sem_clock, horas)})
+
+            for c in chamados:
+                chave = ChamadoRollup.chave(c)
+                linha = agregado.setdefault(chave, dict.fromkeys(ChamadoRollup.METRICAS, 0))
+                linha["total"] += 1
+                if c.id in resposta_por_id:
+                    linha["respondidos"] += 1
+                    linha["soma_horas_resposta"] += resposta_por_id[c.id]
+                if c.id in resolucao_por_id:
+                    linha["resolvidos"] += 1
+                    linha["soma_horas_resolucao"] += resolucao_por_id[c.id]
+
+        agora = now_brazil_naive()
+        db.query(ChamadoDailyRollup).delete(synchronize_session=False)
+        linhas = [
+            {
+                "data": data,
+                "unidade": unidade,
+                "problema": problema,
+                "prioridade": prioridade,
+                "status": status,
+                "atualizado_em": agora,
+                **valores,
+            }
+            for (data, unidade, problema, prioridade, status), valores in agregado.items()
+        ]
+        for offset in range(0, len(linhas), batch_size):
+            db.execute(ChamadoDailyRollup.__table__.insert(), linhas[offset:offset + batch_size])
+        db.commit()
+        return len(linhas)
+
+    @staticmethod
+    def is_empty(db: Session) -> bool:
+        ChamadoRollup.ensure_table()
+        return db.query(ChamadoDailyRollup.data).first() is None
@@ -90,6 +90,40 @@ def criar_chamado(db: Session, payload: ChamadoCreate) -> Chamado:
         prioridade="Normal",
     )
     db.add(novo)
+    registrar_rollup(db, None, novo)
     db.commit()
     db.refresh(novo)
     return novo
+
+
+def registrar_rollup(db: Session, anterior, chamado: Chamado) -> None:
+    """Atualiza o agregado diário na transação corrente (savepoint: falha não bloqueia o chamado)"""
+    from ti.services.chamado_rollup import ChamadoRollup
+    try:
+        with db.begin_nested():
+            if anterior is None:
+                ChamadoRollup.registrar_novo(db, chamado)
+            else:
+                ChamadoRollup.registrar_alteracao(db, anterior, chamado)
+    except Exception as e:
+        print(f"[ROLLUP] Erro ao atualizar agregado do chamado {chamado.id}: {e}")
+
+
+def registrar_percentis(db: Session, anterior, chamado: Chamado) -> None:
+    """Atualiza os percentis semanais de SLA na transação corrente (savepoint: falha não bloqueia o chamado)"""
+    from ti.services.sla_percentiles import SLAPercentiles
+    try:
+        with db.begin_nested():
+            SLAPercentiles.registrar_alteracao(db, anterior, chamado)
+    except Exception as e:
+        print(f"[SLA PERCENTIS] Erro ao atualizar percentis do chamado {chamado.id}: {e}")
+
+
+def registrar_cubo_sla(db: Session, anterior, chamado: Chamado) -> None:
+    """Atualiza o cubo de cumprimento de SLA na transação corrente (savepoint: falha não bloqueia o chamado)"""
+    from ti.services.sla_compliance_cube import SLAComplianceCube
+    try:
+        with db.begin_nested():
+            SLAComplianceCube.registrar_alteracao(db, anterior, chamado)
+    except Exception as e:
+        print(f"[SLA CUBO] Erro ao atualizar cubo do chamado {chamado.id}: {e}")
@@ -0,0 +1,188 @@
+"""
+Histórico horário do dashboard administrativo (tabela dashboard_snapshot)
+
+O scheduler de SLA grava, uma vez por hora, o payload completo de
+/metrics/dashboard em JSON compacto (sem os metadados de cálculo). Com isso:
+- séries de tendência (ex.: sla_compliance_mes, abertos_agora) para
+  qualquer intervalo saem de uma leitura da tabela
+- "dashboard em X" devolve a foto mais próxima de X, sem recalcular nada
+
+A primeira captura de cada hora vence (vários workers não duplicam linhas).
+Fotos mais antigas que RETENCAO_DIAS são removidas na captura.
+"""
+
+from __future__ import annotations
+import json
+from datetime import datetime, timedelta
+from sqlalchemy.orm import Session
+from sqlalchemy import and_
+from core.db import engine
+from core.utils import now_brazil_naive
+from ti.models.dashboard_snapshot import DashboardSnapshot
+
+
+class DashboardHistory:
+    """Captura e consulta as fotos horárias do dashboard"""
+
+    RETENCAO_DIAS = 400
+
+    # Campos do payload que descrevem o cálculo, não o valor (não são gravados)
+    CAMPOS_METADADOS = ("timestamp", "secoes")
+
+    _table_ready = False
+
+    @classmethod
+    def ensure_table(cls) -> None:
+        if cls._table_ready:
+            return
+        try:
+            DashboardSnapshot.__table__.create(bind=engine, checkfirst=True)
+            cls._table_ready = True
+        except Exception as e:
+            print(f"[DASHBOARD HISTORY] Erro ao criar tabela: {e}")
+
+    @staticmethod
+    def montar_payload(secoes: dict[str, dict]) -> dict:
+        """
+        Payload de /metrics/dashboard a partir das seções (MetricsSections/MetricsSnapshot).
+
+        Campos de seção indisponível (sem valor calculado) vêm como None.
+        """
+        realtime = secoes["realtime"]["valor"] or {}
+        sla = secoes["sla"]["valor"] or {}
+        performance = secoes["performance"]["valor"] or {}
+
+        return {
+            # Realtime
+            "chamados_hoje": realtime.get("chamados_hoje"),
+            "comparacao_ontem": realtime.get("comparacao_ontem"),
+            "abertos_agora": realtime.get("abertos_agora"),
+
+            # SLA
+            "sla_compliance_24h": sla.get("sla_compliance_24h"),
+            "sla_compliance_mes": sla.get("sla_compliance_mes"),
+            "sla_distribution": sla.get("sla_distribution"),
+            "tempo_resposta_24h": sla.get("tempo_resposta_24h"),
+            "tempo_resposta_mes": sla.get("tempo_resposta_mes"),
+            "total_chamados_mes": sla.get("total_chamados_mes"),
+
+            # Performance
+            "tempo_resolucao_30dias": performance.get("tempo_resolucao_medio"),
+            "primeira_resposta_media": performance.get("primeira_resposta_media"),
+            "taxa_reaberturas": performance.get("taxa_reaberturas"),
+            "chamados_backlog": performance.get("chamados_backlog"),
+
+            # Metadata
+            "timestamp": now_brazil_naive().isoformat(),
+            "stale": any(secao["stale"] for secao in secoes.values()),
+            "secoes": {
+                nome: {
+                    "stale": secao["stale"],
+                    "calculado_em": secao["calculado_em"],
+                    "disponivel": secao["valor"] is not None,
+                }
+                for nome, secao in secoes.items()
+            },
+        }
+
+    @staticmethod
+    def _hora(instante: datetime) -> datetime:
+        return instante.replace(minute=0, second=0, microsecond=0)
+
+    @staticmethod
+    def capturar(db: Session, agora: datetime | None = None) -> DashboardSnapshot | None:
+        """
+        Grava a foto da hora corrente, se ainda não existir.
+
+        Usa o snapshot do produtor em background (ou calcula as seções).
+        Retorna None (o scheduler tenta de novo) se as seções do dashboard
+        não estão configuradas ou alguma está indisponível.
+        """
+        from ti.services.metrics_snapshot import MetricsSnapshot
+
+        DashboardHistory.ensure_table()
+        agora = agora or now_brazil_naive()
+        hora = DashboardHistory._hora(agora)
+
+        existente = db.query(DashboardSnapshot).filter(DashboardSnapshot.hora == hora).first()
+        if existente is not None:
+            return existente
+
+        secoes = MetricsSnapshot.atual()
+        if secoes is None or any(secao["valor"] is None for secao in secoes.values()):
+            return None
+
+        payload = {
+            chave: valor
+            for chave, valor in DashboardHistory.montar_payload(secoes).items()
+            if chave not in DashboardHistory.CAMPOS_METADADOS
+        }
+        foto = DashboardSnapshot(
+            hora=hora,
+            capturado_em=agora,
+            payload=json.dumps(payload, separators=(",", ":"), ensure_ascii=False, default=str),
+        )
+        db.add(foto)
+        db.query(DashboardSnapshot).filter(
+            DashboardSnapshot.hora < hora - timedelta(days=DashboardHistory.RETENCAO_DIAS)
+        ).delete(synchronize_session=False)
+        db.commit()
+        return foto
+
+    @staticmethod
+    def _valor(payload: dict, caminho: str):
+        """Valor de um campo do payload; aceita caminho com pontos (sla_distribution.percentual_dentro)"""
+        valor = payload
+        for parte in caminho.split("."):
+            if not isinstance(valor, dict):
+                return None
+            valor = valor.get(parte)
+        return valor
+
+    @staticmethod
+    def serie(db: Session, inicio: datetime, fim: datetime, campos: list[str]) -> dict:
+        """
+        Série horária dos campos pedidos entre inicio e fim (inclusivos).
+
+        Returns:
+            {"inicio", "fim", "campos", "pontos": [{"hora", <campo>: valor}]}
+        """
+        DashboardHistory.ensure_table()
+        rows = db.query(DashboardSnapshot.hora, DashboardSnapshot.payload).filter(
+            and_(DashboardSnapshot.hora >= inicio, DashboardSnapshot.hora <= fim)
+        ).order_by(DashboardSnapshot.hora).all()
+
+        pontos = []
+        for hora, payload in rows:
+            dados = json.loads(payload)
+            pontos.append({
+                "hora": hora.isoformat(),
+                **{campo: DashboardHistory._valor(dados, campo) for campo in campos},
+            })
+        return {
+            "inicio": inicio.isoformat(),
+            "fim": fim.isoformat(),
+            "campos": campos,
+            "pontos": pontos,
+        }
+
+    @staticmethod
+    def em(db: Session, instante: datetime) -> dict | None:
+        """Foto mais próxima do instante (antes ou depois); None se não houver fotos"""
+        DashboardHistory.ensure_table()
+        antes = db.query(DashboardSnapshot).filter(
+            DashboardSnapshot.hora <= instante
+        ).order_by(DashboardSnapshot.hora.desc()).first()
+        depois = db.query(DashboardSnapshot).filter(
+            DashboardSnapshot.hora > instante
+        ).order_by(DashboardSnapshot.hora.asc()).first()
+
+        candidatas = [foto for foto in (antes, depois) if foto is not None]
+        if not candidatas:
+            return None
+        foto = min(candidatas, key=lambda f: abs((f.hora - instante).total_seconds()))
+        return {
+            "hora": foto.hora.isoformat(),
+            "capturado_em": foto.capturado_em.isoformat(),
+            "payload": json.loads(foto.payload),
+        }
@@ -0,0 +1,238 @@
+"""
+Versão global dos dados de chamados/SLA para ETag (If-None-Match -> 304)
+
+A versão é um contador compartilhado por todos os workers (tabela
+data_version, uma linha), incrementado a cada commit que grava chamados,
+histórico de status ou configurações de SLA (eventos de Session do
+SQLAlchemy, sem chamadas espalhadas pelos endpoints).
+
+Cada worker guarda em memória a última versão conhecida:
+- na própria escrita, recebe o valor incrementado do banco
+- escritas de outros workers chegam pelo CacheInvalidationBus (evento
+  "versao" com o novo valor), em até SLA_CACHE_BUS_POLL_INTERVAL segundos
+- como rede de segurança (barramento desligado ou evento perdido), relê o
+  contador a cada SYNC_SECONDS
+
+Como o contador é o mesmo em todos os workers, o ETag não leva nada do
+processo: um poll com If-None-Match recebe 304 em qualquer worker. Os
+ETags combinam:
+- a versão dos dados (ou a versão do snapshot que gerou o corpo)
+- opcionalmente uma janela de tempo (ttl), para endpoints cujo valor muda
+  com o relógio mesmo sem escrita (SLA, "chamados hoje")
+
+Um poll com ETag igual recebe 304 sem consultar o banco.
+"""
+
+from __future__ import annotations
+import threading
+import time
+from fastapi import Request
+from fastapi.responses import Response
+from sqlalchemy import event, select, update
+from sqlalchemy.orm import Session
+from ti.services.cache_invalidation_bus import CacheInvalidationBus
+
+
+class DataVersion:
+    """Contador de versão dos dados e utilitários de ETag"""
+
+    TRACKED_TABLES = {
+        "chamado",
+        "historico_status",
+        "sla_configuration",
+        "sla_business_hours",
+        "sla_feriados",
+    }
+
+    # Tipo do evento no CacheInvalidationBus
+    EVENTO_BUS = "versao"
+
+    # Releitura do contador compartilhado (segundos)
+    SYNC_SECONDS = 5
+    CONTADOR_ID = 1
+
+    _version = 0
+    _sincronizado_em: float | None = None
+    _tabela_pronta = False
+    _lock = threading.Lock()
+    _installed = False
+    _stats = {"etags_gerados": 0, "not_modified": 0, "remotas": 0, "releituras": 0, "erros": 0}
+
+    @classmethod
+    def current(cls) -> int:
+        sincronizado_em = cls._sincronizado_em
+        if sincronizado_em is None or time.monotonic() - sincronizado_em >= cls.SYNC_SECONDS:
+            cls._sincronizar()
+        return cls._version
+
+    @classmethod
+    def _avancar(cls, versao: int) -> None:
+        """Versões só avançam: eventos fora de ordem não voltam o contador"""
+        with cls._lock:
+            if versao > cls._version:
+                cls._version = versao
+
+    @classmethod
+    def _garantir_tabela(cls, conn) -> None:
+        if cls._tabela_pronta:
+            return
+        from ti.models.data_version import DataVersionCounter
+
+        DataVersionCounter.__table__.create(bind=conn, checkfirst=True)
+        tabela = DataVersionCounter.__table__
+        if conn.execute(select(tabela.c.id).where(tabela.c.id == cls.CONTADOR_ID)).first() is None:
+            try:
+                with conn.begin_nested():
+                    conn.execute(tabela.insert().values(id=cls.CONTADOR_ID, versao=0))
+            except Exception:
+                # Outro worker criou a linha ao mesmo tempo
+                pass
+        cls._tabela_pronta = True
+
+    @classmethod
+    def _sincronizar(cls) -> None:
+        """Relê o contador compartilhado"""
+        from core.db import engine
+        from ti.models.data_version import DataVersionCounter
+
+        tabela = DataVersionCounter.__table__
+        cls._sincronizado_em = time.monotonic()
+        try:
+            with engine.begin() as conn:
+                cls._garantir_tabela(conn)
+                versao = conn.execute(select(tabela.c.versao).where(tabela.c.id == cls.CONTADOR_ID)).scalar()
+            cls._stats["releituras"] += 1
+            cls._avancar(int(versao or 0))
+        except Exception as e:
+            cls._stats["erros"] += 1
+            print(f"[DATA VERSION] Erro ao ler versão compartilhada: {e}")
+
+    @classmethod
+    def bump(cls) -> int:
+        """
+        Registra uma escrita: incrementa o contador compartilhado e avisa os
+        outros workers. Sem banco, avança só a cópia local.
+        """
+        from core.db import engine
+        from core.utils import now_brazil_naive
+        from ti.models.data_version import DataVersionCounter
+
+        tabela = DataVersionCounter.__table__
+        try:
+            with engine.begin() as conn:
+                cls._garantir_tabela(conn)
+                conn.execute(
+                    update(tabela).where(tabela.c.id == cls.CONTADOR_ID).values(
+                        versao=tabela.c.versao + 1,
+                        atualizado_em=now_brazil_naive(),
+                    )
+                )
+                # Mesma transação: a linha está travada pelo UPDATE, o valor lido é o nosso
+                versao = int(conn.execute(select(tabela.c.versao).where(tabela.c.id == cls.CONTADOR_ID)).scalar())
+        except Exception as e:
+            cls._stats["erros"] += 1
+            print(f"[DATA VERSION] Erro ao incrementar versão compartilhada: {e}")
+            with cls._lock:
+                cls._version += 1
+                return cls._version
+
+        cls._avancar(versao)
+        CacheInvalidationBus.publish(cls.EVENTO_BUS, [str(versao)])
+        return versao
+
+    @classmethod
+    def apply_remote_event(cls, tipo: str, alvo: str, em) -> None:
+        """Handler do CacheInvalidationBus: escrita feita em outro worker (alvo = nova versão)"""
+        if tipo != cls.EVENTO_BUS:
+            return
+        cls._stats["remotas"] += 1
+        try:
+            cls._avancar(int(alvo))
+        except (TypeError, ValueError):
+            # Evento sem o valor: relê o contador na próxima leitura
+            cls._sincronizado_em = None
+
+    @classmethod
+    def etag(cls, namespace: str, ttl: int | None = None, versao: str | None = None) -> str:
+        """
+        ETag fraco do endpoint: namespace + versão (+ janela de ttl segundos).
+
+        versao substitui a versão dos dados quando o corpo vem de um valor
+        pré-calculado (ex.: MetricsSnapshot.versao()).
+        """
+        partes = [namespace, versao if versao is not None else str(cls.current())]
+        if ttl:
+            partes.append(str(int(time.time() // ttl)))
+        cls._stats["etags_gerados"] += 1
+        return f'W/"{"-".join(partes)}"'
+
+    @classmethod
+    def not_modified(cls, request: Request | None, etag: str) -> Response | None:
+        """Retorna a resposta 304 se o If-None-Match da requisição bate com o ETag"""
+        if request is None:
+            return None
+        header = request.headers.get("if-none-match")
+        if not header:
+            return None
+        valores = {valor.strip() for valor in header.split(",")}
+        # Comparação fraca: ignora o prefixo W/
+        normalizados = {valor[2:] if valor.startswith("W/") else valor for valor in valores}
+        alvo = etag[2:] if etag.startswith("W/") else etag
+        if "*" in valores or alvo in normalizados:
+            cls._stats["not_modified"] += 1
+            return Response(status_code=304, headers=cls.headers(etag))
+        return None
+
+    @staticmethod
+    def headers(etag: str) -> dict[str, str]:
+        # no-cache: o navegador guarda a resposta mas sempre revalida com If-None-Match
+        return {"ETag": etag, "Cache-Control": "no-cache"}
+
+    @classmethod
+    def get_stats(cls) -> dict:
+        return {"versao": cls._version, **cls._stats}
+
+    @classmethod
+    def install(cls) -> None:
+        """Registra os eventos de Session que incrementam a versão (idempotente)"""
+        if cls._installed:
+            return
+        with cls._lock:
+            if cls._installed:
+                return
+            event.listen(Session, "after_flush", cls._after_flush)
+            event.listen(Session, "after_commit", cls._after_commit)
+            event.listen(Session, "do_orm_execute", cls._do_orm_execute)
+            CacheInvalidationBus.subscribe(cls.apply_remote_event)
+            cls._installed = True
+
+    @classmethod
+    def _tracked(cls, obj) -> bool:
+        table = getattr(obj, "__table__", None)
+        return table is not None and table.name in cls.TRACKED_TABLES
+
+    @classmethod
+    def _after_flush(cls, session: Session, flush_context) -> None:
+        if session.info.get("data_version_dirty"):
+            return
+        for obj in (*session.new, *session.dirty, *session.deleted):
+            if cls._tracked(obj):
+                session.info["data_version_dirty"] = True
+                return
+
+    @classmethod
+    def _do_orm_execute(cls, orm_execute_state) -> None:
+        # query(...).update()/delete() em massa não passam pelo flush
+        if not (orm_execute_state.is_update or orm_execute_state.is_delete):
+            return
+        mapper = orm_execute_state.bind_mapper
+        if mapper is not None and mapper.local_table.name in cls.TRACKED_TABLES:
+            orm_execute_state.session.info["data_version_dirty"] = True
+
+    @classmethod
+    def _after_commit(cls, session: Session) -> None:
+        if session.info.pop("data_version_dirty", False):
+            cls.bump()
+
+
+DataVersion.install()
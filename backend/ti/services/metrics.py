@@ -1,17 +1,22 @@
 from datetime import datetime, timedelta
 from sqlalchemy.orm import Session
-from sqlalchemy import func, and_, or_
+from sqlalchemy import func, and_, or_, case, select
 from ti.models.chamado import Chamado
 from ti.models.historico_status import HistoricoStatus
 from ti.models.sla_config import HistoricoSLA, SLAConfiguration
 from ti.services.sla_cache import SLACacheManager
 from core.utils import now_brazil_naive
+import bisect
 import threading
 
 
 class MetricsCalculator:
     """Calcula métricas do dashboard em tempo real"""
 
+    # Funções de janela (LAG) no banco: None = ainda não testado; False =
+    # sem suporte (MySQL < 8.0), a taxa de reaberturas usa o cálculo em Python
+    _lag_suportado: bool | None = None
+
     @staticmethod
     def get_chamados_abertos_hoje(db: Session) -> int:
         """Retorna quantidade de chamados abertos hoje (do cache incremental)"""
@@ -164,23 +169,34 @@ class MetricsCalculator:
             traceback.print_exc()
             return "—", 0
 
+    @staticmethod
+    def _tags_sla(sessao: Session, **dimensoes) -> dict:
+        """Tags de cache dos agregados de SLA: prioridades com SLA ativo + recorte (mês/janela)"""
+        prioridades = [
+            prioridade for (prioridade,) in sessao.query(SLAConfiguration.prioridade).filter(
+                SLAConfiguration.ativo == True
+            ).all()
+        ]
+        return {"prioridade": prioridades, **dimensoes}
+
     @staticmethod
     def get_sla_compliance_24h(db: Session) -> int:
         """Calcula percentual de SLA cumprido (baseado em chamados ativos) - usa fonte unificada"""
         from ti.services.sla_metrics_unified import UnifiedSLAMetricsCalculator
 
-        # Tenta cache primeiro
-        cached = SLACacheManager.get(db, "sla_compliance_24h")
-        if cached is not None:
-            print(f"[CACHE HIT] SLA Compliance 24h: {cached}%")
-            return cached
-
-        print("[CACHE MISS] SLA Compliance 24h calculando...")
-        result_dict = UnifiedSLAMetricsCalculator.get_sla_compliance_24h(db)
-        result = result_dict["percentual"]
-        print(f"[CACHE SET] SLA Compliance 24h: {result}%")
-        SLACacheManager.set(db, "sla_compliance_24h", result)
-        return result
+        def calcular(sessao: Session) -> int:
+            print("[CACHE MISS] SLA Compliance 24h calculando...")
+            result = UnifiedSLAMetricsCalculator.get_sla_compliance_24h(sessao)["percentual"]
+            print(f"[CACHE SET] SLA Compliance 24h: {result}%")
+            return result
+
+        # Cache com stale-while-revalidate: após invalidação serve o valor
+        # anterior enquanto um único recálculo roda em background
+        # Tags: chamado de outra prioridade ou fora da janela de ativos não invalida
+        return SLACacheManager.get_or_compute(
+            db, "sla_compliance_24h", calcular,
+            tags=lambda sessao: MetricsCalculator._tags_sla(sessao, janela=["ativos_30d"]),
+        )
 
     @staticmethod
     def _calculate_sla_compliance_24h(db: Session) -> int:
@@ -271,18 +287,17 @@ class MetricsCalculator:
         """Calcula percentual de SLA cumprido para todos os chamados do mês - usa fonte unificada"""
         from ti.services.sla_metrics_unified import UnifiedSLAMetricsCalculator
 
-        # Tenta cache primeiro
-        cached = SLACacheManager.get(db, "sla_compliance_mes")
-        if cached is not None:
-            print(f"[CACHE HIT] SLA Compliance Mês: {cached}%")
-            return cached
+        def calcular(sessao: Session) -> int:
+            print("[CACHE MISS] SLA Compliance Mês calculando...")
+            result = UnifiedSLAMetricsCalculator.get_sla_compliance_month(sessao)["percentual"]
+            print(f"[CACHE SET] SLA Compliance Mês: {result}%")
+            return result
 
-        print("[CACHE MISS] SLA Compliance Mês calculando...")
-        result_dict = UnifiedSLAMetricsCalculator.get_sla_compliance_month(db)
-        result = result_dict["percentual"]
-        print(f"[CACHE SET] SLA Compliance Mês: {result}%")
-        SLACacheManager.set(db, "sla_compliance_mes", result)
-        return result
+        # Cache com stale-while-revalidate (ver get_sla_compliance_24h)
+        return SLACacheManager.get_or_compute(
+            db, "sla_compliance_mes", calcular,
+            tags=lambda sessao: MetricsCalculator._tags_sla(sessao, mes=[now_brazil_naive().strftime("%Y-%m")]),
+        )
 
     @staticmethod
     def _calculate_sla_compliance_mes(db: Session) -> int:
@@ -388,22 +403,22 @@ class MetricsCalculator:
             agora = now_brazil_naive()
             hoje_inicio = agora.replace(hour=0, minute=0, second=0, microsecond=0)
             ontem_inicio = (agora - timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
-            ontem_fim = hoje_inicio
 
-            chamados_hoje = db.query(Chamado).filter(
-                and_(
-                    Chamado.data_abertura >= hoje_inicio,
-                    Chamado.status != "Cancelado"
-                )
-            ).count()
-
-            chamados_ontem = db.query(Chamado).filter(
-                and_(
-                    Chamado.data_abertura >= ontem_inicio,
-                    Chamado.data_abertura < ontem_fim,
-                    Chamado.status != "Cancelado"
-                )
-            ).count()
+            # Lido do agregado diário: uma query com poucas linhas
+            contagem = MetricsCalculator._contagem_diaria_por_status(
+                db,
+                ontem_inicio,
+                hoje_inicio + timedelta(days=1),
+                None,
+            )
+            chamados_hoje = sum(
+                total for (dia, status), total in contagem.items()
+                if dia == hoje_inicio.date() and status != "Cancelado"
+            )
+            chamados_ontem = sum(
+                total for (dia, status), total in contagem.items()
+                if dia == ontem_inicio.date() and status != "Cancelado"
+            )
 
             if chamados_ontem == 0:
                 percentual = 0
@@ -454,6 +469,88 @@ class MetricsCalculator:
         minutos = int((media_horas - horas) * 60)
         return f"{horas}h {minutos}m" if minutos > 0 else f"{horas}h"
 
+    # Status exibidos nos gráficos quando nenhum filtro é informado
+    STATUS_GRAFICOS = ["Aberto", "Em andamento", "Em análise", "Concluído", "Cancelado"]
+
+    @staticmethod
+    def _status_key(status: str) -> str:
+        """Normaliza nome do status para key segura (remova espaços e caracteres especiais)"""
+        return status.lower().replace(" ", "_").replace("á", "a")
+
+    @staticmethod
+    def _contagem_diaria_por_status(
+        db: Session,
+        inicio: datetime,
+        fim: datetime,
+        statuses: list[str] | None,
+    ) -> dict[tuple, int]:
+        """
+        Contagem de chamados abertos em [inicio, fim) por (dia, status).
+        statuses=None conta todos os status.
+
+        Lida do agregado diário (chamado_daily_rollup): uma query com uma
+        linha por (dia, status), independente da quantidade de chamados. Os
+        gráficos por dia, semana e mês agrupam o resultado em Python.
+        """
+        from ti.services.chamado_rollup import ChamadoRollup
+
+        try:
+            return ChamadoRollup.contagem_por_dia_status(db, inicio.date(), fim.date(), statuses)
+        except Exception as e:
+            print(f"[METRICS] Erro ao ler agregado diário, consultando chamado: {e}")
+            db.rollback()
+
+        filtros = [
+            Chamado.data_abertura >= inicio,
+            Chamado.data_abertura < fim,
+            Chamado.deletado_em.is_(None),
+        ]
+        if statuses:
+            filtros.append(Chamado.status.in_(statuses))
+
+        rows = db.query(
+            func.date(Chamado.data_abertura),
+            Chamado.status,
+            func.count(Chamado.id),
+        ).filter(and_(*filtros)).group_by(
+            func.date(Chamado.data_abertura),
+            Chamado.status,
+        ).all()
+
+        contagem: dict[tuple, int] = {}
+        for dia, status, total in rows:
+            if isinstance(dia, str):
+                dia = datetime.strptime(dia[:10], "%Y-%m-%d").date()
+            elif isinstance(dia, datetime):
+                dia = dia.date()
+            chave = (dia, status)
+            contagem[chave] = contagem.get(chave, 0) + int(total or 0)
+        return contagem
+
+    @staticmethod
+    def _pivotar_buckets(
+        contagem: dict[tuple, int],
+        buckets: list[tuple[datetime, datetime, dict]],
+        statuses: list[str],
+    ) -> list[dict]:
+        """Soma a contagem diária em cada bucket [inicio, fim) e preenche as keys por status"""
+        resultado = []
+        for bucket_inicio, bucket_fim, dados in buckets:
+            for status in statuses:
+                dados[MetricsCalculator._status_key(status)] = 0
+            resultado.append((bucket_inicio.date(), bucket_fim.date(), dados))
+
+        inicios = [bucket_inicio for bucket_inicio, _, _ in resultado]
+        for (dia, status), total in contagem.items():
+            indice = bisect.bisect_right(inicios, dia) - 1
+            if indice < 0 or dia >= resultado[indice][1]:
+                continue
+            status_key = MetricsCalculator._status_key(status)
+            dados = resultado[indice][2]
+            dados[status_key] = dados.get(status_key, 0) + total
+
+        return [dados for _, _, dados in resultado]
+
     @staticmethod
     def get_chamados_por_dia(db: Session, dias: int = 7, statuses: list[str] | None = None) -> list[dict]:
         """Retorna quantidade de chamados por dia dos últimos N dias, separado por status
@@ -465,42 +562,23 @@ class MetricsCalculator:
                      Se None ou vazio, mostra todos os status
         """
         agora = now_brazil_naive()
-        dias_atras = agora - timedelta(days=dias)
+        statuses_para_usar = statuses if statuses else MetricsCalculator.STATUS_GRAFICOS
 
-        dias_data = []
+        hoje = agora.replace(hour=0, minute=0, second=0, microsecond=0)
+        buckets = []
         for i in range(dias):
-            dia = agora - timedelta(days=dias - 1 - i)
-            dias_data.append(dia.replace(hour=0, minute=0, second=0, microsecond=0))
-
-        # Status disponíveis
-        status_disponiveis = ["Aberto", "Em andamento", "Em análise", "Concluído", "Cancelado"]
-        statuses_para_usar = statuses if statuses and len(statuses) > 0 else status_disponiveis
-
-        resultado = []
-        for i, dia_inicio in enumerate(dias_data):
-            dia_fim = dia_inicio + timedelta(days=1)
-
-            dados_dia = {
+            dia_inicio = hoje - timedelta(days=dias - 1 - i)
+            buckets.append((dia_inicio, dia_inicio + timedelta(days=1), {
                 "dia": ["Dom", "Seg", "Ter", "Qua", "Qui", "Sex", "Sáb"][dia_inicio.weekday()],
                 "data": dia_inicio.strftime("%Y-%m-%d"),
-            }
-
-            # Contar por status
-            for status in statuses_para_usar:
-                count = db.query(Chamado).filter(
-                    and_(
-                        Chamado.data_abertura >= dia_inicio,
-                        Chamado.data_abertura < dia_fim,
-                        Chamado.status == status
-                    )
-                ).count()
-
-                status_key = status.lower().replace(" ", "_").replace("á", "a")
-                dados_dia[status_key] = count
-
-            resultado.append(dados_dia)
+            }))
+        if not buckets:
+            return []
 
-        return resultado
+        contagem = MetricsCalculator._contagem_diaria_por_status(
+            db, buckets[0][0], buckets[-1][1], statuses_para_usar
+        )
+        return MetricsCalculator._pivotar_buckets(contagem, buckets, statuses_para_usar)
 
     @staticmethod
     def get_chamados_por_semana(db: Session, semanas: int = 4, statuses: list[str] | None = None) -> list[dict]:
@@ -513,39 +591,24 @@ class MetricsCalculator:
                      Se None ou vazio, mostra todos os status
         """
         agora = now_brazil_naive()
-        resultado = []
-
-        # Status disponíveis
-        status_disponiveis = ["Aberto", "Em andamento", "Em análise", "Concluído", "Cancelado"]
-        statuses_para_usar = statuses if statuses and len(statuses) > 0 else status_disponiveis
-
-        for i in range(semanas):
-            semana_num = semanas - i
-            semana_inicio = agora - timedelta(weeks=i)
-            semana_inicio = semana_inicio - timedelta(days=semana_inicio.weekday())
-            semana_inicio = semana_inicio.replace(hour=0, minute=0, second=0, microsecond=0)
-            semana_fim = semana_inicio + timedelta(days=7)
-
-            dados_semana = {
-                "semana": f"S{semana_num}",
-            }
-
-            # Contar por status
-            for status in statuses_para_usar:
-                count = db.query(Chamado).filter(
-                    and_(
-                        Chamado.data_abertura >= semana_inicio,
-                        Chamado.data_abertura < semana_fim,
-                        Chamado.status == status
-                    )
-                ).count()
-
-                status_key = status.lower().replace(" ", "_").replace("á", "a")
-                dados_semana[status_key] = count
+        statuses_para_usar = statuses if statuses else MetricsCalculator.STATUS_GRAFICOS
 
-            resultado.insert(0, dados_semana)
-
-        return resultado
+        semana_atual = (agora - timedelta(days=agora.weekday())).replace(
+            hour=0, minute=0, second=0, microsecond=0
+        )
+        buckets = []
+        for i in range(semanas - 1, -1, -1):
+            semana_inicio = semana_atual - timedelta(weeks=i)
+            buckets.append((semana_inicio, semana_inicio + timedelta(days=7), {
+                "semana": f"S{semanas - i}",
+            }))
+        if not buckets:
+            return []
+
+        contagem = MetricsCalculator._contagem_diaria_por_status(
+            db, buckets[0][0], buckets[-1][1], statuses_para_usar
+        )
+        return MetricsCalculator._pivotar_buckets(contagem, buckets, statuses_para_usar)
 
     @staticmethod
     def get_chamados_por_mes(db: Session, meses: int = 3, statuses: list[str] | None = None) -> list[dict]:
@@ -558,84 +621,62 @@ class MetricsCalculator:
                      Se None ou vazio, mostra todos os status
         """
         agora = now_brazil_naive()
-        resultado = []
-
-        # Status disponíveis no sistema
-        status_disponiveis = ["Aberto", "Em andamento", "Em análise", "Concluído", "Cancelado"]
-
-        # Se statuses foi especificado, filtra apenas os selecionados
-        statuses_para_usar = statuses if statuses and len(statuses) > 0 else status_disponiveis
-
-        for i in range(meses):
-            mes_num = meses - i
-            # Calcular o primeiro dia do mês i meses atrás
-            data_temp = agora - timedelta(days=30 * i)
-            mes_inicio = data_temp.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-
-            # Calcular o primeiro dia do próximo mês
-            if mes_inicio.month == 12:
-                mes_fim = mes_inicio.replace(year=mes_inicio.year + 1, month=1)
-            else:
-                mes_fim = mes_inicio.replace(month=mes_inicio.month + 1)
-
-            # Contar por status
-            dados_mes = {
+        statuses_para_usar = statuses if statuses else MetricsCalculator.STATUS_GRAFICOS
+
+        mes_atual = agora.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+        buckets = []
+        for i in range(meses - 1, -1, -1):
+            # Primeiro dia do mês i meses atrás e do mês seguinte
+            indice = mes_atual.year * 12 + mes_atual.month - 1 - i
+            mes_inicio = mes_atual.replace(year=indice // 12, month=indice % 12 + 1)
+            mes_fim = mes_atual.replace(year=(indice + 1) // 12, month=(indice + 1) % 12 + 1)
+            buckets.append((mes_inicio, mes_fim, {
                 "mes": mes_inicio.strftime("%b %Y"),
                 "data_iso": mes_inicio.strftime("%Y-%m"),
-            }
-
-            for status in statuses_para_usar:
-                count = db.query(Chamado).filter(
-                    and_(
-                        Chamado.data_abertura >= mes_inicio,
-                        Chamado.data_abertura < mes_fim,
-                        Chamado.status == status
-                    )
-                ).count()
+            }))
+        if not buckets:
+            return []
 
-                # Normaliza nome do status para key segura (remova espaços e caracteres especiais)
-                status_key = status.lower().replace(" ", "_").replace("á", "a")
-                dados_mes[status_key] = count
-
-            resultado.insert(0, dados_mes)
-
-        return resultado
+        contagem = MetricsCalculator._contagem_diaria_por_status(
+            db, buckets[0][0], buckets[-1][1], statuses_para_usar
+        )
+        return MetricsCalculator._pivotar_buckets(contagem, buckets, statuses_para_usar)
 
     @staticmethod
     def get_sla_distribution(db: Session) -> dict:
         """Retorna distribuição de SLA (dentro/fora) - usa fonte unificada"""
         from ti.services.sla_metrics_unified import UnifiedSLAMetricsCalculator
 
-        # Tenta cache primeiro
-        cached = SLACacheManager.get(db, "sla_distribution")
-        if cached is not None:
-            print(f"[CACHE HIT] SLA Distribution: {cached}")
-            # Valida e extrai se estiver wrapped em {'value': ...}
-            if isinstance(cached, dict) and 'value' in cached and len(cached) == 1:
-                cached = cached['value']
-            return cached
-
-        print("[CACHE MISS] SLA Distribution calculando...")
+        def calcular(sessao: Session) -> dict:
+            print("[CACHE MISS] SLA Distribution calculando...")
 
-        agora = now_brazil_naive()
-        mes_inicio = agora.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+            agora = now_brazil_naive()
+            mes_inicio = agora.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
 
-        result = UnifiedSLAMetricsCalculator.calculate_sla_distribution_period(
-            db, mes_inicio, agora
-        )
+            result = UnifiedSLAMetricsCalculator.calculate_sla_distribution_period(
+                sessao, mes_inicio, agora
+            )
 
-        # Formata resultado para compatibilidade
-        formatted_result = {
-            "dentro_sla": result["dentro_sla"],
-            "fora_sla": result["fora_sla"],
-            "percentual_dentro": result["percentual_dentro"],
-            "percentual_fora": result["percentual_fora"],
-            "total": result["total"]
-        }
+            # Formata resultado para compatibilidade
+            formatted_result = {
+                "dentro_sla": result["dentro_sla"],
+                "fora_sla": result["fora_sla"],
+                "percentual_dentro": result["percentual_dentro"],
+                "percentual_fora": result["percentual_fora"],
+                "total": result["total"]
+            }
+            print(f"[CACHE SET] SLA Distribution: {formatted_result}")
+            return formatted_result
 
-        print(f"[CACHE SET] SLA Distribution: {formatted_result}")
-        SLACacheManager.set(db, "sla_distribution", formatted_result)
-        return formatted_result
+        # Cache com stale-while-revalidate (ver get_sla_compliance_24h)
+        cached = SLACacheManager.get_or_compute(
+            db, "sla_distribution", calcular,
+            tags=lambda sessao: MetricsCalculator._tags_sla(sessao, mes=[now_brazil_naive().strftime("%Y-%m")]),
+        )
+        # Valida e extrai se estiver wrapped em {'value': ...}
+        if isinstance(cached, dict) and 'value' in cached and len(cached) == 1:
+            cached = cached['value']
+        return cached
 
     @staticmethod
     def _calculate_sla_distribution(db: Session) -> dict:
@@ -739,6 +780,95 @@ class MetricsCalculator:
                 "total": 0
             }
 
+    REABERTURA_FECHADOS = ["Concluído", "Concluido", "Cancelado"]
+    REABERTURA_CONCLUIDOS = ["Concluído", "Concluido"]
+
+    @staticmethod
+    def _janela_nao_suportada(erro: Exception) -> bool:
+        """Erro de sintaxe do banco na query com OVER (...): sem funções de janela"""
+        from sqlalchemy.exc import DBAPIError
+
+        if not isinstance(erro, DBAPIError):
+            return False
+        original = erro.orig
+        codigo = original.args[0] if original is not None and original.args else None
+        # 1064 = ER_PARSE_ERROR do MySQL; SQLite antigo: 'near "(": syntax error'
+        return codigo == 1064 or "syntax error" in str(original).lower()
+
+    @staticmethod
+    def _contar_reaberturas_historico(db: Session, chamado_ids_query) -> tuple[int, int]:
+        """
+        Mesmo cálculo de _contar_reaberturas sem funções de janela: lê o
+        histórico dos chamados (uma query, ordenada) e compara cada período
+        com o anterior em Python.
+        """
+        rows = db.query(HistoricoStatus.chamado_id, HistoricoStatus.status).filter(
+            HistoricoStatus.chamado_id.in_(chamado_ids_query)
+        ).order_by(HistoricoStatus.chamado_id, HistoricoStatus.data_inicio, HistoricoStatus.id).all()
+
+        com_historico: set[int] = set()
+        reabertos: set[int] = set()
+        anterior_id, anterior_status = None, None
+        for chamado_id, status in rows:
+            com_historico.add(chamado_id)
+            if (
+                chamado_id == anterior_id
+                and anterior_status in MetricsCalculator.REABERTURA_CONCLUIDOS
+                and status not in MetricsCalculator.REABERTURA_FECHADOS
+            ):
+                reabertos.add(chamado_id)
+            anterior_id, anterior_status = chamado_id, status
+        return len(reabertos), len(com_historico)
+
+    @staticmethod
+    def _contar_reaberturas(db: Session, chamado_ids_query) -> tuple[int, int] | None:
+        """
+        Retorna (chamados reabertos, chamados com histórico) entre os ids do
+        select, ou None se não foi possível calcular.
+
+        Reabertura = período de status imediatamente após um período
+        "Concluído" cujo status não é fechado (LAG sobre historico_status
+        ordenado por data_inicio). Uma única query; em bancos sem funções de
+        janela, _contar_reaberturas_historico.
+        """
+        fechados = MetricsCalculator.REABERTURA_FECHADOS
+        concluidos = MetricsCalculator.REABERTURA_CONCLUIDOS
+
+        if MetricsCalculator._lag_suportado is False:
+            return MetricsCalculator._contar_reaberturas_historico(db, chamado_ids_query)
+
+        transicoes = db.query(
+            HistoricoStatus.chamado_id.label("chamado_id"),
+            HistoricoStatus.status.label("status"),
+            func.lag(HistoricoStatus.status).over(
+                partition_by=HistoricoStatus.chamado_id,
+                order_by=(HistoricoStatus.data_inicio, HistoricoStatus.id),
+            ).label("status_anterior"),
+        ).filter(
+            HistoricoStatus.chamado_id.in_(chamado_ids_query)
+        ).subquery()
+
+        reaberto = and_(
+            transicoes.c.status_anterior.in_(concluidos),
+            transicoes.c.status.notin_(fechados),
+        )
+        try:
+            total_com_historico, reabertos = db.query(
+                func.count(func.distinct(transicoes.c.chamado_id)),
+                func.count(func.distinct(case((reaberto, transicoes.c.chamado_id)))),
+            ).one()
+        except Exception as e:
+            db.rollback()
+            if not MetricsCalculator._janela_nao_suportada(e):
+                # Não vira 0%: o dashboard mostra a métrica como indisponível
+                print(f"[METRICS] Erro ao calcular taxa de reaberturas: {e}")
+                return None
+            print("[METRICS] Banco sem funções de janela (LAG): taxa de reaberturas calculada em Python")
+            MetricsCalculator._lag_suportado = False
+            return MetricsCalculator._contar_reaberturas_historico(db, chamado_ids_query)
+        MetricsCalculator._lag_suportado = True
+        return int(reabertos or 0), int(total_com_historico or 0)
+
     @staticmethod
     def get_performance_metrics(db: Session) -> dict:
         """Retorna métricas de performance (últimos 30 dias) - CORRIGIDO"""
@@ -749,25 +879,24 @@ class MetricsCalculator:
             trinta_dias_atras = agora - timedelta(days=30)
 
             # Busca chamados dos últimos 30 dias
-            chamados_30dias = db.query(Chamado).filter(
-                and_(
-                    Chamado.data_abertura >= trinta_dias_atras,
-                    Chamado.status != "Cancelado"
-                )
-            ).all()
+            filtro_30dias = and_(
+                Chamado.data_abertura >= trinta_dias_atras,
+                Chamado.status != "Cancelado"
+            )
+            chamados_30dias = db.query(Chamado).filter(filtro_30dias).all()
 
             # ===== TEMPO MÉDIO DE RESOLUÇÃO (horas de negócio SEM "Em análise") =====
-            tempos_resolucao = []
-            for chamado in chamados_30dias:
-                if chamado.data_conclusao and chamado.data_abertura:
-                    # Usa horas de NEGÓCIO DESCONTANDO "Em análise"
-                    horas = SLACalculator.calculate_business_hours_excluding_paused(
-                        chamado.id,
-                        chamado.data_abertura,
-                        chamado.data_conclusao,
-                        db
-                    )
-                    tempos_resolucao.append(horas)
+            # Calculado em lote: uma query de pausas e uma passada no calendário
+            concluidos = [c for c in chamados_30dias if c.data_conclusao and c.data_abertura]
+            pausas_por_chamado = SLACalculator.get_paused_intervals_bulk(
+                db, [c.id for c in concluidos]
+            )
+            tempos_resolucao = SLACalculator.calculate_business_hours_many(
+                [c.data_abertura for c in concluidos],
+                [c.data_conclusao for c in concluidos],
+                [pausas_por_chamado.get(c.id) for c in concluidos],
+                db,
+            )
 
             tempo_resolucao_medio = sum(tempos_resolucao) / len(tempos_resolucao) if tempos_resolucao else 0
             horas = int(tempo_resolucao_medio)
@@ -776,18 +905,18 @@ class MetricsCalculator:
 
             # ===== TEMPO MÉDIO DE PRIMEIRA RESPOSTA =====
             # Usa Chamado.data_primeira_resposta (fonte confiável)
-            tempos_primeira_resposta = []
-            for chamado in chamados_30dias:
-                if chamado.data_primeira_resposta and chamado.data_abertura:
-                    # Usa horas de NEGÓCIO (não desconta nada para primeira resposta)
-                    horas = SLACalculator.calculate_business_hours(
-                        chamado.data_abertura,
-                        chamado.data_primeira_resposta,
-                        db
-                    )
-                    # Filtro de sanidade: máximo 72h
-                    if 0 <= horas <= 72:
-                        tempos_primeira_resposta.append(horas)
+            # Usa horas de NEGÓCIO (não desconta nada para primeira resposta)
+            respondidos = [c for c in chamados_30dias if c.data_primeira_resposta and c.data_abertura]
+            tempos_primeira_resposta = [
+                horas
+                for horas in SLACalculator.calculate_business_hours_many(
+                    [c.data_abertura for c in respondidos],
+                    [c.data_primeira_resposta for c in respondidos],
+                    db=db,
+                )
+                # Filtro de sanidade: máximo 72h
+                if 0 <= horas <= 72
+            ]
 
             tempo_primeira_resposta_medio = sum(tempos_primeira_resposta) / len(tempos_primeira_resposta) if tempos_primeira_resposta else 0
 
@@ -800,24 +929,17 @@ class MetricsCalculator:
                 tempo_primeira_resposta_str = "—"
 
             # ===== TAXA DE REABERTURAS =====
-            # Calcula % de chamados que foram reaberlos (status != Concluído em algum momento)
-            # Para simplificar: verifica chamados com múltiplas transições
-            chamados_reaberlos = 0
-            for chamado in chamados_30dias:
-                historicos = db.query(HistoricoStatus).filter(
-                    HistoricoStatus.chamado_id == chamado.id
-                ).count()
-                # Se tem mais de 5 históricos, provavelmente foi reaberto
-                if historicos > 5:
-                    chamados_reaberlos += 1
-
-            total_com_historico = sum(
-                1 for c in chamados_30dias
-                if db.query(HistoricoStatus).filter(
-                    HistoricoStatus.chamado_id == c.id
-                ).count() > 0
+            # % de chamados com histórico que tiveram uma transição real
+            # Concluído -> status não fechado (uma query, sem N+1)
+            reaberturas = MetricsCalculator._contar_reaberturas(
+                db, select(Chamado.id).where(filtro_30dias)
             )
-            taxa_reaberturas = int((chamados_reaberlos / total_com_historico * 100)) if total_com_historico > 0 else 0
+            if reaberturas is None:
+                taxa_reaberturas_str = "—"
+            else:
+                chamados_reaberlos, total_com_historico = reaberturas
+                taxa_reaberturas = int((chamados_reaberlos / total_com_historico * 100)) if total_com_historico > 0 else 0
+                taxa_reaberturas_str = f"{taxa_reaberturas}%"
 
             # ===== CHAMADOS EM BACKLOG =====
             # Chamados que estão aguardando (congelados)
@@ -831,7 +953,7 @@ class MetricsCalculator:
             return {
                 "tempo_resolucao_medio": tempo_resolucao_str,
                 "primeira_resposta_media": tempo_primeira_resposta_str,
-                "taxa_reaberturas": f"{taxa_reaberturas}%",
+                "taxa_reaberturas": taxa_reaberturas_str,
                 "chamados_backlog": chamados_backlog
             }
 
@@ -842,7 +964,7 @@ class MetricsCalculator:
             return {
                 "tempo_resolucao_medio": "—",
                 "primeira_resposta_media": "—",
-                "taxa_reaberturas": "0%",
+                "taxa_reaberturas": "—",
                 "chamados_backlog": 0
             }
 
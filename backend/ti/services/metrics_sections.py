@@ -0,0 +1,162 @@
+"""
+Cálculo paralelo das seções do dashboard de métricas
+
+Cada seção (realtime, sla, performance) roda em um pool de threads limitado,
+com sua própria sessão de banco (SessionLocal). O resultado é montado com
+timeout por seção: se uma seção não terminar a tempo, o dashboard usa o
+último valor calculado dessa seção, marcado como stale, em vez de esperar.
+Sem valor anterior (worker recém-iniciado), a seção vem indisponível
+(valor None, stale) e as demais seções são servidas normalmente.
+
+A seção que estourou o timeout continua rodando no pool e atualiza o último
+valor ao terminar; enquanto isso, novas requisições reaproveitam o mesmo
+cálculo em andamento (no máximo um cálculo por seção por vez).
+"""
+
+from __future__ import annotations
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from datetime import datetime
+from time import monotonic
+from typing import Any, Callable
+from core.utils import now_brazil_naive
+
+
+class MetricsSections:
+    """Executa seções do dashboard em paralelo com timeout e fallback stale"""
+
+    MAX_WORKERS = 4
+
+    # Timeout padrão por seção (segundos)
+    DEFAULT_TIMEOUT = 10.0
+
+    _executor: ThreadPoolExecutor | None = None
+    _executor_lock = threading.Lock()
+
+    _lock = threading.Lock()
+    _em_andamento: dict[str, Future] = {}
+    _ultimo_valor: dict[str, tuple[Any, datetime]] = {}
+    _stats = {"calculos": 0, "timeouts": 0, "erros": 0, "stale_servidos": 0, "indisponiveis": 0}
+
+    @classmethod
+    def _get_executor(cls) -> ThreadPoolExecutor:
+        if cls._executor is None:
+            with cls._executor_lock:
+                if cls._executor is None:
+                    cls._executor = ThreadPoolExecutor(
+                        max_workers=cls.MAX_WORKERS,
+                        thread_name_prefix="metrics-section",
+                    )
+        return cls._executor
+
+    @classmethod
+    def _executar(cls, nome: str, fn: Callable) -> Any:
+        """Roda a seção com sessão própria e guarda o resultado como último valor"""
+        from core.db import SessionLocal
+
+        db = SessionLocal()
+        try:
+            valor = fn(db)
+        finally:
+            db.close()
+        with cls._lock:
+            cls._ultimo_valor[nome] = (valor, now_brazil_naive())
+            cls._stats["calculos"] += 1
+        return valor
+
+    @classmethod
+    def _submeter(cls, nome: str, fn: Callable) -> Future:
+        """Submete a seção ao pool ou reaproveita o cálculo já em andamento"""
+        with cls._lock:
+            future = cls._em_andamento.get(nome)
+            if future is not None and not future.done():
+                return future
+            future = cls._get_executor().submit(cls._executar, nome, fn)
+            cls._em_andamento[nome] = future
+        return future
+
+    @classmethod
+    def calcular(
+        cls,
+        secoes: dict[str, Callable],
+        timeouts: dict[str, float] | None = None,
+    ) -> dict[str, dict]:
+        """
+        Calcula as seções em paralelo.
+
+        Args:
+            secoes: {nome: fn(db) -> valor}
+            timeouts: {nome: segundos} (padrão DEFAULT_TIMEOUT)
+
+        Returns:
+            {nome: {"valor", "stale", "calculado_em", "erro"}}
+
+        Seção que falha (ou estoura o timeout) sem valor anterior vem com
+        valor None, stale True e calculado_em None.
+        """
+        timeouts = timeouts or {}
+        inicio = monotonic()
+        futures = {nome: cls._submeter(nome, fn) for nome, fn in secoes.items()}
+
+        resultado: dict[str, dict] = {}
+        for nome, future in futures.items():
+            # Timeouts contam a partir do início: as seções rodam ao mesmo tempo
+            restante = max(0.0, timeouts.get(nome, cls.DEFAULT_TIMEOUT) - (monotonic() - inicio))
+            try:
+                valor = future.result(timeout=restante)
+                with cls._lock:
+                    calculado_em = cls._ultimo_valor.get(nome, (None, now_brazil_naive()))[1]
+                resultado[nome] = {
+                    "valor": valor,
+                    "stale": False,
+                    "calculado_em": calculado_em.isoformat(),
+                    "erro": None,
+                }
+                continue
+            except FutureTimeoutError:
+                motivo = "timeout"
+                with cls._lock:
+                    cls._stats["timeouts"] += 1
+                print(f"[METRICS SECTIONS] Seção '{nome}' excedeu {timeouts.get(nome, cls.DEFAULT_TIMEOUT)}s")
+            except Exception as e:
+                motivo = str(e)
+                with cls._lock:
+                    cls._stats["erros"] += 1
+                print(f"[METRICS SECTIONS] Erro na seção '{nome}': {e}")
+
+            with cls._lock:
+                anterior = cls._ultimo_valor.get(nome)
+                if anterior is not None:
+                    cls._stats["stale_servidos"] += 1
+                else:
+                    cls._stats["indisponiveis"] += 1
+            if anterior is None:
+                resultado[nome] = {
+                    "valor": None,
+                    "stale": True,
+                    "calculado_em": None,
+                    "erro": motivo,
+                }
+                continue
+
+            valor, calculado_em = anterior
+            resultado[nome] = {
+                "valor": valor,
+                "stale": True,
+                "calculado_em": calculado_em.isoformat(),
+                "erro": motivo,
+            }
+
+        return resultado
+
+    @classmethod
+    def get_stats(cls) -> dict:
+        with cls._lock:
+            return {
+                **cls._stats,
+                "secoes_em_cache": sorted(cls._ultimo_valor.keys()),
+                "em_andamento": sorted(
+                    nome for nome, future in cls._em_andamento.items() if not future.done()
+                ),
+                "max_workers": cls.MAX_WORKERS,
+            }
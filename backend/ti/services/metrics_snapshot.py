@@ -0,0 +1,224 @@
+"""
+Produtor em background do snapshot de métricas do dashboard
+
+Em vez de cada requisição (e cada escrita em chamados) recalcular métricas,
+uma única thread por processo:
+- verifica a cada INTERVALO_MINIMO segundos se a versão dos dados mudou
+  (DataVersion, que também avança com escritas de outros workers pelo
+  CacheInvalidationBus) ou se o snapshot passou de IDADE_MAXIMA (métricas
+  que dependem do relógio, como SLA, mudam mesmo sem escrita)
+- recalcula as seções do dashboard (MetricsSections: pool limitado,
+  sessão própria por seção, fallback stale por timeout)
+- guarda o snapshot em memória e o envia por Socket.IO ("metrics:updated")
+
+Os endpoints HTTP de métricas devolvem o último snapshot, então o custo de
+leitura não cresce com a quantidade de telas abertas. Sem snapshot recente
+(produtor parado ou ainda no primeiro cálculo) os endpoints calculam direto.
+A seção servida leva stale/calculado_em: stale se a seção veio do último
+valor (timeout/erro) ou se os dados mudaram depois do snapshot.
+
+As seções são registradas pelo módulo da API via configurar().
+"""
+
+from __future__ import annotations
+import json
+import threading
+import time
+from typing import Callable
+from core.utils import now_brazil_naive
+from ti.services.data_version import DataVersion
+from ti.services.metrics_sections import MetricsSections
+
+
+class MetricsSnapshot:
+    """Snapshot das seções do dashboard mantido por uma thread em background"""
+
+    # Intervalo mínimo entre recálculos (segundos)
+    INTERVALO_MINIMO = 10
+    # Recalcula mesmo sem escrita após esse tempo (segundos)
+    IDADE_MAXIMA = 120
+
+    EVENTO = "metrics:updated"
+
+    _secoes: dict[str, Callable] = {}
+    _timeouts: dict[str, float] = {}
+
+    _snapshot: dict[str, dict] | None = None
+    _versao: int | None = None
+    _gerado_em: float = 0.0
+    # Identifica o corpo no ETag: versão dos dados + janela de IDADE_MAXIMA
+    # do relógio em que foi calculado. Só depende de estado compartilhado,
+    # então snapshots equivalentes de workers diferentes têm o mesmo ETag
+    _identificador: str | None = None
+    _lock = threading.Lock()
+
+    _thread: threading.Thread | None = None
+    _parar = threading.Event()
+    _stats = {"recalculos": 0, "envios": 0, "erros": 0, "leituras": 0}
+
+    @classmethod
+    def configurar(cls, secoes: dict[str, Callable], timeouts: dict[str, float] | None = None) -> None:
+        """Registra as seções do dashboard: {nome: fn(db) -> valor}"""
+        cls._secoes = dict(secoes)
+        cls._timeouts = dict(timeouts or {})
+
+    @classmethod
+    def start(cls) -> None:
+        """Inicia a thread do produtor (idempotente)"""
+        with cls._lock:
+            if cls._thread is not None and cls._thread.is_alive():
+                return
+            cls._parar.clear()
+            cls._thread = threading.Thread(
+                target=cls._loop,
+                daemon=True,
+                name="MetricsSnapshotThread",
+            )
+            cls._thread.start()
+        print(f"[METRICS SNAPSHOT] Produtor iniciado (intervalo {cls.INTERVALO_MINIMO}s)")
+
+    @classmethod
+    def stop(cls) -> None:
+        cls._parar.set()
+
+    @classmethod
+    def ativo(cls) -> bool:
+        return cls._thread is not None and cls._thread.is_alive() and not cls._parar.is_set()
+
+    @classmethod
+    def get(cls) -> dict[str, dict] | None:
+        """
+        Último snapshot ({nome: {"valor", "stale", "calculado_em", "erro"}})
+        ou None se o produtor não está ativo ou o snapshot está velho demais.
+        """
+        versionado = cls._get_versionado()
+        return versionado[0] if versionado is not None else None
+
+    @classmethod
+    def _get_versionado(cls) -> tuple[dict[str, dict], str, int | None] | None:
+        """(snapshot, versão do snapshot, versão dos dados usada no cálculo)"""
+        with cls._lock:
+            snapshot, gerado_em, identificador, versao = cls._snapshot, cls._gerado_em, cls._identificador, cls._versao
+        if snapshot is None or not cls.ativo():
+            return None
+        if time.monotonic() - gerado_em > cls.IDADE_MAXIMA * 2:
+            return None
+        cls._stats["leituras"] += 1
+        return snapshot, identificador, versao
+
+    @classmethod
+    def atual(cls) -> dict[str, dict] | None:
+        """
+        Snapshot do produtor ou, sem ele, cálculo direto das seções.
+
+        None se as seções ainda não foram configuradas.
+        """
+        if not cls._secoes:
+            return None
+        snapshot = cls.get()
+        if snapshot is None:
+            snapshot = MetricsSections.calcular(cls._secoes, cls._timeouts)
+        return snapshot
+
+    @classmethod
+    def secao(cls, nome: str) -> dict | None:
+        snapshot = cls.get()
+        if snapshot is None:
+            return None
+        return snapshot.get(nome)
+
+    @classmethod
+    def secao_versionada(cls, nome: str) -> tuple[dict, str] | None:
+        """
+        Seção do snapshot e a versão do snapshot (para o ETag), lidas juntas:
+        o ETag muda exatamente quando o corpo servido muda.
+
+        A seção sai stale também se os dados mudaram depois do snapshot
+        (o produtor ainda não recalculou); a versão reflete isso.
+        """
+        versionado = cls._get_versionado()
+        # Seção indisponível no snapshot (sem valor): o endpoint calcula direto
+        if versionado is None or (versionado[0].get(nome) or {}).get("valor") is None:
+            return None
+        snapshot, versao, versao_dados = versionado
+        secao = snapshot[nome]
+        if versao_dados != DataVersion.current():
+            secao = {**secao, "stale": True}
+            versao += "d"
+        return secao, versao
+
+    @classmethod
+    def _precisa_recalcular(cls) -> bool:
+        if cls._snapshot is None:
+            return True
+        if cls._versao != DataVersion.current():
+            return True
+        return time.monotonic() - cls._gerado_em >= cls.IDADE_MAXIMA
+
+    @classmethod
+    def _loop(cls) -> None:
+        while not cls._parar.is_set():
+            try:
+                if cls._secoes and cls._precisa_recalcular():
+                    cls.recalcular()
+            except Exception as e:
+                cls._stats["erros"] += 1
+                print(f"[METRICS SNAPSHOT] Erro ao recalcular snapshot: {e}")
+            cls._parar.wait(cls.INTERVALO_MINIMO)
+
+    @classmethod
+    def recalcular(cls) -> dict[str, dict]:
+        """Recalcula todas as seções, publica o snapshot e envia aos sockets se mudou"""
+        # Versão lida antes do cálculo: escrita durante o cálculo gera novo ciclo
+        versao = DataVersion.current()
+        snapshot = MetricsSections.calcular(cls._secoes, cls._timeouts)
+
+        anterior = cls._snapshot
+        with cls._lock:
+            cls._snapshot = snapshot
+            cls._versao = versao
+            cls._gerado_em = time.monotonic()
+            cls._identificador = f"s{versao}.{int(time.time() // cls.IDADE_MAXIMA)}"
+            cls._stats["recalculos"] += 1
+
+        if anterior is None or cls._conteudo(anterior) != cls._conteudo(snapshot):
+            cls._enviar(snapshot, versao)
+        return snapshot
+
+    @staticmethod
+    def _conteudo(snapshot: dict[str, dict]) -> str:
+        """Valores das seções sem os campos de horário, para detectar mudança real"""
+        valores = {
+            nome: {
+                chave: valor
+                for chave, valor in (secao["valor"] or {}).items()
+                if chave != "timestamp"
+            } if isinstance(secao["valor"], dict) else secao["valor"]
+            for nome, secao in snapshot.items()
+        }
+        return json.dumps(valores, sort_keys=True, default=str)
+
+    @classmethod
+    def _enviar(cls, snapshot: dict[str, dict], versao: int) -> None:
+        from core.realtime import emit_broadcast_sync
+
+        payload = {
+            "versao": versao,
+            "secoes": {nome: secao["valor"] for nome, secao in snapshot.items()},
+            "timestamp": now_brazil_naive().isoformat(),
+        }
+        try:
+            emit_broadcast_sync(cls.EVENTO, payload)
+            cls._stats["envios"] += 1
+        except Exception as e:
+            print(f"[METRICS SNAPSHOT] Erro ao enviar snapshot: {e}")
+
+    @classmethod
+    def get_stats(cls) -> dict:
+        return {
+            **cls._stats,
+            "ativo": cls.ativo(),
+            "versao_snapshot": cls._versao,
+            "versao_dados": DataVersion.current(),
+            "idade_segundos": round(time.monotonic() - cls._gerado_em, 1) if cls._snapshot else None,
+        }
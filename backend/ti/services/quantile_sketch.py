@@ -0,0 +1,197 @@
+"""
+Sketch de quantis mesclável (DDSketch) para tempos de SLA
+
+Guarda contagens em faixas logarítmicas: um valor v cai na faixa
+ceil(log_gamma(v)), com gamma = (1 + alpha) / (1 - alpha). Qualquer quantil
+estimado tem erro RELATIVO de no máximo alpha (1% por padrão), sem guardar
+os valores nem ordenar a lista.
+
+Propriedades usadas pelo P90 incremental:
+- memória limitada: tempos de 0,01h a 10.000h ocupam ~700 faixas, e
+  MAX_BINS colapsa as faixas mais baixas se passar disso
+- mesclável: o sketch de 30 dias é a soma das contagens de 30 sketches
+  diários (merge exato, sem perda adicional de precisão)
+- serialização compacta em JSON (índices e contagens em listas)
+
+Referência: Masson, Rim, Lee. "DDSketch: A fast and fully-mergeable
+quantile sketch with relative-error guarantees" (VLDB 2019).
+"""
+
+from __future__ import annotations
+import math
+
+
+class DDSketch:
+    """Sketch de quantis com erro relativo garantido"""
+
+    DEFAULT_ALPHA = 0.01
+    MAX_BINS = 2048
+    # Valores abaixo disso (em horas, ~0,4s) contam como zero
+    MIN_VALUE = 1e-4
+
+    __slots__ = ("alpha", "gamma", "_log_gamma", "bins", "zero_count", "count", "min", "max", "soma")
+
+    def __init__(self, alpha: float = DEFAULT_ALPHA):
+        self.alpha = alpha
+        self.gamma = (1 + alpha) / (1 - alpha)
+        self._log_gamma = math.log(self.gamma)
+        self.bins: dict[int, int] = {}
+        self.zero_count = 0
+        self.count = 0
+        self.min = math.inf
+        self.max = -math.inf
+        self.soma = 0.0
+
+    def __len__(self) -> int:
+        return self.count
+
+    def _indice(self, valor: float) -> int:
+        return math.ceil(math.log(valor) / self._log_gamma)
+
+    def add(self, valor: float, peso: int = 1) -> None:
+        if peso <= 0:
+            return
+        if valor < self.MIN_VALUE:
+            self.zero_count += peso
+        else:
+            indice = self._indice(valor)
+            self.bins[indice] = self.bins.get(indice, 0) + peso
+            if len(self.bins) > self.MAX_BINS:
+                self._colapsar()
+        self.count += peso
+        self.soma += valor * peso
+        self.min = min(self.min, valor)
+        self.max = max(self.max, valor)
+
+    def remove(self, valor: float, peso: int = 1) -> None:
+        """
+        Desfaz um add() anterior do mesmo valor (ex.: chamado reaberto).
+
+        min/max não são recalculados e passam a ser apenas limites.
+        """
+        if peso <= 0 or self.count == 0:
+            return
+        if valor < self.MIN_VALUE:
+            self.zero_count = max(0, self.zero_count - peso)
+        else:
+            indice = self._indice(valor)
+            if indice not in self.bins:
+                # Faixa colapsada: o valor foi somado à menor faixa mantida
+                indice = min(self.bins) if self.bins else None
+            if indice is not None:
+                restante = self.bins[indice] - peso
+                if restante > 0:
+                    self.bins[indice] = restante
+                else:
+                    del self.bins[indice]
+        self.count = max(0, self.count - peso)
+        self.soma -= valor * peso
+        if self.count == 0:
+            self.bins.clear()
+            self.zero_count = 0
+            self.soma = 0.0
+            self.min = math.inf
+            self.max = -math.inf
+
+    def extend(self, valores) -> None:
+        for valor in valores:
+            self.add(valor)
+
+    def _colapsar(self) -> None:
+        """Junta as faixas mais baixas na menor faixa mantida (preserva os quantis altos)"""
+        indices = sorted(self.bins)
+        excedente = len(indices) - self.MAX_BINS
+        destino = indices[excedente]
+        for indice in indices[:excedente]:
+            self.bins[destino] += self.bins.pop(indice)
+
+    def merge(self, outro: "DDSketch") -> None:
+        if outro.count == 0:
+            return
+        if abs(outro.alpha - self.alpha) > 1e-12:
+            raise ValueError("Sketches com alpha diferente não podem ser mesclados")
+        for indice, contagem in outro.bins.items():
+            self.bins[indice] = self.bins.get(indice, 0) + contagem
+        if len(self.bins) > self.MAX_BINS:
+            self._colapsar()
+        self.zero_count += outro.zero_count
+        self.count += outro.count
+        self.soma += outro.soma
+        self.min = min(self.min, outro.min)
+        self.max = max(self.max, outro.max)
+
+    def merge_dict(self, dados: dict | None) -> None:
+        """merge() direto da forma serializada (to_dict), sem sketch intermediário"""
+        if not dados or not dados.get("n"):
+            return
+        if abs(dados.get("a", self.DEFAULT_ALPHA) - self.alpha) > 1e-12:
+            raise ValueError("Sketches com alpha diferente não podem ser mesclados")
+        bins = self.bins
+        for indice, contagem in zip(dados["k"], dados["c"]):
+            bins[indice] = bins.get(indice, 0) + contagem
+        if len(bins) > self.MAX_BINS:
+            self._colapsar()
+        self.zero_count += dados.get("z", 0)
+        self.count += dados["n"]
+        self.soma += dados.get("s", 0.0)
+        self.min = min(self.min, dados.get("min", 0.0))
+        self.max = max(self.max, dados.get("max", 0.0))
+
+    def quantile(self, q: float) -> float:
+        """Quantil q (0..1) com erro relativo <= alpha; 0.0 se vazio"""
+        if self.count == 0:
+            return 0.0
+        if q <= 0:
+            return float(self.min)
+        if q >= 1:
+            return float(self.max)
+
+        # Mesmo critério de posição do cálculo por lista ordenada: int(q * (n - 1))
+        rank = int(q * (self.count - 1))
+        acumulado = self.zero_count
+        if rank < acumulado:
+            return 0.0
+        for indice in sorted(self.bins):
+            acumulado += self.bins[indice]
+            if rank < acumulado:
+                valor = 2 * self.gamma ** indice / (self.gamma + 1)
+                return float(min(max(valor, self.min), self.max))
+        return float(self.max)
+
+    @property
+    def media(self) -> float:
+        return self.soma / self.count if self.count else 0.0
+
+    def to_dict(self) -> dict:
+        indices = sorted(self.bins)
+        return {
+            "a": self.alpha,
+            "k": indices,
+            "c": [self.bins[i] for i in indices],
+            "z": self.zero_count,
+            "n": self.count,
+            "min": self.min if self.count else None,
+            "max": self.max if self.count else None,
+            "s": round(self.soma, 6),
+        }
+
+    @classmethod
+    def from_dict(cls, dados: dict | None) -> "DDSketch":
+        sketch = cls(dados.get("a", cls.DEFAULT_ALPHA) if dados else cls.DEFAULT_ALPHA)
+        if not dados:
+            return sketch
+        sketch.bins = dict(zip(dados.get("k", []), dados.get("c", [])))
+        sketch.zero_count = dados.get("z", 0)
+        sketch.count = dados.get("n", 0)
+        sketch.soma = dados.get("s", 0.0)
+        if sketch.count:
+            sketch.min = dados.get("min", 0.0)
+            sketch.max = dados.get("max", 0.0)
+        return sketch
+
+    @classmethod
+    def merged(cls, sketches, alpha: float = DEFAULT_ALPHA) -> "DDSketch":
+        resultado = cls(alpha)
+        for sketch in sketches:
+            resultado.merge(sketch)
+        return resultado
@@ -2,57 +2,33 @@ from __future__ import annotations
 from datetime import datetime, time, timedelta
 from sqlalchemy.orm import Session
 from sqlalchemy import and_, or_
-from ti.models.sla_config import SLAConfiguration, SLABusinessHours, HistoricoSLA
+from ti.models.sla_config import SLAConfiguration, HistoricoSLA
 from ti.models.historico_status import HistoricoStatus
 from ti.models.chamado import Chamado
+from ti.services.sla_calendar import BusinessHoursSnapshot, SLACalendarIndex, DEFAULT_BUSINESS_HOURS
+from ti.services.sla_business_hours import HolidayCalendar
 from core.utils import now_brazil_naive
 
 
 class SLACalculator:
-    DEFAULT_BUSINESS_HOURS = {
-        0: ("08:00", "18:00"),
-        1: ("08:00", "18:00"),
-        2: ("08:00", "18:00"),
-        3: ("08:00", "18:00"),
-        4: ("08:00", "18:00"),
-    }
+    DEFAULT_BUSINESS_HOURS = DEFAULT_BUSINESS_HOURS
 
     @staticmethod
     def get_business_hours(db: Session, dia_semana: int) -> tuple[str, str] | None:
-        try:
-            bh = db.query(SLABusinessHours).filter(
-                and_(
-                    SLABusinessHours.dia_semana == dia_semana,
-                    SLABusinessHours.ativo == True
-                )
-            ).first()
-            if bh:
-                return (bh.hora_inicio, bh.hora_fim)
-        except Exception:
-            pass
-        return SLACalculator.DEFAULT_BUSINESS_HOURS.get(dia_semana)
+        """Horário do dia da semana lido do snapshot versionado (sem query por chamada)"""
+        return BusinessHoursSnapshot.get(db, dia_semana)
 
     @staticmethod
-    def is_business_day(data: datetime) -> bool:
-        return data.weekday() < 5
+    def is_business_day(data: datetime, db: Session | None = None) -> bool:
+        """Dia útil: segunda a sexta e fora de feriados (bitmap anual compilado)"""
+        return HolidayCalendar.is_business_day(data, db)
 
     @staticmethod
     def is_business_time(dt: datetime, db: Session | None = None) -> bool:
-        if not SLACalculator.is_business_day(dt):
-            return False
-
-        bh = None
-        if db:
-            bh = SLACalculator.get_business_hours(db, dt.weekday())
-        else:
-            bh = SLACalculator.DEFAULT_BUSINESS_HOURS.get(dt.weekday())
-
-        if not bh:
+        if not SLACalculator.is_business_day(dt, db):
             return False
 
-        hora_inicio = datetime.strptime(bh[0], "%H:%M").time()
-        hora_fim = datetime.strptime(bh[1], "%H:%M").time()
-        return hora_inicio <= dt.time() <= hora_fim
+        return SLACalendarIndex.get(db).is_business_time(dt)
 
     @staticmethod
     def calculate_business_hours_excluding_paused(
@@ -66,9 +42,9 @@ class SLACalculator:
         Calcula horas de NEGÓCIO excluindo períodos em "Em análise".
 
         Lógica:
-        1. Calcula horas de negócio total (start até end)
-        2. Identifica períodos onde status = "Em análise"
-        3. Subtrai horas em "Em análise" do total
+        1. Busca os períodos onde status = "Em análise"
+        2. Une períodos sobrepostos/adjacentes e recorta em [start, end]
+        3. Calcula o tempo líquido em uma única passada no calendário
 
         Parâmetro historicos_cache: dict {chamado_id: [historicos]}
         Se fornecido, evita queries ao banco (otimização para bulk)
@@ -78,91 +54,104 @@ class SLACalculator:
         if start >= end:
             return 0.0
 
-        # 1. Calcula tempo total em horas de negócio
-        tempo_total = SLACalculator.calculate_business_hours(start, end, db)
-
-        # 2. Busca períodos em "Em análise"
-        from ti.models.historico_status import HistoricoStatus
-
         if historicos_cache and chamado_id in historicos_cache:
             # Usa cache se disponível (bulk operation)
-            historicos_analise = [
-                h for h in historicos_cache[chamado_id]
-                if h.status.lower() in ["em análise", "em analise"]
-                and h.data_inicio and h.data_fim
-                and h.data_inicio >= start
-                and h.data_fim <= end
-            ]
+            pausas = SLACalculator.paused_intervals_from_historicos(historicos_cache[chamado_id])
         else:
-            # Query ao banco (operação individual)
-            historicos_analise = db.query(HistoricoStatus).filter(
+            # Query ao banco (operação individual): apenas colunas, sem ORM
+            pausas = db.query(
+                HistoricoStatus.data_inicio,
+                HistoricoStatus.data_fim,
+            ).filter(
                 and_(
                     HistoricoStatus.chamado_id == chamado_id,
                     HistoricoStatus.status.in_(["Em análise", "Em Análise"]),
                     HistoricoStatus.data_inicio.isnot(None),
                     HistoricoStatus.data_fim.isnot(None),
-                    HistoricoStatus.data_inicio >= start,
-                    HistoricoStatus.data_fim <= end,
+                    HistoricoStatus.data_inicio < end,
+                    HistoricoStatus.data_fim > start,
                 )
             ).all()
 
-        # 3. Subtrai horas em "Em análise"
-        tempo_analise_total = 0.0
-        for hist in historicos_analise:
-            if hist.data_inicio and hist.data_fim:
-                tempo_analise = SLACalculator.calculate_business_hours(
-                    hist.data_inicio,
-                    hist.data_fim,
-                    db
-                )
-                tempo_analise_total += tempo_analise
-
-        # Retorna tempo total menos pausa
-        tempo_sla = tempo_total - tempo_analise_total
-        return max(0, tempo_sla)  # Nunca negativo
+        segundos = SLACalendarIndex.get(db).net_business_seconds(start, end, pausas)
+        return (segundos // 60) / 60.0
 
     @staticmethod
     def calculate_business_hours(start: datetime, end: datetime, db: Session | None = None) -> float:
+        """
+        Calcula horas de negócio entre start e end.
+
+        Usa o índice de calendário pré-compilado (SLACalendarIndex): duas
+        consultas e uma subtração, sem loop por dia e sem queries por dia.
+        """
         if start >= end:
             return 0.0
 
-        total_minutes = 0
-        current = start
-
-        while current < end:
-            next_day = (current + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+        return SLACalendarIndex.get(db).business_hours(start, end)
 
-            if not SLACalculator.is_business_day(current):
-                current = next_day
-                continue
+    @staticmethod
+    def calculate_business_hours_many(
+        starts: list[datetime],
+        ends: list[datetime],
+        paused_intervals: list[list[tuple[datetime, datetime]] | None] | None = None,
+        db: Session | None = None,
+    ) -> list[float]:
+        """
+        Calcula horas de negócio para vários intervalos de uma vez.
 
-            bh = None
-            if db:
-                bh = SLACalculator.get_business_hours(db, current.weekday())
-            else:
-                bh = SLACalculator.DEFAULT_BUSINESS_HOURS.get(current.weekday())
+        Equivalente a chamar calculate_business_hours (sem pausas) ou
+        calculate_business_hours_excluding_paused (com pausas) para cada
+        posição, mas com um único acesso ao índice de calendário e sem
+        queries por chamado.
 
-            if not bh:
-                current = next_day
-                continue
+        Parâmetro paused_intervals: lista alinhada com starts/ends; cada item
+        é a lista de períodos (inicio, fim) em "Em análise" do chamado (ver
+        get_paused_intervals_bulk). Os períodos são unidos e recortados em
+        [start, end], como na versão escalar.
 
-            hora_inicio = datetime.strptime(bh[0], "%H:%M").time()
-            hora_fim = datetime.strptime(bh[1], "%H:%M").time()
+        Retorna: lista de horas (float) na mesma ordem da entrada
+        """
+        segundos = SLACalendarIndex.get(db).business_seconds_many(starts, ends, paused_intervals or None)
+        return [(s // 60) / 60.0 for s in segundos]
 
-            day_start = current.replace(hour=hora_inicio.hour, minute=hora_inicio.minute, second=0, microsecond=0)
-            day_end = current.replace(hour=hora_fim.hour, minute=hora_fim.minute, second=0, microsecond=0)
+    @staticmethod
+    def paused_intervals_from_historicos(historicos: list[HistoricoStatus]) -> list[tuple[datetime, datetime]]:
+        """Extrai os períodos (inicio, fim) em "Em análise" de uma lista de históricos"""
+        return [
+            (h.data_inicio, h.data_fim)
+            for h in historicos
+            if h.status and h.status.lower() in ["em análise", "em analise"]
+            and h.data_inicio and h.data_fim
+        ]
 
-            if current < day_start:
-                current = day_start
+    @staticmethod
+    def get_paused_intervals_bulk(db: Session, chamado_ids: list[int]) -> dict[int, list[tuple[datetime, datetime]]]:
+        """
+        Carrega, em uma única query, os períodos em "Em análise" dos chamados.
 
-            if end <= day_end:
-                total_minutes += int((end - current).total_seconds() / 60)
-                break
-            else:
-                total_minutes += int((day_end - current).total_seconds() / 60)
-                current = next_day
+        Retorna: {chamado_id: [(data_inicio, data_fim), ...]}
+        """
+        resultado: dict[int, list[tuple[datetime, datetime]]] = {}
+        if not chamado_ids:
+            return resultado
+
+        rows = db.query(
+            HistoricoStatus.chamado_id,
+            HistoricoStatus.status,
+            HistoricoStatus.data_inicio,
+            HistoricoStatus.data_fim,
+        ).filter(
+            and_(
+                HistoricoStatus.chamado_id.in_(chamado_ids),
+                HistoricoStatus.status.in_(["Em análise", "Em Análise"]),
+                HistoricoStatus.data_inicio.isnot(None),
+                HistoricoStatus.data_fim.isnot(None),
+            )
+        ).all()
 
-        return total_minutes / 60.0
+        for chamado_id, status, data_inicio, data_fim in rows:
+            resultado.setdefault(chamado_id, []).append((data_inicio, data_fim))
+        return resultado
 
     @staticmethod
     def get_sla_config_by_priority(db: Session, prioridade: str) -> SLAConfiguration | None:
@@ -258,44 +247,185 @@ class SLACalculator:
 
         Retorna status com novo sistema de estados.
         """
-        from ti.services.sla_status import SLAStatus, SLAStatusDeterminer, SLAResponseMetric, SLAResolutionMetric
-
         sla_config = SLACalculator.get_sla_config_by_priority(db, chamado.prioridade)
 
         if not sla_config:
-            return {
-                "chamado_id": chamado.id,
-                "prioridade": chamado.prioridade,
-                "status_chamado": chamado.status,
-                "resposta_metric": None,
-                "resolucao_metric": None,
-                "status_geral": SLAStatus.SEM_SLA.value,
-                "data_abertura": chamado.data_abertura,
-                "data_primeira_resposta": None,
-                "data_conclusao": None,
-            }
-
-        data_abertura = chamado.data_abertura
-        if not data_abertura:
-            data_abertura = now_brazil_naive()
+            return SLACalculator._sla_status_sem_config(chamado)
+
         agora = now_brazil_naive()
-        is_closed = chamado.status in SLAStatusDeterminer.CLOSED_STATUSES
+        data_abertura, fim_resposta, fim_resolucao = SLACalculator._sla_intervals(chamado, agora)
 
         # ===== MÉTRICA DE RESPOSTA (SLA de Resposta) =====
         tempo_resposta_horas = 0
-        data_primeira_resposta = chamado.data_primeira_resposta
-        resposta_metric = None
-
-        if data_primeira_resposta:
-            # Já houve resposta
+        if fim_resposta:
             tempo_resposta_horas = SLACalculator.calculate_business_hours(
-                data_abertura, data_primeira_resposta, db
+                data_abertura, fim_resposta, db
             )
+
+        # ===== MÉTRICA DE RESOLUÇÃO (SLA de Resolução) =====
+        # Leitura O(1) do relógio materializado; sem relógio, recalcula pelo
+        # histórico descontando tempo em "Em análise"
+        from ti.services.sla_clock import SLAClock
+
+        tempo_resolucao_horas = SLAClock.tempo_resolucao_horas(db, chamado.id, agora)
+        if tempo_resolucao_horas is None:
+            tempo_resolucao_horas = SLACalculator.calculate_business_hours_excluding_paused(
+                chamado.id, data_abertura, fim_resolucao, db
+            )
+
+        return SLACalculator._montar_sla_status(
+            chamado, sla_config, data_abertura, tempo_resposta_horas, tempo_resolucao_horas
+        )
+
+    @staticmethod
+    def get_sla_status_many(db: Session, chamado_ids: list[int]) -> dict[int, dict]:
+        """
+        Calcula o status de SLA de vários chamados de uma vez.
+
+        Mesmo resultado de get_sla_status para cada chamado, com número
+        constante de queries: chamados, configurações, relógios de SLA e
+        períodos em "Em análise" (um IN cada), e tempos calculados em lote.
+
+        Retorna: {chamado_id: status} (ids inexistentes ou deletados ficam de fora)
+        """
+        from ti.services.sla_clock import SLAClock
+
+        ids = list(dict.fromkeys(chamado_ids))
+        if not ids:
+            return {}
+
+        chamados = db.query(Chamado).filter(
+            and_(
+                Chamado.id.in_(ids),
+                Chamado.deletado_em.is_(None),
+            )
+        ).all()
+
+        sla_configs = {
+            config.prioridade: config
+            for config in db.query(SLAConfiguration).filter(
+                SLAConfiguration.ativo == True
+            ).all()
+        }
+
+        resultado: dict[int, dict] = {}
+        com_config = []
+        for chamado in chamados:
+            if chamado.prioridade in sla_configs:
+                com_config.append(chamado)
+            else:
+                resultado[chamado.id] = SLACalculator._sla_status_sem_config(chamado)
+
+        if not com_config:
+            return resultado
+
+        agora = now_brazil_naive()
+        intervalos = [SLACalculator._sla_intervals(c, agora) for c in com_config]
+
+        # Resposta: um lote no calendário
+        tempos_resposta = SLACalculator.calculate_business_hours_many(
+            [abertura for abertura, _, _ in intervalos],
+            [fim_resposta for _, fim_resposta, _ in intervalos],
+            db=db,
+        )
+
+        # Resolução: relógio materializado quando existe, senão lote com pausas
+        clocks = SLAClock.get_many(db, [c.id for c in com_config])
+        sem_clock = [
+            (idx, chamado) for idx, chamado in enumerate(com_config)
+            if chamado.id not in clocks
+        ]
+        tempos_resolucao = [0.0] * len(com_config)
+        for idx, chamado in enumerate(com_config):
+            clock = clocks.get(chamado.id)
+            if clock is not None:
+                tempos_resolucao[idx] = int(SLAClock.minutos_decorridos(clock, agora, db) + 1e-6) / 60.0
+
+        if sem_clock:
+            pausas_por_chamado = SLACalculator.get_paused_intervals_bulk(
+                db, [chamado.id for _, chamado in sem_clock]
+            )
+            calculados = SLACalculator.calculate_business_hours_many(
+                [intervalos[idx][0] for idx, _ in sem_clock],
+                [intervalos[idx][2] for idx, _ in sem_clock],
+                [pausas_por_chamado.get(chamado.id) for _, chamado in sem_clock],
+                db,
+            )
+            for (idx, _), tempo in zip(sem_clock, calculados):
+                tempos_resolucao[idx] = tempo
+
+        for chamado, (abertura, _, _), tempo_resposta, tempo_resolucao in zip(
+            com_config, intervalos, tempos_resposta, tempos_resolucao
+        ):
+            resultado[chamado.id] = SLACalculator._montar_sla_status(
+                chamado,
+                sla_configs[chamado.prioridade],
+                abertura,
+                tempo_resposta,
+                tempo_resolucao,
+            )
+
+        return resultado
+
+    @staticmethod
+    def _sla_status_sem_config(chamado: Chamado) -> dict:
+        from ti.services.sla_status import SLAStatus
+
+        return {
+            "chamado_id": chamado.id,
+            "prioridade": chamado.prioridade,
+            "status_chamado": chamado.status,
+            "resposta_metric": None,
+            "resolucao_metric": None,
+            "status_geral": SLAStatus.SEM_SLA.value,
+            "data_abertura": chamado.data_abertura,
+            "data_primeira_resposta": None,
+            "data_conclusao": None,
+        }
+
+    @staticmethod
+    def _sla_intervals(chamado: Chamado, agora: datetime) -> tuple[datetime, datetime | None, datetime]:
+        """
+        Intervalos usados no cálculo de SLA do chamado.
+
+        Retorna (data_abertura, fim_resposta, fim_resolucao). fim_resposta é
+        None quando o chamado foi fechado sem resposta (tempo de resposta 0).
+        """
+        from ti.services.sla_status import SLAStatusDeterminer
+
+        data_abertura = chamado.data_abertura or agora
+
+        if chamado.data_primeira_resposta:
+            # Já houve resposta
+            fim_resposta = chamado.data_primeira_resposta
         elif chamado.status not in SLAStatusDeterminer.CLOSED_STATUSES:
             # Ainda não respondeu, calcular até agora
-            tempo_resposta_horas = SLACalculator.calculate_business_hours(
-                data_abertura, agora, db
-            )
+            fim_resposta = agora
+        else:
+            fim_resposta = None
+
+        if chamado.status not in SLAStatusDeterminer.PAUSED_STATUSES:
+            fim_resolucao = chamado.data_conclusao or agora
+        else:
+            # Pausado: não conta tempo desde abertura até agora
+            fim_resolucao = agora
+
+        return data_abertura, fim_resposta, fim_resolucao
+
+    @staticmethod
+    def _montar_sla_status(
+        chamado: Chamado,
+        sla_config: SLAConfiguration,
+        data_abertura: datetime,
+        tempo_resposta_horas: float,
+        tempo_resolucao_horas: float,
+    ) -> dict:
+        """Monta o dict de status de SLA a partir dos tempos já calculados"""
+        from ti.services.sla_status import SLAStatusDeterminer, SLAResponseMetric, SLAResolutionMetric
+
+        is_closed = chamado.status in SLAStatusDeterminer.CLOSED_STATUSES
+        data_primeira_resposta = chamado.data_primeira_resposta
+        data_conclusao = chamado.data_conclusao
 
         resposta_status = SLAStatusDeterminer.determine_status(
             chamado.status,
@@ -312,23 +442,6 @@ class SLACalculator:
             status=resposta_status
         )
 
-        # ===== MÉTRICA DE RESOLUÇÃO (SLA de Resolução) =====
-        tempo_resolucao_horas = 0
-        data_conclusao = chamado.data_conclusao
-        resolucao_metric = None
-
-        # Desconta tempo em "Em análise" para chamados não pausados
-        if chamado.status not in SLAStatusDeterminer.PAUSED_STATUSES:
-            data_final = data_conclusao if data_conclusao else agora
-            tempo_resolucao_horas = SLACalculator.calculate_business_hours_excluding_paused(
-                chamado.id, data_abertura, data_final, db
-            )
-        else:
-            # Pausado: não conta tempo desde abertura até agora
-            tempo_resolucao_horas = SLACalculator.calculate_business_hours_excluding_paused(
-                chamado.id, data_abertura, agora, db
-            )
-
         resolucao_status = SLAStatusDeterminer.determine_status(
             chamado.status,
             tempo_resolucao_horas,
@@ -13,11 +13,11 @@ Total business hours = Sum of hours within business time windows,
 excluding weekends, holidays, and after-hours.
 """
 
-from datetime import datetime, time, timedelta
+import threading
+import time as _time
+from datetime import date as date_type, datetime, time, timedelta
 from typing import Optional, List, Set, Tuple
 from sqlalchemy.orm import Session
-from sqlalchemy import and_
-from ti.models.sla_config import SLABusinessHours
 from core.utils import now_brazil_naive
 
 
@@ -37,11 +37,13 @@ class BrazilianHolidays:
         (12, 25),  # Christmas
     }
     
-    # Moving holidays need calculation
-    # Easter-based (good Friday is 2 days before Easter)
-    # Carnival is 47 days before Easter
-    # Corpus Christi is 60 days after Easter
-    # All Souls' Day is 1 day after All Saints' Day (Nov 1)
+    # Moving holidays (offset in days from Easter Sunday)
+    MOVING_HOLIDAYS = {
+        -48: "Carnaval (segunda-feira)",
+        -47: "Carnaval (terça-feira)",
+        -2: "Sexta-feira Santa",
+        60: "Corpus Christi",
+    }
     
     @staticmethod
     def is_fixed_holiday(date: datetime) -> bool:
@@ -49,10 +51,143 @@ class BrazilianHolidays:
         return (date.month, date.day) in BrazilianHolidays.FIXED_HOLIDAYS
     
     @staticmethod
-    def get_holidays_for_year(year: int) -> Set[Tuple[int, int]]:
-        """Retorna todos os feriados do ano (não implementado plenamente)"""
-        # Implementação simplificada com apenas feriados fixos
-        return BrazilianHolidays.FIXED_HOLIDAYS
+    def easter_sunday(year: int) -> date_type:
+        """Domingo de Páscoa (algoritmo de Meeus/Jones/Butcher, calendário gregoriano)"""
+        a = year % 19
+        b, c = divmod(year, 100)
+        d, e = divmod(b, 4)
+        f = (b + 8) // 25
+        g = (b - f + 1) // 3
+        h = (19 * a + b - d - g + 15) % 30
+        i, k = divmod(c, 4)
+        l = (32 + 2 * e + 2 * i - h - k) % 7
+        m = (a + 11 * h + 22 * l) // 451
+        month, day = divmod(h + l - 7 * m + 114, 31)
+        return date_type(year, month, day + 1)
+    
+    @staticmethod
+    def get_moving_holidays(year: int) -> Set[date_type]:
+        """Feriados móveis derivados da Páscoa (Carnaval, Sexta-feira Santa, Corpus Christi)"""
+        easter = BrazilianHolidays.easter_sunday(year)
+        return {easter + timedelta(days=offset) for offset in BrazilianHolidays.MOVING_HOLIDAYS}
+    
+    @staticmethod
+    def get_holidays_for_year(year: int) -> Set[date_type]:
+        """Retorna todos os feriados nacionais do ano (fixos + móveis)"""
+        fixed = {date_type(year, month, day) for month, day in BrazilianHolidays.FIXED_HOLIDAYS}
+        return fixed | BrazilianHolidays.get_moving_holidays(year)
+
+
+class HolidayCalendar:
+    """
+    Calendário anual compilado de dias úteis.
+    
+    Para cada ano é montado um bitmap (int) onde o bit N indica se o dia N
+    do ano (0 = 1º de janeiro) é útil: segunda a sexta, fora dos feriados
+    nacionais (fixos e móveis) e dos feriados ativos de sla_feriados.
+    
+    - Bitmaps memoizados por ano
+    - Feriados do banco recarregados após RELOAD_SECONDS (outros workers)
+    - invalidate() chamado pelos endpoints de CRUD de feriados
+    """
+    
+    RELOAD_SECONDS = 5 * 60
+    
+    _bitmaps: dict[int, int] = {}
+    _feriados_db: frozenset[date_type] = frozenset()
+    _loaded_at: Optional[float] = None
+    _version: int = 0
+    _lock = threading.Lock()
+    
+    @staticmethod
+    def compile_year(year: int, feriados: Set[date_type] | frozenset[date_type] = frozenset()) -> int:
+        """Monta o bitmap de dias úteis do ano"""
+        holidays = BrazilianHolidays.get_holidays_for_year(year)
+        holidays |= {d for d in feriados if d.year == year}
+        
+        primeiro = date_type(year, 1, 1).toordinal()
+        total_dias = date_type(year, 12, 31).toordinal() - primeiro + 1
+        
+        bitmap = 0
+        for i in range(total_dias):
+            dia = date_type.fromordinal(primeiro + i)
+            if dia.weekday() < 5 and dia not in holidays:
+                bitmap |= 1 << i
+        return bitmap
+    
+    @classmethod
+    def load_feriados(cls, db: Optional[Session] = None) -> frozenset[date_type]:
+        """
+        Retorna os feriados ativos de sla_feriados.
+        
+        Com sessão de banco, recarrega quando a cópia local expirou ou foi
+        invalidada; sem sessão, devolve a última cópia carregada.
+        """
+        if db is None:
+            return cls._feriados_db
+        
+        loaded_at = cls._loaded_at
+        if loaded_at is not None and _time.monotonic() - loaded_at < cls.RELOAD_SECONDS:
+            return cls._feriados_db
+        
+        from ti.models.sla_config import SLAFeriado
+        
+        feriados = set()
+        try:
+            for feriado in db.query(SLAFeriado).filter(SLAFeriado.ativo == True).all():
+                try:
+                    feriados.add(date_type.fromisoformat(feriado.data))
+                except (TypeError, ValueError):
+                    print(f"[SLA HOLIDAYS] Data de feriado inválida ignorada: {feriado.data}")
+        except Exception as e:
+            print(f"[SLA HOLIDAYS] Erro ao carregar feriados: {e}")
+            return cls._feriados_db
+        
+        with cls._lock:
+            if frozenset(feriados) != cls._feriados_db:
+                cls._feriados_db = frozenset(feriados)
+                cls._bitmaps = {}
+            cls._loaded_at = _time.monotonic()
+        return cls._feriados_db
+    
+    @classmethod
+    def get_bitmap(cls, year: int, db: Optional[Session] = None) -> int:
+        """Bitmap de dias úteis do ano (memoizado)"""
+        feriados = cls.load_feriados(db)
+        bitmap = cls._bitmaps.get(year)
+        if bitmap is None:
+            bitmap = cls.compile_year(year, feriados)
+            with cls._lock:
+                if cls._feriados_db is feriados:
+                    cls._bitmaps[year] = bitmap
+        return bitmap
+    
+    @classmethod
+    def is_business_day(cls, dia: date_type | datetime, db: Optional[Session] = None) -> bool:
+        """Teste de bit O(1) no bitmap do ano"""
+        bitmap = cls.get_bitmap(dia.year, db)
+        return bool((bitmap >> (dia.timetuple().tm_yday - 1)) & 1)
+    
+    @classmethod
+    def is_holiday(cls, dia: date_type | datetime, db: Optional[Session] = None) -> bool:
+        """Feriado = dia de semana que não é útil no calendário compilado"""
+        return dia.weekday() < 5 and not cls.is_business_day(dia, db)
+    
+    @classmethod
+    def invalidate(cls) -> None:
+        """Descarta bitmaps e feriados carregados (chamar após alterar sla_feriados)"""
+        with cls._lock:
+            cls._bitmaps = {}
+            cls._loaded_at = None
+            cls._version += 1
+    
+    @classmethod
+    def get_stats(cls) -> dict:
+        return {
+            "versao": cls._version,
+            "anos_compilados": sorted(cls._bitmaps),
+            "feriados_banco": len(cls._feriados_db),
+        }
 
 
 class BusinessHoursCalculator:
@@ -81,21 +216,14 @@ class BusinessHoursCalculator:
         return time(int(parts[0]), int(parts[1]))
     
     @staticmethod
-    def is_business_day(date: datetime) -> bool:
+    def is_business_day(date: datetime, db: Optional[Session] = None) -> bool:
         """
         Verifica se é dia de negócio (não é fim de semana nem feriado).
         
-        weekday(): 0=Monday, 6=Sunday
+        Consulta o calendário compilado (HolidayCalendar): feriados fixos,
+        móveis e cadastrados em sla_feriados.
         """
-        # Não é fin de semana
-        if date.weekday() >= 5:
-            return False
-        
-        # Não é feriado
-        if BrazilianHolidays.is_fixed_holiday(date):
-            return False
-        
-        return True
+        return HolidayCalendar.is_business_day(date, db)
     
     @staticmethod
     def get_business_hours_for_day(
@@ -105,39 +233,24 @@ class BusinessHoursCalculator:
         """
         Retorna horário de negócio para um dia específico.
         
+        Lê a configuração do snapshot compilado do motor de calendário
+        (SLACalendarIndex), sem query por dia.
+        
         Retorna: (hora_inicio, hora_fim) ou None se não é dia útil
         """
+        from ti.services.sla_calendar import SLACalendarIndex
+        
         # Se não é dia de negócio, retorna None
-        if not BusinessHoursCalculator.is_business_day(date):
+        if not BusinessHoursCalculator.is_business_day(date, db):
             return None
         
-        weekday = date.weekday()
-        
-        # Tenta carregar do banco se disponível
-        if db:
-            try:
-                bh = db.query(SLABusinessHours).filter(
-                    and_(
-                        SLABusinessHours.dia_semana == weekday,
-                        SLABusinessHours.ativo == True
-                    )
-                ).first()
-                
-                if bh:
-                    inicio = BusinessHoursCalculator._parse_time(bh.hora_inicio)
-                    fim = BusinessHoursCalculator._parse_time(bh.hora_fim)
-                    return (inicio, fim)
-            except Exception:
-                pass
-        
-        # Usa default
-        default = BusinessHoursCalculator.DEFAULT_BUSINESS_HOURS.get(weekday)
-        if default:
-            inicio = BusinessHoursCalculator._parse_time(default[0])
-            fim = BusinessHoursCalculator._parse_time(default[1])
-            return (inicio, fim)
+        horario = SLACalendarIndex.get(db).horarios.get(date.weekday())
+        if not horario:
+            return None
         
-        return None
+        inicio = BusinessHoursCalculator._parse_time(horario[0])
+        fim = BusinessHoursCalculator._parse_time(horario[1])
+        return (inicio, fim)
     
     @staticmethod
     def calculate_business_hours(
@@ -148,6 +261,9 @@ class BusinessHoursCalculator:
         """
         Calcula horas de negócio entre duas datas.
         
+        Delega ao motor único de calendário (SLACalendarIndex), o mesmo
+        usado por SLACalculator: mesmas regras de feriado e arredondamento.
+        
         Args:
             start: Data/hora inicial
             end: Data/hora final
@@ -156,56 +272,12 @@ class BusinessHoursCalculator:
         Returns:
             Horas de negócio (float)
         """
+        from ti.services.sla_calendar import SLACalendarIndex
+        
         if start >= end:
             return 0.0
         
-        total_minutes = 0
-        current = start
-        
-        # Itera por cada dia
-        while current < end:
-            # Próximo dia às 00:00
-            next_day = (current + timedelta(days=1)).replace(
-                hour=0, minute=0, second=0, microsecond=0
-            )
-            
-            # Verifica se é dia de negócio
-            business_hours = BusinessHoursCalculator.get_business_hours_for_day(current, db)
-            if not business_hours:
-                # Não é dia útil, pula para próximo dia
-                current = next_day
-                continue
-            
-            # Horários de negócio para este dia
-            day_start_time, day_end_time = business_hours
-            
-            # Converte para datetime
-            day_start = current.replace(
-                hour=day_start_time.hour,
-                minute=day_start_time.minute,
-                second=0,
-                microsecond=0
-            )
-            day_end = current.replace(
-                hour=day_end_time.hour,
-                minute=day_end_time.minute,
-                second=0,
-                microsecond=0
-            )
-            
-            # Ajusta limites ao intervalo de negócio
-            period_start = max(current, day_start)
-            period_end = min(end, day_end, next_day)
-            
-            # Calcula minutos neste período
-            if period_start < period_end:
-                delta = period_end - period_start
-                total_minutes += int(delta.total_seconds() / 60)
-            
-            # Move para próximo dia
-            current = next_day
-        
-        return total_minutes / 60.0
+        return SLACalendarIndex.get(db).business_hours(start, end)
     
     @staticmethod
     def calculate_business_hours_between(
@@ -235,7 +307,7 @@ class BusinessHoursCalculator:
         current = start.replace(hour=0, minute=0, second=0, microsecond=0)
         
         while current.date() <= end.date():
-            is_business_day = BusinessHoursCalculator.is_business_day(current)
+            is_business_day = BusinessHoursCalculator.is_business_day(current, db)
             
             if is_business_day:
                 dias_úteis += 1
@@ -1,29 +1,65 @@
 from __future__ import annotations
+from collections import OrderedDict
 from datetime import datetime, timedelta
-from typing import Any, Optional
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Optional
 import json
+import os
 import threading
 from sqlalchemy.orm import Session
-from sqlalchemy import and_
+from sqlalchemy import and_, or_
 from sqlalchemy.exc import IntegrityError
 from core.utils import now_brazil_naive
+from ti.services.cache_codec import CacheCodec
+from ti.services.cache_invalidation_bus import CacheInvalidationBus
 import hashlib
 
 
 class SLACacheEntry:
     """Representa uma entrada de cache com TTL e metadata"""
-    def __init__(self, key: str, value: Any, ttl_seconds: int = 3600):
+
+    # Custo fixo estimado por entrada (objeto, chave no dict, metadata)
+    OVERHEAD_BYTES = 200
+
+    def __init__(
+        self,
+        key: str,
+        value: Any,
+        ttl_seconds: int = 3600,
+        size_bytes: int | None = None,
+        tags: dict[str, frozenset[str]] | None = None,
+    ):
         self.key = key
         self.value = value
+        # Dependências ({dimensão: valores}); None = sem tags
+        self.tags = tags
         self.created_at = datetime.now()
         self.ttl_seconds = ttl_seconds
         self.access_count = 0
         self.last_accessed = datetime.now()
+        # Invalidada: não serve como valor atual, mas ainda serve como
+        # valor stale para get_or_compute até expirar
+        self.stale = False
+        if size_bytes is None:
+            size_bytes = SLACacheEntry.estimate_size(value)
+        self.size_bytes = size_bytes + len(key) + SLACacheEntry.OVERHEAD_BYTES
+
+    @staticmethod
+    def estimate_size(value: Any) -> int:
+        """Tamanho aproximado do valor (bytes do JSON serializado)"""
+        if isinstance(value, str):
+            return len(value)
+        try:
+            return len(json.dumps(value, default=str))
+        except Exception:
+            return 1024
+
+    def age_seconds(self) -> float:
+        return (datetime.now() - self.created_at).total_seconds()
 
     def is_expired(self) -> bool:
         """Verifica se o cache expirou"""
-        age = (datetime.now() - self.created_at).total_seconds()
-        return age > self.ttl_seconds
+        return self.age_seconds() > self.ttl_seconds
 
     def touch(self):
         """Atualiza timestamp de último acesso"""
@@ -35,9 +71,14 @@ class SLACacheManager:
     """
     Gerenciador de cache robusto para SLA com:
     - Estratégia unificada: Memória é primária, DB é fallback/persistência
-    - Cache em memória com TTL
-    - Persistência em banco de dados como recuperação
-    - Invalidação inteligente por padrão
+    - Cache em memória com TTL, limitado por entradas e bytes (LRU)
+    - Persistência em banco de dados como recuperação (write-behind: fila
+      em memória gravada em lote por uma thread, sem round-trips no caller)
+    - Invalidação por chave, prefixo e tags de dependência (mês,
+      prioridade, unidade, janela): a mudança de um chamado só invalida as
+      entradas cujas tags cruzam com os atributos dele
+    - get_or_compute: stale-while-revalidate com um único cálculo por chave
+    - Invalidações propagadas aos outros workers (CacheInvalidationBus)
     - Batch operations
 
     Garantias:
@@ -46,10 +87,82 @@ class SLACacheManager:
     3. Invalidação automática ao fazer mudanças
     """
 
-    # Cache em memória (primário)
-    _memory_cache: dict[str, SLACacheEntry] = {}
+    # Cache em memória (primário): LRU limitado por entradas e por bytes.
+    # A ordem do OrderedDict é a de uso: o início é o menos usado recentemente.
+    _memory_cache: OrderedDict[str, SLACacheEntry] = OrderedDict()
+    _memory_bytes = 0
     _lock = threading.Lock()
 
+    MAX_ENTRIES = int(os.getenv("SLA_CACHE_MAX_ENTRIES", "5000"))
+    MAX_BYTES = int(os.getenv("SLA_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+
+    # Varredura de expirados em background (segundos)
+    SWEEP_INTERVAL = 60
+    _sweeper: threading.Thread | None = None
+    _sweeper_stop = threading.Event()
+
+    _memory_stats = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0}
+
+    # Write-behind: set/invalidate atualizam a memória na hora e enfileiram a
+    # persistência; a thread de flush grava em lote (upsert multi-linha e
+    # DELETE ... IN) com sessão própria. Por chave, só a última operação vale.
+    WRITE_BEHIND = os.getenv("SLA_CACHE_WRITE_BEHIND", "1").lower() not in ("0", "false", "no")
+    FLUSH_INTERVAL = float(os.getenv("SLA_CACHE_FLUSH_INTERVAL", "2"))
+    MAX_QUEUE = int(os.getenv("SLA_CACHE_MAX_QUEUE", "1000"))
+    FLUSH_BATCH_SIZE = 200
+
+    # {chave: ("set", cache_value, calculated_at, expires_at, tags) | ("delete",)}
+    # (cache_value já codificado por CacheCodec)
+    _pending: OrderedDict[str, tuple] = OrderedDict()
+    # Prefixos a remover do banco (invalidate_all_sla); aplicados antes das chaves
+    _pending_prefixes: set[str] = set()
+    # Lote em gravação pelo flush (chaves, prefixos, tags): continua visível
+    # para o get() até o commit e volta para a fila se a gravação falhar
+    _flushing: dict[str, tuple] = {}
+    _flushing_prefixes: list[str] = []
+    _flushing_tags: list[dict[str, frozenset[str]]] = []
+    _pending_lock = threading.Lock()
+    _flush_lock = threading.Lock()
+    _flusher: threading.Thread | None = None
+    _flush_wakeup = threading.Event()
+    # get_or_compute: cálculos em andamento por chave (single-flight) e pool
+    # dos recálculos em background
+    REFRESH_WORKERS = 2
+    _inflight: dict[str, Future] = {}
+    _inflight_lock = threading.Lock()
+    _refresh_executor: ThreadPoolExecutor | None = None
+    _swr_stats = {
+        "fresh_hits": 0,
+        "stale_served": 0,
+        "background_refreshes": 0,
+        "blocking_computes": 0,
+        "single_flight_waits": 0,
+        "compute_errors": 0,
+    }
+
+    # Invalidações (deste ou de outros workers): instante da invalidação por
+    # chave e por prefixo. Até o write-behind do worker de origem remover a
+    # linha, o banco ainda tem o valor antigo; linhas calculadas antes desse
+    # instante são ignoradas no get(). Descartadas após TOMBSTONE_SECONDS.
+    TOMBSTONE_SECONDS = 120
+    _tombstones: dict[str, datetime] = {}
+    _tombstone_prefixes: dict[str, datetime] = {}
+
+    # Prefixos removidos por invalidate_all_sla (métricas mensais do
+    # IncrementalMetricsCache)
+    SLA_PREFIXES = ("sla_metrics_mes:",)
+
+    _flush_stats = {
+        "flushes": 0,
+        "rows_upserted": 0,
+        "rows_deleted": 0,
+        "prefix_deletes": 0,
+        "flush_errors": 0,
+        "requeued": 0,
+        "queue_full": 0,
+        "last_flush_ms": None,
+    }
+
     # Configurações de TTL por tipo de métrica
     # IMPORTANTE: TTL muito longo (24 horas) - cache persiste até mudança de status
     # Cache é invalidado APENAS quando há mudança de chamados, não por tempo
@@ -63,24 +176,343 @@ class SLACacheManager:
         "metrics_basic": 24 * 60 * 60,  # 24 horas - persiste até mudança
     }
 
-    # Chaves de cache relacionadas para invalidação
-    RELATED_CACHE_KEYS = {
-        "chamado_sla_status": [
-            "sla_compliance_24h",
-            "sla_compliance_mes",
-            "sla_distribution",
-            "tempo_resposta_24h",
-            "tempo_resposta_mes",
-        ],
-        "chamado_update": [
-            "sla_compliance_24h",
-            "sla_compliance_mes",
-            "sla_distribution",
-            "tempo_resposta_24h",
-            "tempo_resposta_mes",
-            "metrics_basic",
-        ],
-    }
+    # Agregados de SLA. Sem tags (linhas gravadas antes das tags existirem)
+    # são invalidados por qualquer mudança de chamado, como antes.
+    SLA_AGGREGATE_KEYS = (
+        "sla_compliance_24h",
+        "sla_compliance_mes",
+        "sla_distribution",
+        "tempo_resposta_24h",
+        "tempo_resposta_mes",
+        "metrics_basic",
+    )
+
+    # Tags: {dimensão: valores} que a entrada usa no cálculo. Dimensões:
+    # - "mes": mês de abertura dos chamados considerados (YYYY-MM)
+    # - "prioridade": prioridades consideradas (as com SLA ativo)
+    # - "unidade": unidades consideradas
+    # - "janela": recortes por tempo/estado; "ativos_30d" = chamados não
+    #   finalizados abertos há até JANELA_ATIVOS_DIAS dias
+    # Dimensão ausente nas tags = a entrada não filtra por ela.
+    JANELA_ATIVOS_DIAS = 30
+    STATUS_FINAIS = ("Concluido", "Cancelado")
+
+    # Invalidações por tags aguardando o flush (atributos de cada uma)
+    _pending_tags: list[dict[str, frozenset[str]]] = []
+    _tag_stats = {"invalidations": 0, "memory_entries_invalidated": 0, "rows_deleted": 0}
+    # Chaves em memória com tags (evita varrer a memória inteira)
+    _tagged_keys: set[str] = set()
+    # Invalidações por tags (deste ou de outros workers): (atributos, instante)
+    _tag_tombstones: list[tuple[dict[str, frozenset[str]], datetime]] = []
+
+    @staticmethod
+    def normalize_tags(tags: dict | None) -> dict[str, frozenset[str]] | None:
+        """{dimensão: iterável de valores} -> {dimensão: frozenset de str}"""
+        if tags is None:
+            return None
+        return {
+            dimensao: frozenset(str(valor) for valor in valores if valor is not None)
+            for dimensao, valores in tags.items()
+        }
+
+    @staticmethod
+    def encode_tags(tags: dict[str, frozenset[str]] | None) -> str | None:
+        if tags is None:
+            return None
+        return json.dumps(
+            {dimensao: sorted(valores) for dimensao, valores in sorted(tags.items())},
+            separators=(",", ":"),
+            ensure_ascii=False,
+        )
+
+    @classmethod
+    def decode_tags(cls, texto: str | None) -> dict[str, frozenset[str]] | None:
+        if not texto:
+            return None
+        return cls.normalize_tags(json.loads(texto))
+
+    @staticmethod
+    def tags_match(tags: dict[str, frozenset[str]], atributos: dict[str, frozenset[str]]) -> bool:
+        """
+        A mudança descrita em atributos afeta a entrada com essas tags?
+
+        Sim se, em toda dimensão presente nos dois lados, há valor em comum.
+        Dimensão ausente nos atributos vale qualquer valor (atributos vazios
+        afetam todas as entradas com tags).
+        """
+        for dimensao, valores in tags.items():
+            alvo = atributos.get(dimensao)
+            if alvo is not None and valores.isdisjoint(alvo):
+                return False
+        return True
+
+    @classmethod
+    def chamado_tags(cls, chamado, status: str | None = None, agora: datetime | None = None) -> dict[str, set[str]]:
+        """
+        Atributos do chamado nas dimensões das tags.
+
+        status substitui o status atual (estado anterior a uma mudança).
+        """
+        agora = agora or now_brazil_naive()
+        abertura = chamado.data_abertura or agora
+        status = status if status is not None else chamado.status
+        ativo = (
+            status not in cls.STATUS_FINAIS
+            and abertura >= agora - timedelta(days=cls.JANELA_ATIVOS_DIAS)
+        )
+        return {
+            "mes": {abertura.strftime("%Y-%m")},
+            "prioridade": {chamado.prioridade} if chamado.prioridade else set(),
+            "unidade": {chamado.unidade} if chamado.unidade else set(),
+            "janela": {"ativos_30d"} if ativo else set(),
+        }
+
+    @staticmethod
+    def merge_tags(*grupos: dict | None) -> dict[str, set[str]]:
+        """União, por dimensão, de vários conjuntos de atributos (antes e depois)"""
+        resultado: dict[str, set[str]] = {}
+        for grupo in grupos:
+            for dimensao, valores in (grupo or {}).items():
+                resultado.setdefault(dimensao, set()).update(valores)
+        return resultado
+
+    @classmethod
+    def _affected_by(cls, key: str, tags: dict[str, frozenset[str]] | None, atributos: dict[str, frozenset[str]]) -> bool:
+        """Entrada sem tags só é afetada se for um agregado de SLA (legado)"""
+        if tags is None:
+            return key in cls.SLA_AGGREGATE_KEYS
+        return cls.tags_match(tags, atributos)
+
+    @classmethod
+    def get_or_compute(
+        cls,
+        db: Session,
+        key: str,
+        fn: Callable[[Session], Any],
+        soft_ttl: Optional[int] = None,
+        hard_ttl: Optional[int] = None,
+        tags: dict | Callable[[Session], dict] | None = None,
+    ) -> Any:
+        """
+        Valor da chave com stale-while-revalidate.
+
+        - fresco (idade <= soft_ttl e não invalidado): devolve direto
+        - stale (passou de soft_ttl ou foi invalidado, mas idade <= hard_ttl):
+          devolve o valor antigo na hora e agenda UM recálculo em background
+        - sem valor em memória nem no banco: calcula bloqueando, e chamadas
+          concorrentes da mesma chave esperam o mesmo cálculo (single-flight)
+
+        fn(db) calcula o valor; no background recebe uma sessão própria.
+        hard_ttl padrão: TTL da chave; soft_ttl padrão: hard_ttl (só a
+        invalidação torna o valor stale). tags: dependências do valor
+        (ver set()); se for função, é chamada com a sessão após cada cálculo.
+        """
+        if hard_ttl is None:
+            hard_ttl = cls._get_ttl_for_key(key)
+        if soft_ttl is None:
+            soft_ttl = hard_ttl
+
+        with cls._lock:
+            entry = cls._memory_cache.get(key)
+            if entry is not None and entry.is_expired():
+                cls._memory_remove_locked(key)
+                cls._memory_stats["expirations"] += 1
+                entry = None
+            if entry is not None:
+                entry.touch()
+                cls._memory_cache.move_to_end(key)
+                fresco = not entry.stale and entry.age_seconds() <= soft_ttl
+
+        if entry is not None:
+            if fresco:
+                cls._swr_stats["fresh_hits"] += 1
+                return entry.value
+            cls._swr_stats["stale_served"] += 1
+            cls._refresh_in_background(key, fn, hard_ttl, tags)
+            return entry.value
+
+        # Sem valor em memória: tenta o banco (ou a fila do write-behind)
+        value = cls.get(db, key)
+        if value is not None:
+            return value
+
+        return cls._compute_single_flight(db, key, fn, hard_ttl, tags)
+
+    @staticmethod
+    def _resolve_tags(db: Session, tags: dict | Callable[[Session], dict] | None) -> dict | None:
+        return tags(db) if callable(tags) else tags
+
+    @classmethod
+    def _compute_single_flight(
+        cls,
+        db: Session,
+        key: str,
+        fn: Callable[[Session], Any],
+        ttl: int,
+        tags: dict | Callable[[Session], dict] | None = None,
+    ) -> Any:
+        """Calcula bloqueando; concorrentes da mesma chave esperam o mesmo Future"""
+        with cls._inflight_lock:
+            future = cls._inflight.get(key)
+            lider = future is None
+            if lider:
+                future = Future()
+                cls._inflight[key] = future
+
+        if not lider:
+            cls._swr_stats["single_flight_waits"] += 1
+            return future.result()
+
+        cls._swr_stats["blocking_computes"] += 1
+        try:
+            value = fn(db)
+            cls.set(db, key, value, ttl, tags=cls._resolve_tags(db, tags))
+            future.set_result(value)
+            return value
+        except Exception as e:
+            cls._swr_stats["compute_errors"] += 1
+            future.set_exception(e)
+            raise
+        finally:
+            with cls._inflight_lock:
+                cls._inflight.pop(key, None)
+
+    @classmethod
+    def _refresh_in_background(
+        cls,
+        key: str,
+        fn: Callable[[Session], Any],
+        ttl: int,
+        tags: dict | Callable[[Session], dict] | None = None,
+    ) -> None:
+        """Agenda o recálculo da chave, se não houver um em andamento"""
+        with cls._inflight_lock:
+            if key in cls._inflight:
+                return
+            future = Future()
+            cls._inflight[key] = future
+            if cls._refresh_executor is None:
+                cls._refresh_executor = ThreadPoolExecutor(
+                    max_workers=cls.REFRESH_WORKERS,
+                    thread_name_prefix="sla-cache-refresh",
+                )
+            executor = cls._refresh_executor
+
+        def _refresh():
+            from core.db import SessionLocal
+
+            db = SessionLocal()
+            try:
+                value = fn(db)
+                cls.set(db, key, value, ttl, tags=cls._resolve_tags(db, tags))
+                cls._swr_stats["background_refreshes"] += 1
+                future.set_result(value)
+            except Exception as e:
+                cls._swr_stats["compute_errors"] += 1
+                print(f"[CACHE] Erro ao recalcular '{key}' em background: {e}")
+                future.set_exception(e)
+            finally:
+                db.close()
+                with cls._inflight_lock:
+                    cls._inflight.pop(key, None)
+
+        executor.submit(_refresh)
+
+    @classmethod
+    def configure(cls, max_entries: int | None = None, max_bytes: int | None = None) -> None:
+        """Ajusta os limites da memória e despeja o excedente"""
+        with cls._lock:
+            if max_entries is not None:
+                cls.MAX_ENTRIES = max_entries
+            if max_bytes is not None:
+                cls.MAX_BYTES = max_bytes
+            cls._evict_locked()
+
+    @classmethod
+    def _memory_put(
+        cls,
+        key: str,
+        value: Any,
+        ttl_seconds: int,
+        size_bytes: int | None = None,
+        tags: dict[str, frozenset[str]] | None = None,
+    ) -> None:
+        """Grava na memória como mais recente e despeja LRU acima dos limites"""
+        entry = SLACacheEntry(key, value, ttl_seconds, size_bytes, tags)
+        with cls._lock:
+            anterior = cls._memory_cache.pop(key, None)
+            if anterior is not None:
+                cls._memory_bytes -= anterior.size_bytes
+            cls._memory_cache[key] = entry
+            cls._memory_bytes += entry.size_bytes
+            if tags is not None:
+                cls._tagged_keys.add(key)
+            else:
+                cls._tagged_keys.discard(key)
+            cls._evict_locked()
+        cls._ensure_sweeper()
+
+    @classmethod
+    def _memory_remove_locked(cls, key: str) -> bool:
+        entry = cls._memory_cache.pop(key, None)
+        if entry is None:
+            return False
+        cls._memory_bytes -= entry.size_bytes
+        cls._tagged_keys.discard(key)
+        return True
+
+    @classmethod
+    def _evict_locked(cls) -> None:
+        # Mantém ao menos a entrada recém-gravada, mesmo se sozinha passar do limite de bytes
+        while len(cls._memory_cache) > 1 and (
+            len(cls._memory_cache) > cls.MAX_ENTRIES or cls._memory_bytes > cls.MAX_BYTES
+        ):
+            key, entry = cls._memory_cache.popitem(last=False)
+            cls._memory_bytes -= entry.size_bytes
+            cls._tagged_keys.discard(key)
+            cls._memory_stats["evictions"] += 1
+
+    @classmethod
+    def sweep_expired(cls) -> int:
+        """Remove da memória as entradas expiradas (sem esperar serem lidas)"""
+        with cls._lock:
+            expiradas = [key for key, entry in cls._memory_cache.items() if entry.is_expired()]
+            for key in expiradas:
+                cls._memory_remove_locked(key)
+            cls._memory_stats["expirations"] += len(expiradas)
+
+            limite = now_brazil_naive() - timedelta(seconds=cls.TOMBSTONE_SECONDS)
+            for tombstones in (cls._tombstones, cls._tombstone_prefixes):
+                for alvo in [alvo for alvo, em in tombstones.items() if em < limite]:
+                    del tombstones[alvo]
+            cls._tag_tombstones = [(atributos, em) for atributos, em in cls._tag_tombstones if em >= limite]
+        return len(expiradas)
+
+    @classmethod
+    def _ensure_sweeper(cls) -> None:
+        """Inicia a thread de varredura de expirados (idempotente)"""
+        if cls._sweeper is not None and cls._sweeper.is_alive():
+            return
+        with cls._lock:
+            if cls._sweeper is not None and cls._sweeper.is_alive():
+                return
+            cls._sweeper_stop.clear()
+            cls._sweeper = threading.Thread(
+                target=cls._sweep_loop,
+                daemon=True,
+                name="SLACacheSweeperThread",
+            )
+            cls._sweeper.start()
+
+    @classmethod
+    def _sweep_loop(cls) -> None:
+        while not cls._sweeper_stop.wait(cls.SWEEP_INTERVAL):
+            try:
+                removidas = cls.sweep_expired()
+                if removidas:
+                    print(f"[CACHE] {removidas} entradas expiradas removidas da memória")
+            except Exception as e:
+                print(f"[CACHE] Erro na varredura de expirados: {e}")
 
     @classmethod
     def get(cls, db: Session, key: str) -> Any:
@@ -93,13 +525,28 @@ class SLACacheManager:
         3. Se não encontrado, retorna None
         """
         with cls._lock:
-            if key in cls._memory_cache:
-                entry = cls._memory_cache[key]
-                if not entry.is_expired():
+            entry = cls._memory_cache.get(key)
+            if entry is not None:
+                if entry.is_expired():
+                    cls._memory_remove_locked(key)
+                    cls._memory_stats["expirations"] += 1
+                elif not entry.stale:
                     entry.touch()
+                    cls._memory_cache.move_to_end(key)
+                    cls._memory_stats["hits"] += 1
                     return entry.value
-                else:
-                    del cls._memory_cache[key]
+            cls._memory_stats["misses"] += 1
+
+        # Persistência ainda na fila (ou em gravação): o banco está desatualizado para essa chave
+        with cls._pending_lock:
+            pendente = cls._pending.get(key) or cls._flushing.get(key)
+        if pendente is not None:
+            if pendente[0] == "delete" or pendente[3] <= now_brazil_naive():
+                return None
+            value = CacheCodec.decode(pendente[1])
+            ttl = cls._remaining_ttl(key, pendente[3])
+            cls._memory_put(key, value, ttl, len(pendente[1]), pendente[4])
+            return value
 
         # Tenta banco de dados
         try:
@@ -111,12 +558,15 @@ class SLACacheManager:
             if cached:
                 expires_at = cached.expires_at
                 if expires_at and expires_at > now_brazil_naive():
+                    tags = cls.decode_tags(cached.tags)
+                    if cls._invalidated_after(key, cached.calculated_at, tags) or cls._delete_pending(key, tags):
+                        # Invalidada (aqui ou em outro worker); a remoção ainda não chegou ao banco
+                        return None
                     # Cache do banco ainda é válido
-                    value = json.loads(cached.cache_value) if isinstance(cached.cache_value, str) else cached.cache_value
-                    # Carrega em memória também
-                    ttl = cls._get_ttl_for_key(key)
-                    with cls._lock:
-                        cls._memory_cache[key] = SLACacheEntry(key, value, ttl)
+                    value = CacheCodec.decode(cached.cache_value)
+                    # Carrega em memória também, só pelo tempo que falta na linha
+                    ttl = cls._remaining_ttl(key, expires_at)
+                    cls._memory_put(key, value, ttl, len(cached.cache_value or ""), tags)
                     return value
                 else:
                     # Expirou no banco, deleta
@@ -128,27 +578,46 @@ class SLACacheManager:
         return None
 
     @classmethod
-    def set(cls, db: Session, key: str, value: Any, ttl_seconds: Optional[int] = None) -> None:
+    def set(
+        cls,
+        db: Session,
+        key: str,
+        value: Any,
+        ttl_seconds: Optional[int] = None,
+        tags: dict | None = None,
+    ) -> None:
         """
         Define valor do cache (memória + banco de dados)
 
         Estratégia:
         1. Armazena em memória para acesso rápido
         2. Persiste em banco de dados para resiliência
+
+        tags: {dimensão: valores} de que o valor depende (ex.:
+        {"mes": ["2024-05"], "prioridade": ["Alta", "Normal"]}); sem tags, a
+        entrada só é invalidada por chave/prefixo.
         """
         if ttl_seconds is None:
             ttl_seconds = cls._get_ttl_for_key(key)
 
+        # Valor str é tratado como JSON já serializado
+        texto = value if isinstance(value, str) else json.dumps(value, separators=(",", ":"))
+        cache_value = CacheCodec.encode_json(texto)
+        tags = cls.normalize_tags(tags)
+        tags_value = cls.encode_tags(tags)
+
         # Em memória
-        with cls._lock:
-            cls._memory_cache[key] = SLACacheEntry(key, value, ttl_seconds)
+        cls._memory_put(key, value, ttl_seconds, len(texto), tags)
+
+        calculated_at = now_brazil_naive()
+        expires_at = calculated_at + timedelta(seconds=ttl_seconds)
+        if cls.WRITE_BEHIND:
+            cls._enqueue(key, ("set", cache_value, calculated_at, expires_at, tags))
+            return
 
         # No banco de dados
         try:
             from ti.models.metrics_cache import MetricsCacheDB
-            expires_at = now_brazil_naive() + timedelta(seconds=ttl_seconds)
-            cache_value = json.dumps(value) if not isinstance(value, str) else value
-            calculated_at = now_brazil_naive()
 
             # Tenta buscar cache existente
             existing = db.query(MetricsCacheDB).filter(
@@ -159,6 +628,7 @@ class SLACacheManager:
                 existing.cache_value = cache_value
                 existing.calculated_at = calculated_at
                 existing.expires_at = expires_at
+                existing.tags = tags_value
                 db.add(existing)
             else:
                 new_cache = MetricsCacheDB(
@@ -166,6 +636,7 @@ class SLACacheManager:
                     cache_value=cache_value,
                     calculated_at=calculated_at,
                     expires_at=expires_at,
+                    tags=tags_value,
                 )
                 db.add(new_cache)
 
@@ -181,6 +652,7 @@ class SLACacheManager:
                     existing.cache_value = cache_value
                     existing.calculated_at = calculated_at
                     existing.expires_at = expires_at
+                    existing.tags = tags_value
                     db.add(existing)
                     db.commit()
         except Exception as e:
@@ -196,13 +668,26 @@ class SLACacheManager:
         Invalida múltiplas chaves de cache
 
         Estratégia:
-        1. Remove da memória imediatamente
-        2. Remove do banco de dados
+        1. Marca como stale na memória imediatamente (get() passa a ignorar;
+           get_or_compute ainda serve o valor enquanto recalcula) e registra
+           o instante (get() não recarrega a linha antiga do banco)
+        2. Publica para os outros workers fazerem o mesmo
+        3. Remove do banco de dados
         """
+        em = now_brazil_naive()
         with cls._lock:
             for key in keys:
-                if key in cls._memory_cache:
-                    del cls._memory_cache[key]
+                entry = cls._memory_cache.get(key)
+                if entry is not None:
+                    entry.stale = True
+                cls._record_tombstone_locked("chave", key, em)
+
+        CacheInvalidationBus.publish("chave", keys)
+
+        if cls.WRITE_BEHIND:
+            for key in keys:
+                cls._enqueue(key, ("delete",))
+            return
 
         try:
             from ti.models.metrics_cache import MetricsCacheDB
@@ -218,59 +703,468 @@ class SLACacheManager:
                 pass
 
     @classmethod
-    def invalidate_by_chamado(cls, db: Session, chamado_id: int) -> None:
+    def invalidate_by_chamado(cls, db: Session, chamado_id: int, anterior: dict | None = None) -> None:
         """
-        Invalida todos os caches relacionados a um chamado específico
+        Invalida os caches afetados pela mudança de um chamado específico
 
-        Quando um chamado muda, é mais inteligente que invalidar tudo.
+        Só caem as entradas cujas tags cruzam com os atributos do chamado
+        (mês de abertura, prioridade, unidade, janela) antes e depois da
+        mudança: um chamado de mês anterior ou de prioridade sem SLA ativo
+        não derruba os agregados do mês.
+
+        anterior: chamado_tags() do estado anterior (ex.: status antigo); o
+        estado atual é lido do banco.
         """
-        keys_to_invalidate = [
-            f"chamado_sla_status:{chamado_id}",
-            "sla_compliance_24h",
-            "sla_compliance_mes",
-            "sla_distribution",
-            "tempo_resposta_24h",
-            "tempo_resposta_mes",
-            "metrics_basic",
-        ]
+        from ti.models.chamado import Chamado
 
-        cls.invalidate(db, keys_to_invalidate)
+        atual = None
+        try:
+            chamado = db.get(Chamado, chamado_id)
+            if chamado is not None:
+                atual = cls.chamado_tags(chamado)
+        except Exception as e:
+            print(f"[CACHE] Erro ao ler atributos do chamado {chamado_id}: {e}")
+
+        cls.invalidate(db, [f"chamado_sla_status:{chamado_id}"])
+
+        if atual is None and anterior is None:
+            # Sem atributos conhecidos: invalida todas as entradas com tags
+            cls.invalidate_by_tags(db, {})
+        else:
+            cls.invalidate_by_tags(db, cls.merge_tags(anterior, atual))
+
+    @classmethod
+    def invalidate_by_tags(cls, db: Session, atributos: dict) -> int:
+        """
+        Invalida (em todos os workers) as entradas afetadas pelos atributos.
+
+        atributos: {dimensão: valores} da mudança (ver tags_match); {}
+        invalida todas as entradas com tags. Retorna quantas entradas em
+        memória foram marcadas como stale.
+        """
+        atributos = cls.normalize_tags(atributos)
+        afetadas = cls._mark_stale_by_tags(atributos)
+        with cls._lock:
+            cls._record_tombstone_locked("tags", atributos, now_brazil_naive())
+
+        alvo = cls.encode_tags(atributos)
+        if len(alvo) > 500:
+            # Não cabe no evento do barramento: os outros workers invalidam tudo com tags
+            alvo = "{}"
+        CacheInvalidationBus.publish("tags", [alvo])
+        cls._tag_stats["invalidations"] += 1
+        cls._tag_stats["memory_entries_invalidated"] += afetadas
+
+        if cls.WRITE_BEHIND:
+            cls._enqueue_tags_delete(atributos)
+            return afetadas
+
+        try:
+            cls._tag_stats["rows_deleted"] += cls._delete_by_tags(db, [atributos])
+            db.commit()
+        except Exception as e:
+            print(f"[CACHE] Erro ao invalidar caches por tags: {e}")
+            try:
+                db.rollback()
+            except:
+                pass
+        return afetadas
+
+    @classmethod
+    def _mark_stale_by_tags(cls, atributos: dict[str, frozenset[str]]) -> int:
+        afetadas = 0
+        with cls._lock:
+            candidatas = cls._tagged_keys.union(
+                key for key in cls.SLA_AGGREGATE_KEYS if key in cls._memory_cache
+            )
+            for key in candidatas:
+                entry = cls._memory_cache.get(key)
+                if entry is not None and not entry.stale and cls._affected_by(key, entry.tags, atributos):
+                    entry.stale = True
+                    afetadas += 1
+        return afetadas
+
+    @classmethod
+    def _delete_by_tags(cls, db: Session, lista_atributos: list[dict[str, frozenset[str]]]) -> int:
+        """Remove do banco as linhas afetadas por qualquer um dos atributos (sem commit)"""
+        from ti.models.metrics_cache import MetricsCacheDB
+
+        rows = db.query(MetricsCacheDB.cache_key, MetricsCacheDB.tags).filter(
+            or_(
+                MetricsCacheDB.tags.isnot(None),
+                MetricsCacheDB.cache_key.in_(cls.SLA_AGGREGATE_KEYS),
+            )
+        ).all()
+
+        keys = []
+        for row in rows:
+            tags = cls.decode_tags(row.tags)
+            if any(cls._affected_by(row.cache_key, tags, atributos) for atributos in lista_atributos):
+                keys.append(row.cache_key)
+
+        for offset in range(0, len(keys), cls.FLUSH_BATCH_SIZE):
+            db.query(MetricsCacheDB).filter(
+                MetricsCacheDB.cache_key.in_(keys[offset:offset + cls.FLUSH_BATCH_SIZE])
+            ).delete(synchronize_session=False)
+        return len(keys)
+
+    @classmethod
+    def _enqueue_tags_delete(cls, atributos: dict[str, frozenset[str]]) -> None:
+        with cls._pending_lock:
+            # Valores na fila calculados antes da invalidação não podem ser
+            # gravados depois do delete por tags
+            afetadas = [
+                key for key, operacao in cls._pending.items()
+                if operacao[0] == "set" and cls._affected_by(key, operacao[4], atributos)
+            ]
+            for key in afetadas:
+                cls._pending[key] = ("delete",)
+            cls._pending_tags.append(atributos)
+            tamanho = len(cls._pending) + len(cls._pending_tags)
+        cls._after_enqueue(tamanho)
 
     @classmethod
     def invalidate_all_sla(cls, db: Session) -> None:
         """
         Invalida todos os caches de SLA (chamados quando config muda)
+
+        Derruba as entradas com tags, os agregados legados e as métricas
+        mensais incrementais. O status por chamado (chamado_sla_status:*)
+        não é mais varrido: é regravado pelo cálculo incremental.
         """
-        keys_to_invalidate = [
-            "sla_compliance_24h",
-            "sla_compliance_mes",
-            "sla_distribution",
-            "tempo_resposta_24h",
-            "tempo_resposta_mes",
-            "metrics_basic",
-        ]
-
-        cls.invalidate(db, keys_to_invalidate)
-
-        # Também remove todas as chaves de chamado
+        cls.invalidate_by_tags(db, {})
+
+        for prefixo in cls.SLA_PREFIXES:
+            cls.invalidate_prefix(db, prefixo)
+
+        try:
+            from ti.services.cache_debouncer import get_debouncer
+            get_debouncer().invalidate_prefix("sla_metrics_mes:")
+        except Exception as e:
+            print(f"[CACHE] Erro ao invalidar debouncer: {e}")
+
+    @classmethod
+    def invalidate_prefix(cls, db: Session, prefixo: str) -> None:
+        """Remove da memória e do banco todas as chaves com o prefixo (em todos os workers)"""
         with cls._lock:
-            keys_to_delete = [k for k in cls._memory_cache.keys() if k.startswith("chamado_sla_status:")]
+            keys_to_delete = [k for k in cls._memory_cache.keys() if k.startswith(prefixo)]
             for k in keys_to_delete:
-                del cls._memory_cache[k]
+                cls._memory_remove_locked(k)
+            cls._record_tombstone_locked("prefixo", prefixo, now_brazil_naive())
+
+        CacheInvalidationBus.publish("prefixo", [prefixo])
+
+        if cls.WRITE_BEHIND:
+            cls._enqueue_prefix_delete(prefixo)
+            return
 
         try:
             from ti.models.metrics_cache import MetricsCacheDB
             db.query(MetricsCacheDB).filter(
-                MetricsCacheDB.cache_key.like("chamado_sla_status:%")
-            ).delete()
+                MetricsCacheDB.cache_key.like(f"{prefixo}%")
+            ).delete(synchronize_session=False)
             db.commit()
         except Exception as e:
-            print(f"[CACHE] Erro ao invalidar caches de SLA: {e}")
+            print(f"[CACHE] Erro ao invalidar caches com prefixo {prefixo}: {e}")
             try:
                 db.rollback()
             except:
                 pass
 
+    @classmethod
+    def apply_remote_invalidation(cls, tipo: str, alvo: str, em: datetime) -> None:
+        """
+        Handler do CacheInvalidationBus: invalidação feita em outro worker.
+
+        Só mexe no estado local (o worker de origem já cuida do banco):
+        marca a memória, descarta da fila valores calculados antes da
+        invalidação e registra o instante para o get() não recarregar a
+        linha antiga.
+        """
+        if tipo not in ("chave", "prefixo", "tags"):
+            # Outros eventos do barramento (ex.: "versao" do DataVersion)
+            return
+        if tipo == "tags":
+            atributos = cls.normalize_tags(json.loads(alvo))
+            cls._mark_stale_by_tags(atributos)
+            with cls._lock:
+                cls._record_tombstone_locked("tags", atributos, em)
+
+            def afetada(key: str, operacao: tuple) -> bool:
+                return cls._affected_by(key, operacao[4], atributos)
+        else:
+            with cls._lock:
+                if tipo == "chave":
+                    entry = cls._memory_cache.get(alvo)
+                    if entry is not None:
+                        entry.stale = True
+                elif tipo == "prefixo":
+                    keys_to_delete = [k for k in cls._memory_cache.keys() if k.startswith(alvo)]
+                    for k in keys_to_delete:
+                        cls._memory_remove_locked(k)
+                cls._record_tombstone_locked(tipo, alvo, em)
+
+            def afetada(key: str, operacao: tuple) -> bool:
+                return key == alvo if tipo == "chave" else key.startswith(alvo)
+
+        with cls._pending_lock:
+            descartar = [
+                key for key, operacao in cls._pending.items()
+                if operacao[0] == "set" and operacao[2] <= em and afetada(key, operacao)
+            ]
+            for key in descartar:
+                del cls._pending[key]
+
+    @classmethod
+    def _record_tombstone_locked(cls, tipo: str, alvo, em: datetime) -> None:
+        """Registra o instante de uma invalidação (chamar com _lock)"""
+        if tipo == "tags":
+            cls._tag_tombstones.append((alvo, em))
+            return
+        tombstones = cls._tombstones if tipo == "chave" else cls._tombstone_prefixes
+        anterior = tombstones.get(alvo)
+        tombstones[alvo] = max(anterior, em) if anterior else em
+
+    @classmethod
+    def _remaining_ttl(cls, key: str, expires_at: datetime | None) -> int:
+        """TTL em memória de um valor lido da fila/banco: o que falta até expires_at"""
+        ttl = cls._get_ttl_for_key(key)
+        if expires_at is None:
+            return ttl
+        restante = (expires_at - now_brazil_naive()).total_seconds()
+        return max(1, min(ttl, int(restante)))
+
+    @classmethod
+    def _invalidated_after(
+        cls,
+        key: str,
+        calculated_at: datetime | None,
+        tags: dict[str, frozenset[str]] | None = None,
+    ) -> bool:
+        """True se a chave foi invalidada (neste ou em outro worker) depois de calculated_at"""
+        with cls._lock:
+            if not cls._tombstones and not cls._tombstone_prefixes and not cls._tag_tombstones:
+                return False
+            instantes = [
+                em for prefixo, em in cls._tombstone_prefixes.items() if key.startswith(prefixo)
+            ]
+            if key in cls._tombstones:
+                instantes.append(cls._tombstones[key])
+            instantes.extend(
+                em for atributos, em in cls._tag_tombstones if cls._affected_by(key, tags, atributos)
+            )
+        if not instantes:
+            return False
+        return calculated_at is None or calculated_at <= max(instantes)
+
+    @classmethod
+    def _delete_pending(cls, key: str, tags: dict[str, frozenset[str]] | None) -> bool:
+        """True se há remoção por prefixo/tags na fila (ou em gravação) que atinge a chave"""
+        with cls._pending_lock:
+            prefixos = [*cls._pending_prefixes, *cls._flushing_prefixes]
+            lista_tags = [*cls._pending_tags, *cls._flushing_tags]
+        if any(key.startswith(prefixo) for prefixo in prefixos):
+            return True
+        return any(cls._affected_by(key, tags, atributos) for atributos in lista_tags)
+
+    @classmethod
+    def _enqueue(cls, key: str, operacao: tuple) -> None:
+        with cls._pending_lock:
+            cls._pending.pop(key, None)
+            cls._pending[key] = operacao
+            tamanho = len(cls._pending)
+        cls._after_enqueue(tamanho)
+
+    @classmethod
+    def _enqueue_prefix_delete(cls, prefixo: str) -> None:
+        with cls._pending_lock:
+            # Operações anteriores nessas chaves perdem o sentido; as posteriores
+            # continuam na fila e são aplicadas depois do delete por prefixo
+            for key in [k for k in cls._pending if k.startswith(prefixo)]:
+                del cls._pending[key]
+            cls._pending_prefixes.add(prefixo)
+            tamanho = len(cls._pending)
+        cls._after_enqueue(tamanho)
+
+    @classmethod
+    def _after_enqueue(cls, tamanho: int) -> None:
+        cls._ensure_flusher()
+        if tamanho >= cls.MAX_QUEUE:
+            cls._flush_stats["queue_full"] += 1
+            if tamanho >= cls.MAX_QUEUE * 2:
+                # Flusher não acompanha: grava no caller para limitar a memória
+                cls.flush()
+            else:
+                cls._flush_wakeup.set()
+
+    @classmethod
+    def _ensure_flusher(cls) -> None:
+        """Inicia a thread de flush do write-behind (idempotente)"""
+        if cls._flusher is not None and cls._flusher.is_alive():
+            return
+        with cls._pending_lock:
+            if cls._flusher is not None and cls._flusher.is_alive():
+                return
+            cls._flusher = threading.Thread(
+                target=cls._flush_loop,
+                daemon=True,
+                name="SLACacheFlusherThread",
+            )
+            cls._flusher.start()
+
+    @classmethod
+    def _flush_loop(cls) -> None:
+        while True:
+            cls._flush_wakeup.wait(cls.FLUSH_INTERVAL)
+            cls._flush_wakeup.clear()
+            try:
+                cls.flush()
+            except Exception as e:
+                print(f"[CACHE] Erro no flush do write-behind: {e}")
+
+    @classmethod
+    def flush(cls) -> int:
+        """
+        Grava no banco as operações pendentes (upserts e deletes em lote).
+
+        Usa sessão própria. Retorna a quantidade de operações aplicadas.
+        """
+        import time
+        from core.db import SessionLocal
+        from ti.models.metrics_cache import MetricsCacheDB
+
+        with cls._flush_lock:
+            with cls._pending_lock:
+                if not cls._pending and not cls._pending_prefixes and not cls._pending_tags:
+                    return 0
+                pendentes = list(cls._pending.items())
+                prefixos = list(cls._pending_prefixes)
+                lista_tags = list(cls._pending_tags)
+                cls._flushing = dict(pendentes)
+                cls._flushing_prefixes = prefixos
+                cls._flushing_tags = lista_tags
+                cls._pending.clear()
+                cls._pending_prefixes.clear()
+                cls._pending_tags.clear()
+
+            inicio = time.monotonic()
+            deletes = [key for key, operacao in pendentes if operacao[0] == "delete"]
+            upserts = [
+                {
+                    "cache_key": key,
+                    "cache_value": operacao[1],
+                    "calculated_at": operacao[2],
+                    "expires_at": operacao[3],
+                    "tags": cls.encode_tags(operacao[4]),
+                }
+                for key, operacao in pendentes if operacao[0] == "set"
+            ]
+
+            db = SessionLocal()
+            try:
+                for prefixo in prefixos:
+                    db.query(MetricsCacheDB).filter(
+                        MetricsCacheDB.cache_key.like(f"{prefixo}%")
+                    ).delete(synchronize_session=False)
+                linhas_por_tags = cls._delete_by_tags(db, lista_tags) if lista_tags else 0
+                for offset in range(0, len(deletes), cls.FLUSH_BATCH_SIZE):
+                    db.query(MetricsCacheDB).filter(
+                        MetricsCacheDB.cache_key.in_(deletes[offset:offset + cls.FLUSH_BATCH_SIZE])
+                    ).delete(synchronize_session=False)
+                for offset in range(0, len(upserts), cls.FLUSH_BATCH_SIZE):
+                    cls._upsert_many(db, upserts[offset:offset + cls.FLUSH_BATCH_SIZE])
+                db.commit()
+            except Exception as e:
+                cls._flush_stats["flush_errors"] += 1
+                print(f"[CACHE] Erro ao gravar {len(pendentes)} operações do write-behind: {e}")
+                db.rollback()
+                cls._requeue_flushing()
+                return 0
+            finally:
+                db.close()
+
+            with cls._pending_lock:
+                cls._flushing = {}
+                cls._flushing_prefixes = []
+                cls._flushing_tags = []
+
+            cls._flush_stats["flushes"] += 1
+            cls._flush_stats["rows_upserted"] += len(upserts)
+            cls._flush_stats["rows_deleted"] += len(deletes)
+            cls._flush_stats["prefix_deletes"] += len(prefixos)
+            cls._tag_stats["rows_deleted"] += linhas_por_tags
+            cls._flush_stats["last_flush_ms"] = round((time.monotonic() - inicio) * 1000, 2)
+            return len(pendentes) + len(prefixos) + len(lista_tags)
+
+    @classmethod
+    def _requeue_flushing(cls) -> None:
+        """
+        Devolve à fila o lote que falhou, sem sobrescrever o que foi
+        enfileirado durante a gravação: operação mais nova da mesma chave
+        vence, e um set antigo não volta se uma remoção por prefixo/tags
+        mais nova o atinge (nem se foi invalidado depois de calculado).
+        Prefixos e tags voltam todos (o flush aplica remoções antes dos
+        upserts, então valores mais novos sobrevivem).
+        """
+        # Só o flush (com _flush_lock) altera _flushing
+        invalidados = {
+            key for key, operacao in cls._flushing.items()
+            if operacao[0] == "set" and cls._invalidated_after(key, operacao[2], operacao[4])
+        }
+        with cls._pending_lock:
+            voltaram = 0
+            for key, operacao in cls._flushing.items():
+                if key in cls._pending or key in invalidados:
+                    continue
+                if operacao[0] == "set" and (
+                    any(key.startswith(prefixo) for prefixo in cls._pending_prefixes)
+                    or any(cls._affected_by(key, operacao[4], atributos) for atributos in cls._pending_tags)
+                ):
+                    continue
+                cls._pending[key] = operacao
+                voltaram += 1
+            cls._pending_prefixes.update(cls._flushing_prefixes)
+            cls._pending_tags[:0] = cls._flushing_tags
+            voltaram += len(cls._flushing_prefixes) + len(cls._flushing_tags)
+            cls._flushing = {}
+            cls._flushing_prefixes = []
+            cls._flushing_tags = []
+        cls._flush_stats["requeued"] += voltaram
+
+    @staticmethod
+    def _upsert_many(db: Session, linhas: list[dict]) -> None:
+        """Upsert de várias linhas de metrics_cache_db (um statement no MySQL)"""
+        from ti.models.metrics_cache import MetricsCacheDB
+
+        if db.get_bind().dialect.name == "mysql":
+            from sqlalchemy.dialects.mysql import insert as mysql_insert
+
+            stmt = mysql_insert(MetricsCacheDB).values(linhas)
+            stmt = stmt.on_duplicate_key_update(
+                cache_value=stmt.inserted.cache_value,
+                calculated_at=stmt.inserted.calculated_at,
+                expires_at=stmt.inserted.expires_at,
+                tags=stmt.inserted.tags,
+            )
+            db.execute(stmt)
+            return
+
+        existentes = {
+            cache.cache_key: cache
+            for cache in db.query(MetricsCacheDB).filter(
+                MetricsCacheDB.cache_key.in_([linha["cache_key"] for linha in linhas])
+            ).all()
+        }
+        for linha in linhas:
+            cache = existentes.get(linha["cache_key"])
+            if cache is None:
+                db.add(MetricsCacheDB(**linha))
+            else:
+                cache.cache_value = linha["cache_value"]
+                cache.calculated_at = linha["calculated_at"]
+                cache.expires_at = linha["expires_at"]
+                cache.tags = linha["tags"]
+
     @classmethod
     def _get_ttl_for_key(cls, key: str) -> int:
         """Retorna TTL apropriado para uma chave"""
@@ -305,7 +1199,11 @@ class SLACacheManager:
     @classmethod
     def get_stats(cls, db: Session) -> dict:
         """Retorna estatísticas do cache"""
-        memory_count = len(cls._memory_cache)
+        with cls._lock:
+            memory_count = len(cls._memory_cache)
+            memory_bytes = cls._memory_bytes
+            memory_stats = dict(cls._memory_stats)
+        consultas = memory_stats["hits"] + memory_stats["misses"]
 
         try:
             from ti.models.metrics_cache import MetricsCacheDB
@@ -319,8 +1217,35 @@ class SLACacheManager:
 
         return {
             "memory_entries": memory_count,
+            "memory_bytes": memory_bytes,
+            "memory_max_entries": cls.MAX_ENTRIES,
+            "memory_max_bytes": cls.MAX_BYTES,
+            "memory_hits": memory_stats["hits"],
+            "memory_misses": memory_stats["misses"],
+            "memory_hit_ratio": round(memory_stats["hits"] / consultas, 4) if consultas else None,
+            "memory_evictions": memory_stats["evictions"],
+            "memory_expirations": memory_stats["expirations"],
             "database_entries": db_count,
             "expired_in_db": db_expired,
+            "stale_while_revalidate": {
+                **cls._swr_stats,
+                "in_flight": sorted(cls._inflight),
+            },
+            "invalidation_bus": {
+                **CacheInvalidationBus.get_stats(),
+                "tombstones": len(cls._tombstones) + len(cls._tombstone_prefixes) + len(cls._tag_tombstones),
+            },
+            "tags": {
+                **cls._tag_stats,
+                "tagged_memory_entries": len(cls._tagged_keys),
+            },
+            "write_behind": {
+                "enabled": cls.WRITE_BEHIND,
+                "flush_interval_seconds": cls.FLUSH_INTERVAL,
+                "max_queue": cls.MAX_QUEUE,
+                "pending": len(cls._pending) + len(cls._pending_prefixes) + len(cls._pending_tags),
+                **cls._flush_stats,
+            },
         }
 
     @classmethod
@@ -346,13 +1271,18 @@ class SLACacheManager:
             for cached in cached_entries:
                 try:
                     if cached.expires_at and cached.expires_at > agora:
-                        # Cache ainda é válido, carrega em memória
-                        value = json.loads(cached.cache_value) if isinstance(cached.cache_value, str) else cached.cache_value
-                        ttl = cls._get_ttl_for_key(cached.cache_key)
-                        with cls._lock:
-                            cls._memory_cache[cached.cache_key] = SLACacheEntry(
-                                cached.cache_key, value, ttl
-                            )
+                        tags = cls.decode_tags(cached.tags)
+                        if (
+                            cls._invalidated_after(cached.cache_key, cached.calculated_at, tags)
+                            or cls._delete_pending(cached.cache_key, tags)
+                        ):
+                            continue
+                        # Cache ainda é válido, carrega em memória pelo tempo que falta
+                        value = CacheCodec.decode(cached.cache_value)
+                        ttl = cls._remaining_ttl(cached.cache_key, cached.expires_at)
+                        cls._memory_put(
+                            cached.cache_key, value, ttl, len(cached.cache_value or ""), tags,
+                        )
                         stats["carregados"] += 1
                     else:
                         # Cache expirou, marca para deleção
@@ -373,3 +1303,6 @@ class SLACacheManager:
             except:
                 pass
             return stats
+
+
+CacheInvalidationBus.subscribe(SLACacheManager.apply_remote_invalidation)
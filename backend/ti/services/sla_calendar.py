@@ -0,0 +1,519 @@
+"""
+Índice de calendário de horas de negócio para SLA
+
+Em vez de percorrer o intervalo dia a dia (com uma query de
+SLABusinessHours por dia), o índice pré-calcula, para cada dia do
+calendário, a quantidade ACUMULADA de segundos úteis desde o primeiro
+dia coberto.
+
+Qualquer par (start, end) é resolvido com duas consultas ao índice e
+uma subtração, sem loop por dia e sem acesso ao banco:
+
+    segundos_uteis = posicao(end) - posicao(start)
+
+onde posicao(dt) = acumulado[dia] + minutos úteis já decorridos no dia.
+
+O índice é construído uma vez a partir de sla_business_hours e
+sla_feriados e reconstruído quando essas tabelas mudam
+(SLACalendarIndex.invalidate() é chamado pelos endpoints de CRUD).
+
+É o motor único de horas de negócio: SLACalculator e
+BusinessHoursCalculator delegam a ele, com as mesmas regras de feriado
+e de arredondamento (minutos inteiros sobre o total).
+
+Benchmark: python -m ti.scripts.benchmark_business_hours
+"""
+
+from __future__ import annotations
+import bisect
+import threading
+import time as _time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import date, datetime, timedelta
+from typing import Optional
+from sqlalchemy.orm import Session
+from ti.services.sla_business_hours import HolidayCalendar
+
+
+# Horário comercial padrão (segunda a sexta, 08:00 a 18:00)
+DEFAULT_BUSINESS_HOURS: dict[int, tuple[str, str]] = {
+    0: ("08:00", "18:00"),
+    1: ("08:00", "18:00"),
+    2: ("08:00", "18:00"),
+    3: ("08:00", "18:00"),
+    4: ("08:00", "18:00"),
+}
+
+
+def _hhmm_to_seconds(valor: str) -> int:
+    """Converte 'HH:MM' em segundos desde 00:00"""
+    horas, minutos = valor.split(":")
+    return int(horas) * 3600 + int(minutos) * 60
+
+
+def merge_intervals(
+    intervals,
+    start: datetime,
+    end: datetime,
+) -> list[tuple[datetime, datetime]]:
+    """
+    Une intervalos sobrepostos ou adjacentes e recorta em [start, end].
+
+    Aceita qualquer iterável de pares (inicio, fim); pares incompletos ou
+    vazios são descartados. Retorna intervalos disjuntos e ordenados.
+    """
+    recortados = sorted(
+        (max(inicio, start), min(fim, end))
+        for inicio, fim in intervals
+        if inicio is not None and fim is not None and inicio < end and fim > start
+    )
+
+    unidos: list[tuple[datetime, datetime]] = []
+    for inicio, fim in recortados:
+        if inicio >= fim:
+            continue
+        if unidos and inicio <= unidos[-1][1]:
+            if fim > unidos[-1][1]:
+                unidos[-1] = (unidos[-1][0], fim)
+        else:
+            unidos.append((inicio, fim))
+    return unidos
+
+
+class BusinessCalendar:
+    """
+    Calendário compilado com segundos úteis acumulados por dia.
+
+    Janelas são (inicio, fim) em segundos desde 00:00 por dia da semana.
+    Apenas segunda a sexta são dias úteis (mesma regra de
+    SLACalculator.is_business_day); feriados nacionais (fixos e móveis,
+    via HolidayCalendar) e os informados em feriados zeram a janela do dia.
+    """
+
+    # Margem do intervalo inicial coberto pelo índice
+    ANOS_PASSADO = 3
+    ANOS_FUTURO = 2
+
+    def __init__(
+        self,
+        business_hours: dict[int, tuple[str, str]],
+        feriados: set[date] | frozenset[date] | None = None,
+        primeiro_dia: date | None = None,
+        ultimo_dia: date | None = None,
+    ):
+        self.horarios = dict(business_hours)
+        self.feriados = frozenset(feriados or ())
+        self._janelas: dict[int, tuple[int, int]] = {}
+        for dia_semana, (inicio, fim) in self.horarios.items():
+            if dia_semana >= 5:
+                continue
+            inicio_s = _hhmm_to_seconds(inicio)
+            fim_s = _hhmm_to_seconds(fim)
+            if fim_s > inicio_s:
+                self._janelas[dia_semana] = (inicio_s, fim_s)
+
+        hoje = datetime.now().date()
+        if primeiro_dia is None:
+            primeiro_dia = date(hoje.year - self.ANOS_PASSADO, 1, 1)
+        if ultimo_dia is None:
+            ultimo_dia = date(hoje.year + self.ANOS_FUTURO, 12, 31)
+
+        self._extend_lock = threading.Lock()
+        self._tabela = self._compilar(primeiro_dia, ultimo_dia)
+
+    def _compilar(self, primeiro_dia: date, ultimo_dia: date) -> tuple:
+        """
+        Monta as tabelas do índice para [primeiro_dia, ultimo_dia].
+
+        Retorna (primeiro_ordinal, inicio, duracao, acumulado), onde
+        acumulado[i] = segundos úteis antes do dia i (len = dias + 1).
+        """
+        primeiro_ordinal = primeiro_dia.toordinal()
+        total_dias = ultimo_dia.toordinal() - primeiro_ordinal + 1
+
+        inicio = [0] * total_dias
+        duracao = [0] * total_dias
+        acumulado = [0] * (total_dias + 1)
+
+        # Bitmaps anuais de dias úteis (feriados nacionais + self.feriados)
+        bitmaps = {
+            ano: HolidayCalendar.compile_year(ano, self.feriados)
+            for ano in range(primeiro_dia.year, ultimo_dia.year + 1)
+        }
+
+        soma = 0
+        for i in range(total_dias):
+            dia = date.fromordinal(primeiro_ordinal + i)
+            janela = self._janelas.get(dia.weekday())
+            if janela and (bitmaps[dia.year] >> (dia.timetuple().tm_yday - 1)) & 1:
+                inicio[i] = janela[0]
+                duracao[i] = janela[1] - janela[0]
+            soma += duracao[i]
+            acumulado[i + 1] = soma
+
+        return (primeiro_ordinal, inicio, duracao, acumulado)
+
+    @property
+    def primeiro_dia(self) -> date:
+        return date.fromordinal(self._tabela[0])
+
+    @property
+    def ultimo_dia(self) -> date:
+        primeiro_ordinal, inicio, _, _ = self._tabela
+        return date.fromordinal(primeiro_ordinal + len(inicio) - 1)
+
+    def _garantir_cobertura(self, dia: date) -> tuple:
+        """Estende o índice (mesma configuração) se o dia estiver fora do intervalo"""
+        tabela = self._tabela
+        primeiro_ordinal, inicio, _, _ = tabela
+        ordinal = dia.toordinal()
+        if primeiro_ordinal <= ordinal < primeiro_ordinal + len(inicio):
+            return tabela
+
+        with self._extend_lock:
+            primeiro = min(self.primeiro_dia, date(dia.year, 1, 1))
+            ultimo = max(self.ultimo_dia, date(dia.year, 12, 31))
+            self._tabela = self._compilar(primeiro, ultimo)
+            return self._tabela
+
+    def position(self, dt: datetime) -> int:
+        """Segundos úteis acumulados desde o início do índice até dt"""
+        primeiro_ordinal, inicio, duracao, acumulado = self._garantir_cobertura(dt.date())
+        i = dt.toordinal() - primeiro_ordinal
+        segundos_dia = dt.hour * 3600 + dt.minute * 60 + dt.second
+        decorrido = segundos_dia - inicio[i]
+        if decorrido <= 0:
+            return acumulado[i]
+        return acumulado[i] + min(decorrido, duracao[i])
+
+    def business_seconds(self, start: datetime, end: datetime) -> int:
+        """Segundos úteis entre start e end (0 se end <= start)"""
+        if start >= end:
+            return 0
+        return max(0, self.position(end) - self.position(start))
+
+    def business_hours(self, start: datetime, end: datetime) -> float:
+        """
+        Horas úteis entre start e end.
+
+        Arredonda para minutos inteiros, como o cálculo dia a dia anterior.
+        """
+        return (self.business_seconds(start, end) // 60) / 60.0
+
+    def net_business_seconds(self, start: datetime, end: datetime, pausas=None) -> int:
+        """
+        Segundos úteis entre start e end descontando os períodos de pausa.
+
+        As pausas são unidas e recortadas em [start, end] (merge_intervals),
+        então sobreposições não são descontadas duas vezes. O desconto é
+        feito em uma única passada pelas posições no índice.
+        """
+        if start >= end:
+            return 0
+        total = self.position(end) - self.position(start)
+        if pausas:
+            for inicio, fim in merge_intervals(pausas, start, end):
+                total -= self.position(fim) - self.position(inicio)
+        return max(0, total)
+
+    def add_business_seconds(self, start: datetime, segundos: float) -> datetime:
+        """
+        Data/hora em que se completam `segundos` úteis a partir de start.
+
+        Inverso de position(): busca binária no acumulado para achar o dia
+        e soma o restante ao início da janela desse dia. Valores negativos
+        recuam no calendário.
+        """
+        alvo = self.position(start) + int(segundos)
+        if int(segundos) == 0:
+            return start
+
+        primeiro_ordinal, inicio, duracao, acumulado = self._tabela
+        while alvo > acumulado[-1]:
+            self._garantir_cobertura(self.ultimo_dia + timedelta(days=1))
+            primeiro_ordinal, inicio, duracao, acumulado = self._tabela
+        while alvo <= 0:
+            anterior = self._tabela
+            self._garantir_cobertura(self.primeiro_dia - timedelta(days=1))
+            deslocamento = self._tabela[3][len(self._tabela[1]) - len(anterior[1])]
+            alvo += deslocamento
+            primeiro_ordinal, inicio, duracao, acumulado = self._tabela
+
+        # Primeiro dia i com acumulado[i] < alvo <= acumulado[i + 1]
+        i = bisect.bisect_left(acumulado, alvo) - 1
+        dia = date.fromordinal(primeiro_ordinal + i)
+        restante = alvo - acumulado[i]
+        return datetime(dia.year, dia.month, dia.day) + timedelta(seconds=inicio[i] + restante)
+
+    def business_seconds_many(
+        self,
+        starts: list[datetime],
+        ends: list[datetime],
+        pausas: list | None = None,
+    ) -> list[int]:
+        """
+        Versão em lote de net_business_seconds.
+
+        Garante a cobertura do índice uma única vez para o menor e o maior
+        dia do lote e resolve cada par com lookups diretos nas tabelas.
+        pausas, se informado, é alinhado com starts/ends (item None = sem pausa).
+        """
+        if len(starts) != len(ends):
+            raise ValueError("starts e ends devem ter o mesmo tamanho")
+        if pausas is not None and len(pausas) != len(starts):
+            raise ValueError("pausas deve ter o mesmo tamanho de starts/ends")
+        if not starts:
+            return []
+
+        datas = [dt for dt in starts if dt is not None] + [dt for dt in ends if dt is not None]
+        if datas:
+            self._garantir_cobertura(min(datas).date())
+            self._garantir_cobertura(max(datas).date())
+        primeiro_ordinal, inicio, duracao, acumulado = self._tabela
+
+        def posicao(dt: datetime) -> int:
+            i = dt.toordinal() - primeiro_ordinal
+            decorrido = dt.hour * 3600 + dt.minute * 60 + dt.second - inicio[i]
+            if decorrido <= 0:
+                return acumulado[i]
+            return acumulado[i] + min(decorrido, duracao[i])
+
+        resultado = []
+        for idx, (start, end) in enumerate(zip(starts, ends)):
+            if start is None or end is None or start >= end:
+                resultado.append(0)
+                continue
+            total = posicao(end) - posicao(start)
+            if pausas is not None and pausas[idx]:
+                for pausa_inicio, pausa_fim in merge_intervals(pausas[idx], start, end):
+                    total -= posicao(pausa_fim) - posicao(pausa_inicio)
+            resultado.append(max(0, total))
+        return resultado
+
+    def is_business_day(self, dia: date | datetime) -> bool:
+        """Dia útil = tem janela de atendimento e não é feriado"""
+        if isinstance(dia, datetime):
+            dia = dia.date()
+        primeiro_ordinal, _, duracao, _ = self._garantir_cobertura(dia)
+        return duracao[dia.toordinal() - primeiro_ordinal] > 0
+
+    def is_business_time(self, dt: datetime) -> bool:
+        """Verifica se dt está dentro da janela útil do dia (limites inclusivos)"""
+        primeiro_ordinal, inicio, duracao, _ = self._garantir_cobertura(dt.date())
+        i = dt.toordinal() - primeiro_ordinal
+        if duracao[i] <= 0:
+            return False
+        segundos_dia = dt.hour * 3600 + dt.minute * 60 + dt.second
+        return inicio[i] <= segundos_dia <= inicio[i] + duracao[i]
+
+    def get_stats(self) -> dict:
+        return {
+            "primeiro_dia": self.primeiro_dia.isoformat(),
+            "ultimo_dia": self.ultimo_dia.isoformat(),
+            "dias_cobertos": len(self._tabela[1]),
+            "feriados": len(self.feriados),
+        }
+
+
+# Cache por requisição: {"versao": int, "horarios": dict} ou None fora de request_scope()
+_business_hours_request: ContextVar[Optional[dict]] = ContextVar(
+    "sla_business_hours_request", default=None
+)
+
+
+class BusinessHoursSnapshot:
+    """
+    Snapshot versionado de sla_business_hours (horário ativo por dia da semana).
+
+    Duas camadas:
+    - processo: carregado uma vez (1 query) e recarregado quando a versão
+      muda (CRUD de /sla/business-hours chama invalidate()) ou após
+      RELOAD_SECONDS, para refletir mudanças feitas por outros workers
+    - requisição: contextvar aberta por request_scope(); dentro de uma
+      requisição as leituras repetidas não passam nem pelo lock do processo
+    """
+
+    RELOAD_SECONDS = 5 * 60
+
+    _horarios: Optional[dict[int, tuple[str, str]]] = None
+    _loaded_version: int = -1
+    _loaded_at: float = 0.0
+    _version: int = 0
+    _lock = threading.Lock()
+
+    _hits_requisicao: int = 0
+    _hits_processo: int = 0
+    _cargas: int = 0
+    _sem_banco: int = 0
+
+    @classmethod
+    def get_all(cls, db: Session | None = None) -> dict[int, tuple[str, str]]:
+        """Horários ativos por dia da semana (0=segunda), com o padrão para dias sem registro"""
+        escopo = _business_hours_request.get()
+        if escopo is not None and escopo.get("versao") == cls._version:
+            cls._hits_requisicao += 1
+            return escopo["horarios"]
+
+        horarios = cls._horarios
+        if horarios is not None and cls._loaded_version == cls._version and (
+            db is None or _time.monotonic() - cls._loaded_at < cls.RELOAD_SECONDS
+        ):
+            cls._hits_processo += 1
+        elif db is None:
+            # Fallback sem banco (padrão ou snapshot de versão antiga): não
+            # vai para o escopo da requisição, senão uma leitura posterior
+            # com sessão na mesma requisição continuaria vendo o fallback
+            cls._sem_banco += 1
+            return horarios if horarios is not None else DEFAULT_BUSINESS_HOURS
+        else:
+            with cls._lock:
+                if (
+                    cls._horarios is None
+                    or cls._loaded_version != cls._version
+                    or _time.monotonic() - cls._loaded_at >= cls.RELOAD_SECONDS
+                ):
+                    versao = cls._version
+                    cls._horarios = cls._load(db)
+                    cls._loaded_version = versao
+                    cls._loaded_at = _time.monotonic()
+                    cls._cargas += 1
+                else:
+                    cls._hits_processo += 1
+                horarios = cls._horarios
+
+        if escopo is not None:
+            escopo["versao"] = cls._version
+            escopo["horarios"] = horarios
+        return horarios
+
+    @classmethod
+    def get(cls, db: Session | None, dia_semana: int) -> tuple[str, str] | None:
+        return cls.get_all(db).get(dia_semana)
+
+    @classmethod
+    def invalidate(cls) -> None:
+        """Incrementa a versão: a próxima leitura recarrega do banco"""
+        with cls._lock:
+            cls._version += 1
+
+    @staticmethod
+    @contextmanager
+    def request_scope():
+        """Abre o cache por requisição (usado pelo middleware HTTP)"""
+        token = _business_hours_request.set({})
+        try:
+            yield
+        finally:
+            _business_hours_request.reset(token)
+
+    @classmethod
+    def get_stats(cls) -> dict:
+        leituras = cls._hits_requisicao + cls._hits_processo + cls._cargas + cls._sem_banco
+        hits = cls._hits_requisicao + cls._hits_processo
+        return {
+            "versao": cls._version,
+            "versao_carregada": cls._loaded_version,
+            "hits_requisicao": cls._hits_requisicao,
+            "hits_processo": cls._hits_processo,
+            "cargas_banco": cls._cargas,
+            "leituras_sem_banco": cls._sem_banco,
+            "hit_rate": round(hits / leituras * 100, 2) if leituras else 0.0,
+        }
+
+    @staticmethod
+    def _load(db: Session) -> dict[int, tuple[str, str]]:
+        from ti.models.sla_config import SLABusinessHours
+
+        business_hours = dict(DEFAULT_BUSINESS_HOURS)
+        try:
+            rows = db.query(SLABusinessHours).filter(
+                SLABusinessHours.ativo == True
+            ).order_by(SLABusinessHours.id.asc()).all()
+            vistos: set[int] = set()
+            for bh in rows:
+                # Primeiro registro ativo do dia prevalece
+                if bh.dia_semana in vistos:
+                    continue
+                vistos.add(bh.dia_semana)
+                business_hours[bh.dia_semana] = (bh.hora_inicio, bh.hora_fim)
+        except Exception as e:
+            print(f"[SLA CALENDAR] Erro ao carregar horários comerciais: {e}")
+        return business_hours
+
+
+class SLACalendarIndex:
+    """
+    Mantém o BusinessCalendar compilado do processo.
+
+    - Construído na primeira chamada com sessão de banco
+    - Invalidado pelos endpoints de business-hours e feriados
+    - Reconstruído após RELOAD_SECONDS para refletir mudanças feitas
+      por outros workers
+    """
+
+    RELOAD_SECONDS = 5 * 60
+
+    _calendar: Optional[BusinessCalendar] = None
+    _default_calendar: Optional[BusinessCalendar] = None
+    _built_at: float = 0.0
+    _version: int = 0
+    _builds: int = 0
+    _lock = threading.Lock()
+
+    @classmethod
+    def get(cls, db: Session | None = None) -> BusinessCalendar:
+        """
+        Retorna o calendário compilado.
+
+        Sem sessão de banco, usa o último calendário construído ou, se
+        ainda não houver, o calendário com horários padrão.
+        """
+        calendar = cls._calendar
+        if calendar is not None:
+            if db is None or _time.monotonic() - cls._built_at < cls.RELOAD_SECONDS:
+                return calendar
+
+        if db is None:
+            return cls._get_default()
+
+        with cls._lock:
+            calendar = cls._calendar
+            if calendar is None or _time.monotonic() - cls._built_at >= cls.RELOAD_SECONDS:
+                calendar = cls._build_from_db(db)
+                cls._calendar = calendar
+                cls._built_at = _time.monotonic()
+                cls._builds += 1
+            return calendar
+
+    @classmethod
+    def invalidate(cls) -> None:
+        """Descarta o calendário compilado (chamar após alterar horários ou feriados)"""
+        with cls._lock:
+            cls._calendar = None
+            cls._version += 1
+
+    @classmethod
+    def get_stats(cls) -> dict:
+        calendar = cls._calendar
+        return {
+            "construido": calendar is not None,
+            "versao": cls._version,
+            "reconstrucoes": cls._builds,
+            **(calendar.get_stats() if calendar else {}),
+        }
+
+    @classmethod
+    def _get_default(cls) -> BusinessCalendar:
+        if cls._default_calendar is None:
+            cls._default_calendar = BusinessCalendar(DEFAULT_BUSINESS_HOURS)
+        return cls._default_calendar
+
+    @staticmethod
+    def _build_from_db(db: Session) -> BusinessCalendar:
+        """Compila o calendário com o snapshot de horários e os feriados ativos"""
+        business_hours = BusinessHoursSnapshot.get_all(db)
+
+        feriados = HolidayCalendar.load_feriados(db)
+
+        return BusinessCalendar(business_hours, feriados)
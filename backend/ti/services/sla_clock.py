@@ -0,0 +1,212 @@
+"""
+Relógio de SLA materializado por chamado (tabela chamado_sla_clock)
+
+Em vez de recalcular o tempo de resolução percorrendo o histórico a cada
+leitura, cada chamado guarda:
+- minutos úteis acumulados até a última transição (descontando pausas)
+- minutos úteis pausados ("Em análise")
+- timestamp da última transição e estado atual do relógio
+
+O relógio é avançado a cada mudança de status (atualizar_status). A leitura
+é O(1): valor armazenado + tempo útil desde a última transição, quando o
+relógio está rodando.
+
+Chamados sem registro (anteriores à tabela) são reconstruídos a partir do
+histórico na primeira transição ou pelo script create_sla_clock_table.
+"""
+
+from __future__ import annotations
+from datetime import datetime
+from sqlalchemy.orm import Session
+from sqlalchemy import and_
+from core.db import engine
+from core.utils import now_brazil_naive
+from ti.models.chamado import Chamado
+from ti.models.historico_status import HistoricoStatus
+from ti.models.sla_clock import ChamadoSLAClock
+from ti.services.sla_calendar import SLACalendarIndex, merge_intervals
+
+
+class SLAClock:
+    """Mantém e lê o relógio de SLA de resolução dos chamados"""
+
+    RUNNING = "running"
+    PAUSED = "paused"
+    STOPPED = "stopped"
+
+    # Status que pausam o relógio (mesma regra de calculate_business_hours_excluding_paused)
+    PAUSE_STATUSES = {"em análise", "em analise"}
+    # Status que param o relógio
+    CLOSED_STATUSES = {"Concluído", "Concluido", "Cancelado"}
+
+    _table_ready = False
+
+    @classmethod
+    def ensure_table(cls) -> None:
+        if cls._table_ready:
+            return
+        try:
+            ChamadoSLAClock.__table__.create(bind=engine, checkfirst=True)
+            cls._table_ready = True
+        except Exception as e:
+            print(f"[SLA CLOCK] Erro ao criar tabela: {e}")
+
+    @staticmethod
+    def estado_para_status(status: str | None) -> str:
+        """Estado do relógio correspondente a um status de chamado"""
+        if status in SLAClock.CLOSED_STATUSES:
+            return SLAClock.STOPPED
+        if status and status.lower() in SLAClock.PAUSE_STATUSES:
+            return SLAClock.PAUSED
+        return SLAClock.RUNNING
+
+    @staticmethod
+    def inicializar(db: Session, chamado: Chamado) -> ChamadoSLAClock:
+        """Cria o relógio zerado de um chamado recém-aberto (sem commit)"""
+        SLAClock.ensure_table()
+        agora = now_brazil_naive()
+        clock = ChamadoSLAClock(
+            chamado_id=chamado.id,
+            minutos_uteis=0.0,
+            minutos_pausados=0.0,
+            ultima_transicao=chamado.data_abertura or agora,
+            estado=SLAClock.estado_para_status(chamado.status),
+            status_chamado=chamado.status,
+            atualizado_em=agora,
+        )
+        return db.merge(clock)
+
+    @staticmethod
+    def _avancar(clock: ChamadoSLAClock, agora: datetime, db: Session | None = None) -> None:
+        """Acumula o tempo útil entre a última transição e agora conforme o estado"""
+        if agora <= clock.ultima_transicao:
+            return
+        minutos = SLACalendarIndex.get(db).business_seconds(clock.ultima_transicao, agora) / 60.0
+        if clock.estado == SLAClock.RUNNING:
+            clock.minutos_uteis = (clock.minutos_uteis or 0.0) + minutos
+        elif clock.estado == SLAClock.PAUSED:
+            clock.minutos_pausados = (clock.minutos_pausados or 0.0) + minutos
+        clock.ultima_transicao = agora
+
+    @staticmethod
+    def registrar_transicao(
+        db: Session,
+        chamado: Chamado,
+        status_anterior: str | None,
+        agora: datetime | None = None,
+    ) -> ChamadoSLAClock:
+        """
+        Avança o relógio até agora e aplica o novo status do chamado (sem commit).
+
+        Deve ser chamado na mesma transação da mudança de status.
+        """
+        SLAClock.ensure_table()
+        if agora is None:
+            agora = now_brazil_naive()
+
+        clock = db.get(ChamadoSLAClock, chamado.id)
+        if clock is None:
+            # Chamado anterior à tabela: reconstrói até agora com o status anterior
+            clock = SLAClock.reconstruir(db, chamado, agora, status=status_anterior)
+        else:
+            SLAClock._avancar(clock, agora, db)
+
+        clock.estado = SLAClock.estado_para_status(chamado.status)
+        clock.status_chamado = chamado.status
+        clock.atualizado_em = agora
+        db.add(clock)
+        return clock
+
+    @staticmethod
+    def reconstruir(
+        db: Session,
+        chamado: Chamado,
+        agora: datetime | None = None,
+        status: str | None = None,
+    ) -> ChamadoSLAClock:
+        """
+        Recalcula o relógio a partir do histórico de status (sem commit).
+
+        Usado no backfill e para chamados que ainda não têm relógio.
+        """
+        SLAClock.ensure_table()
+        if agora is None:
+            agora = now_brazil_naive()
+        status = status or chamado.status
+        estado = SLAClock.estado_para_status(status)
+
+        inicio = chamado.data_abertura or agora
+        fim = agora
+        if estado == SLAClock.STOPPED:
+            fim = chamado.data_conclusao or chamado.cancelado_em or agora
+        fim = max(inicio, fim)
+
+        # Pausas fechadas e, se houver, a pausa em aberto (até fim)
+        rows = db.query(HistoricoStatus.data_inicio, HistoricoStatus.data_fim).filter(
+            and_(
+                HistoricoStatus.chamado_id == chamado.id,
+                HistoricoStatus.status.in_(["Em análise", "Em Análise"]),
+                HistoricoStatus.data_inicio.isnot(None),
+            )
+        ).all()
+        pausas = [(data_inicio, data_fim or fim) for data_inicio, data_fim in rows]
+
+        calendar = SLACalendarIndex.get(db)
+        segundos_uteis = calendar.net_business_seconds(inicio, fim, pausas)
+        segundos_pausados = sum(
+            calendar.business_seconds(p_inicio, p_fim)
+            for p_inicio, p_fim in merge_intervals(pausas, inicio, fim)
+        )
+
+        clock = db.get(ChamadoSLAClock, chamado.id)
+        if clock is None:
+            clock = ChamadoSLAClock(chamado_id=chamado.id)
+        clock.minutos_uteis = segundos_uteis / 60.0
+        clock.minutos_pausados = segundos_pausados / 60.0
+        clock.ultima_transicao = fim
+        clock.estado = estado
+        clock.status_chamado = status
+        clock.atualizado_em = now_brazil_naive()
+        db.add(clock)
+        return clock
+
+    @staticmethod
+    def minutos_decorridos(clock: ChamadoSLAClock, agora: datetime, db: Session | None = None) -> float:
+        """Minutos úteis de resolução até agora (leitura O(1))"""
+        minutos = clock.minutos_uteis or 0.0
+        if clock.estado == SLAClock.RUNNING and agora > clock.ultima_transicao:
+            minutos += SLACalendarIndex.get(db).business_seconds(clock.ultima_transicao, agora) / 60.0
+        return minutos
+
+    @staticmethod
+    def tempo_resolucao_horas(db: Session, chamado_id: int, agora: datetime | None = None) -> float | None:
+        """
+        Tempo de resolução (horas úteis, sem pausas) lido do relógio.
+
+        Retorna None se o chamado ainda não tem relógio.
+        """
+        SLAClock.ensure_table()
+        if agora is None:
+            agora = now_brazil_naive()
+        try:
+            clock = db.get(ChamadoSLAClock, chamado_id)
+        except Exception:
+            return None
+        if clock is None:
+            return None
+        # Arredonda para minutos inteiros, como o cálculo pelo histórico
+        return int(SLAClock.minutos_decorridos(clock, agora, db) + 1e-6) / 60.0
+
+    @staticmethod
+    def get_many(db: Session, chamado_ids: list[int]) -> dict[int, ChamadoSLAClock]:
+        """Carrega os relógios de vários chamados em uma query"""
+        if not chamado_ids:
+            return {}
+        SLAClock.ensure_table()
+        try:
+            rows = db.query(ChamadoSLAClock).filter(
+                ChamadoSLAClock.chamado_id.in_(chamado_ids)
+            ).all()
+        except Exception:
+            return {}
+        return {clock.chamado_id: clock for clock in rows}
@@ -0,0 +1,524 @@
+"""
+Cubo de cumprimento de SLA (tabela sla_compliance_cube)
+
+Cada chamado concluído contribui para exatamente uma célula do cubo,
+identificada por (dia da conclusão, unidade, problema, prioridade), com
+contagens e somas aditivas:
+- concluidos, dentro_sla / fora_sla, soma_horas_resolucao
+- respondidos, resposta_dentro_sla / resposta_fora_sla, soma_horas_resposta
+
+A classificação usa a configuração de SLA da prioridade vigente na
+conclusão (o backfill usa a configuração atual). Conclusão, reabertura e
+exclusão aplicam a diferença entre a contribuição anterior e a atual na
+mesma transação da alteração do chamado (mesmo modelo do agregado diário).
+A contribuição aplicada fica registrada por chamado
+(sla_compliance_contribuicao): a reabertura subtrai exatamente o que foi
+somado, mesmo que a configuração ou as pausas tenham mudado depois.
+Mudança na configuração de SLA reconstrói o cubo (reconstruir_em_background).
+
+Concorrência entre o caminho incremental e a reconstrução: os dois travam
+a linha do chamado (SELECT ... FOR UPDATE). O incremental trava só o
+chamado alterado, antes de ler a contribuição registrada; a reconstrução
+calcula o cubo sem travas e, na troca das tabelas, trava os chamados,
+recalcula os que mudaram desde a leitura e só então apaga e regrava, na
+mesma transação. Uma conclusão/reabertura nunca se perde nem conta duas
+vezes; durante a troca (curta) as alterações de chamados esperam.
+
+Recortes ("cumprimento por unidade neste mês para prioridade Alta") são
+um GROUP BY sobre as células, sem recalcular horas úteis.
+
+Backfill: python -m ti.scripts.create_sla_compliance_cube_table
+"""
+
+from __future__ import annotations
+import threading
+from datetime import date
+from sqlalchemy.orm import Session
+from sqlalchemy import and_, func
+from core.db import SessionLocal, engine
+from core.utils import now_brazil_naive
+from ti.models.chamado import Chamado
+from ti.models.sla_config import SLAConfiguration
+from ti.models.sla_compliance import SLAComplianceDaily, SLAComplianceContribution
+
+
+class SLAComplianceCube:
+    """Mantém e consulta o cubo de cumprimento de SLA"""
+
+    RESOLVED_STATUSES = {"Concluído", "Concluido"}
+    METRICAS = (
+        "concluidos",
+        "dentro_sla",
+        "fora_sla",
+        "soma_horas_resolucao",
+        "respondidos",
+        "resposta_dentro_sla",
+        "resposta_fora_sla",
+        "soma_horas_resposta",
+    )
+    DIMENSOES = ("dia", "mes", "unidade", "problema", "prioridade")
+
+    # Colunas do chamado que mudam a contribuição: a reconstrução recalcula
+    # os chamados em que alguma delas mudou entre o cálculo e a troca
+    COLUNAS_ESTADO = (
+        "status",
+        "data_abertura",
+        "data_primeira_resposta",
+        "data_conclusao",
+        "deletado_em",
+        "prioridade",
+        "unidade",
+        "problema",
+    )
+
+    _table_ready = False
+
+    # Reconstrução em background (mudança de configuração de SLA): uma por
+    # vez; pedido durante uma reconstrução agenda mais uma ao final
+    _rebuild_lock = threading.Lock()
+    _rebuild_thread: threading.Thread | None = None
+    _rebuild_pendente = False
+
+    @classmethod
+    def ensure_table(cls) -> None:
+        if cls._table_ready:
+            return
+        try:
+            SLAComplianceDaily.__table__.create(bind=engine, checkfirst=True)
+            SLAComplianceContribution.__table__.create(bind=engine, checkfirst=True)
+            cls._table_ready = True
+        except Exception as e:
+            print(f"[SLA CUBO] Erro ao criar tabela: {e}")
+
+    @staticmethod
+    def chave(chamado: Chamado) -> tuple:
+        """(dia da conclusão, unidade, problema, prioridade) da célula do chamado"""
+        return (
+            chamado.data_conclusao.date(),
+            chamado.unidade or "",
+            chamado.problema or "",
+            chamado.prioridade or "Normal",
+        )
+
+    @staticmethod
+    def _configs(db: Session) -> dict[str, SLAConfiguration]:
+        return {
+            config.prioridade: config
+            for config in db.query(SLAConfiguration).filter(SLAConfiguration.ativo == True).all()
+        }
+
+    @staticmethod
+    def _valores(
+        resposta: float | None,
+        resolucao: float,
+        config: SLAConfiguration | None,
+    ) -> dict:
+        valores = dict.fromkeys(SLAComplianceCube.METRICAS, 0)
+        valores["concluidos"] = 1
+        valores["soma_horas_resolucao"] = resolucao
+        if config is not None:
+            if resolucao <= config.tempo_resolucao_horas:
+                valores["dentro_sla"] = 1
+            else:
+                valores["fora_sla"] = 1
+        if resposta is not None:
+            valores["respondidos"] = 1
+            valores["soma_horas_resposta"] = resposta
+            if config is not None:
+                if resposta <= config.tempo_resposta_horas:
+                    valores["resposta_dentro_sla"] = 1
+                else:
+                    valores["resposta_fora_sla"] = 1
+        return valores
+
+    @staticmethod
+    def contribuicao(db: Session, chamado: Chamado) -> tuple[tuple, dict] | None:
+        """
+        Contribuição atual do chamado para o cubo: (chave, métricas).
+
+        Retorna None para chamados não concluídos ou excluídos.
+        """
+        from ti.services.sla import SLACalculator
+        from ti.services.sla_percentiles import SLAPercentiles
+
+        tempos = SLAPercentiles.calcular_tempos(db, [chamado])
+        if chamado.id not in tempos:
+            return None
+        resposta, resolucao = tempos[chamado.id]
+        config = SLACalculator.get_sla_config_by_priority(db, chamado.prioridade or "Normal")
+        return SLAComplianceCube.chave(chamado), SLAComplianceCube._valores(resposta, resolucao, config)
+
+    @staticmethod
+    def bloquear(db: Session, chamado: Chamado) -> None:
+        """
+        Trava a linha do chamado até o fim da transação e recarrega seus
+        campos (serializa com a reconstrução do cubo)
+        """
+        db.query(Chamado).filter(Chamado.id == chamado.id).populate_existing().with_for_update().first()
+
+    @staticmethod
+    def registrada(db: Session, chamado: Chamado) -> tuple[tuple, dict] | None | bool:
+        """
+        Contribuição registrada do chamado (a que está somada no cubo).
+
+        None se o chamado não está no cubo; False se não há registro (chamado
+        concluído antes do registro existir: use contribuicao()).
+
+        Leitura com trava: vê o registro mais recente, mesmo que uma
+        reconstrução tenha confirmado depois do início da transação.
+        """
+        SLAComplianceCube.ensure_table()
+        registro = db.query(SLAComplianceContribution).filter(
+            SLAComplianceContribution.chamado_id == chamado.id
+        ).populate_existing().with_for_update().first()
+        if registro is None:
+            return False
+        if not registro.concluidos:
+            return None
+        chave = (registro.data, registro.unidade, registro.problema, registro.prioridade)
+        return chave, {metrica: getattr(registro, metrica) for metrica in SLAComplianceCube.METRICAS}
+
+    @staticmethod
+    def anterior(db: Session, chamado: Chamado) -> tuple[tuple, dict] | None:
+        """
+        Contribuição do chamado antes de uma alteração: a registrada ou, sem
+        registro, a recalculada. Trava o chamado até o commit da alteração.
+        """
+        SLAComplianceCube.bloquear(db, chamado)
+        registrada = SLAComplianceCube.registrada(db, chamado)
+        if registrada is not False:
+            return registrada
+        return SLAComplianceCube.contribuicao(db, chamado)
+
+    @staticmethod
+    def _registrar(db: Session, chamado_id: int, contribuicao: tuple[tuple, dict] | None) -> None:
+        """Grava (ou remove) o registro da contribuição aplicada (sem commit)"""
+        registro = db.get(SLAComplianceContribution, chamado_id)
+        if contribuicao is None:
+            if registro is not None:
+                db.delete(registro)
+            return
+        (data, unidade, problema, prioridade), valores = contribuicao
+        if registro is None:
+            registro = SLAComplianceContribution(chamado_id=chamado_id)
+            db.add(registro)
+        registro.data = data
+        registro.unidade = unidade
+        registro.problema = problema
+        registro.prioridade = prioridade
+        for metrica in SLAComplianceCube.METRICAS:
+            setattr(registro, metrica, valores[metrica])
+        registro.atualizado_em = now_brazil_naive()
+
+    @staticmethod
+    def aplicar(db: Session, contribuicao: tuple[tuple, dict] | None, sinal: int = 1) -> None:
+        """Soma (sinal=1) ou subtrai (sinal=-1) uma contribuição do cubo (sem commit)"""
+        if contribuicao is None:
+            return
+        SLAComplianceCube.ensure_table()
+        chave, valores = contribuicao
+        deltas = {metrica: valores[metrica] * sinal for metrica in SLAComplianceCube.METRICAS}
+        agora = now_brazil_naive()
+        data, unidade, problema, prioridade = chave
+
+        if db.get_bind().dialect.name == "mysql":
+            # Incremento atômico: evita corrida entre requisições na mesma célula
+            from sqlalchemy.dialects.mysql import insert as mysql_insert
+
+            stmt = mysql_insert(SLAComplianceDaily).values(
+                data=data,
+                unidade=unidade,
+                problema=problema,
+                prioridade=prioridade,
+                atualizado_em=agora,
+                **deltas,
+            )
+            stmt = stmt.on_duplicate_key_update(
+                atualizado_em=stmt.inserted.atualizado_em,
+                **{
+                    metrica: getattr(SLAComplianceDaily, metrica) + getattr(stmt.inserted, metrica)
+                    for metrica in SLAComplianceCube.METRICAS
+                },
+            )
+            db.execute(stmt)
+            return
+
+        linha = db.get(SLAComplianceDaily, chave)
+        if linha is None:
+            linha = SLAComplianceDaily(
+                data=data,
+                unidade=unidade,
+                problema=problema,
+                prioridade=prioridade,
+                **dict.fromkeys(SLAComplianceCube.METRICAS, 0),
+            )
+            db.add(linha)
+        for metrica, delta in deltas.items():
+            setattr(linha, metrica, (getattr(linha, metrica) or 0) + delta)
+        linha.atualizado_em = agora
+
+    @staticmethod
+    def registrar_alteracao(db: Session, anterior: tuple[tuple, dict] | None, chamado: Chamado) -> None:
+        """
+        Chamado alterado (conclusão/reabertura/exclusão): troca a contribuição
+        anterior (anterior(), capturada antes da alteração) pela atual e
+        registra a atual (sem commit).
+        """
+        atual = SLAComplianceCube.contribuicao(db, chamado)
+        if anterior != atual:
+            SLAComplianceCube.aplicar(db, anterior, -1)
+            SLAComplianceCube.aplicar(db, atual, 1)
+        SLAComplianceCube._registrar(db, chamado.id, atual)
+
+    @staticmethod
+    def _estados(db: Session, bloquear: bool = False) -> dict[int, tuple]:
+        """{id: COLUNAS_ESTADO} de todos os chamados (com bloquear, trava as linhas)"""
+        query = db.query(
+            Chamado.id,
+            *[getattr(Chamado, coluna) for coluna in SLAComplianceCube.COLUNAS_ESTADO],
+        ).order_by(Chamado.id)
+        if bloquear:
+            query = query.with_for_update()
+        return {row[0]: tuple(row[1:]) for row in query.all()}
+
+    @staticmethod
+    def _calcular_contribuicoes(
+        db: Session,
+        ids: list[int],
+        configs: dict[str, SLAConfiguration],
+        batch_size: int,
+    ) -> dict[int, tuple[tuple, dict]]:
+        """Contribuições dos chamados concluídos entre ids (tempos em lote por bloco)"""
+        from ti.services.sla_percentiles import SLAPercentiles
+
+        contribuicoes = {}
+        for offset in range(0, len(ids), batch_size):
+            chamados = db.query(Chamado).filter(Chamado.id.in_(ids[offset:offset + batch_size])).all()
+            tempos = SLAPercentiles.calcular_tempos(db, chamados)
+            for c in chamados:
+                if c.id not in tempos:
+                    continue
+                resposta, resolucao = tempos[c.id]
+                valores = SLAComplianceCube._valores(resposta, resolucao, configs.get(c.prioridade or "Normal"))
+                contribuicoes[c.id] = (SLAComplianceCube.chave(c), valores)
+        return contribuicoes
+
+    @staticmethod
+    def backfill(db: Session, batch_size: int = 500) -> int:
+        """
+        Reconstrói o cubo a partir dos chamados concluídos.
+
+        1. Calcula as contribuições sem travas (parte demorada)
+        2. Trava todos os chamados, recalcula os que mudaram desde o passo 1
+           (alterações confirmadas no meio do cálculo) e troca o conteúdo das
+           duas tabelas na mesma transação
+        """
+        SLAComplianceCube.ensure_table()
+        configs = SLAComplianceCube._configs(db)
+        estados = SLAComplianceCube._estados(db)
+        indice = {coluna: i for i, coluna in enumerate(SLAComplianceCube.COLUNAS_ESTADO)}
+        concluidos = [
+            chamado_id for chamado_id, estado in estados.items()
+            if estado[indice["deletado_em"]] is None
+            and estado[indice["status"]] in SLAComplianceCube.RESOLVED_STATUSES
+            and estado[indice["data_conclusao"]] is not None
+        ]
+        contribuicoes = SLAComplianceCube._calcular_contribuicoes(db, concluidos, configs, batch_size)
+        # Encerra a leitura: a próxima transação começa com as travas
+        db.commit()
+
+        atuais = SLAComplianceCube._estados(db, bloquear=True)
+        alterados = sorted(
+            chamado_id for chamado_id in estados.keys() | atuais.keys()
+            if estados.get(chamado_id) != atuais.get(chamado_id)
+        )
+        if alterados:
+            for chamado_id in alterados:
+                contribuicoes.pop(chamado_id, None)
+            contribuicoes.update(SLAComplianceCube._calcular_contribuicoes(db, alterados, configs, batch_size))
+            print(f"[SLA CUBO] {len(alterados)} chamado(s) alterado(s) durante a reconstrução recalculados")
+
+        cubo: dict[tuple, dict] = {}
+        for chave, valores in contribuicoes.values():
+            celula = cubo.setdefault(chave, dict.fromkeys(SLAComplianceCube.METRICAS, 0))
+            for metrica, valor in valores.items():
+                celula[metrica] += valor
+
+        agora = now_brazil_naive()
+        db.query(SLAComplianceDaily).delete(synchronize_session=False)
+        db.query(SLAComplianceContribution).delete(synchronize_session=False)
+        linhas = [
+            {
+                "data": data,
+                "unidade": unidade,
+                "problema": problema,
+                "prioridade": prioridade,
+                "atualizado_em": agora,
+                **valores,
+            }
+            for (data, unidade, problema, prioridade), valores in cubo.items()
+        ]
+        for offset in range(0, len(linhas), batch_size):
+            db.execute(SLAComplianceDaily.__table__.insert(), linhas[offset:offset + batch_size])
+        linhas_registro = [
+            {
+                "chamado_id": chamado_id,
+                "data": data,
+                "unidade": unidade,
+                "problema": problema,
+                "prioridade": prioridade,
+                "atualizado_em": agora,
+                **valores,
+            }
+            for chamado_id, ((data, unidade, problema, prioridade), valores) in contribuicoes.items()
+        ]
+        for offset in range(0, len(linhas_registro), batch_size):
+            db.execute(SLAComplianceContribution.__table__.insert(), linhas_registro[offset:offset + batch_size])
+        db.commit()
+
+        # As tabelas do cubo não estão em DataVersion.TRACKED_TABLES: sem isso
+        # o ETag de /sla/cubo continuaria o da escrita que pediu a reconstrução
+        # e um poll feito no meio dela receberia 304 com o cubo antigo
+        from ti.services.data_version import DataVersion
+        DataVersion.bump()
+        return len(linhas)
+
+    @classmethod
+    def reconstruir_em_background(cls) -> None:
+        """Agenda a reconstrução do cubo com a configuração atual (sessão própria)"""
+        with cls._rebuild_lock:
+            if cls._rebuild_thread is not None and cls._rebuild_thread.is_alive():
+                cls._rebuild_pendente = True
+                return
+            cls._rebuild_thread = threading.Thread(
+                target=cls._rebuild_loop,
+                daemon=True,
+                name="SLAComplianceCubeRebuildThread",
+            )
+            cls._rebuild_thread.start()
+
+    @classmethod
+    def _rebuild_loop(cls) -> None:
+        while True:
+            db = SessionLocal()
+            try:
+                linhas = cls.backfill(db)
+                print(f"[SLA CUBO] Cubo reconstruído ({linhas} células)")
+            except Exception as e:
+                db.rollback()
+                print(f"[SLA CUBO] Erro ao reconstruir cubo: {e}")
+            finally:
+                db.close()
+            with cls._rebuild_lock:
+                if not cls._rebuild_pendente:
+                    cls._rebuild_thread = None
+                    return
+                cls._rebuild_pendente = False
+
+    @staticmethod
+    def is_empty(db: Session) -> bool:
+        """Sem registros de contribuição (cubo vazio ou anterior ao registro por chamado)"""
+        SLAComplianceCube.ensure_table()
+        return db.query(SLAComplianceContribution.chamado_id).first() is None
+
+    @staticmethod
+    def _indicadores(valores: dict) -> dict:
+        """Percentuais e médias derivados das somas de uma fatia"""
+        classificados = valores["dentro_sla"] + valores["fora_sla"]
+        respostas_classificadas = valores["resposta_dentro_sla"] + valores["resposta_fora_sla"]
+        return {
+            **valores,
+            "soma_horas_resolucao": round(valores["soma_horas_resolucao"], 2),
+            "soma_horas_resposta": round(valores["soma_horas_resposta"], 2),
+            "percentual_dentro_sla": round(valores["dentro_sla"] / classificados * 100, 2) if classificados else None,
+            "percentual_resposta_dentro_sla": (
+                round(valores["resposta_dentro_sla"] / respostas_classificadas * 100, 2)
+                if respostas_classificadas else None
+            ),
+            "tempo_medio_resolucao_horas": (
+                round(valores["soma_horas_resolucao"] / valores["concluidos"], 2) if valores["concluidos"] else None
+            ),
+            "tempo_medio_resposta_horas": (
+                round(valores["soma_horas_resposta"] / valores["respondidos"], 2) if valores["respondidos"] else None
+            ),
+        }
+
+    @staticmethod
+    def consultar(
+        db: Session,
+        inicio: date,
+        fim: date,
+        dimensoes: list[str] | None = None,
+        unidades: list[str] | None = None,
+        problemas: list[str] | None = None,
+        prioridades: list[str] | None = None,
+    ) -> dict:
+        """
+        Recorte do cubo para chamados concluídos em [inicio, fim] (datas inclusivas).
+
+        Args:
+            dimensoes: agrupamento, subconjunto de DIMENSOES ("dia", "mes",
+                "unidade", "problema", "prioridade"); vazio = só o total
+            unidades / problemas / prioridades: filtros opcionais
+
+        Returns:
+            {"total": {...}, "linhas": [{<dimensões>, <métricas>, <indicadores>}]}
+        """
+        dimensoes = list(dict.fromkeys(dimensoes or []))
+        invalidas = [d for d in dimensoes if d not in SLAComplianceCube.DIMENSOES]
+        if invalidas:
+            raise ValueError(f"Dimensões inválidas: {', '.join(invalidas)}")
+        SLAComplianceCube.ensure_table()
+
+        filtros = [SLAComplianceDaily.data >= inicio, SLAComplianceDaily.data <= fim]
+        if unidades:
+            filtros.append(SLAComplianceDaily.unidade.in_(unidades))
+        if problemas:
+            filtros.append(SLAComplianceDaily.problema.in_(problemas))
+        if prioridades:
+            filtros.append(SLAComplianceDaily.prioridade.in_(prioridades))
+
+        colunas = [
+            getattr(SLAComplianceDaily, d) for d in ("unidade", "problema", "prioridade") if d in dimensoes
+        ]
+        # Mês é agregado em Python a partir do dia (sem função de data específica do banco)
+        if "dia" in dimensoes or "mes" in dimensoes:
+            colunas.append(SLAComplianceDaily.data)
+
+        rows = db.query(
+            *colunas,
+            *[func.sum(getattr(SLAComplianceDaily, metrica)) for metrica in SLAComplianceCube.METRICAS],
+        ).filter(and_(*filtros)).group_by(*colunas).all()
+
+        nomes = [coluna.key for coluna in colunas]
+        fatias: dict[tuple, dict] = {}
+        total = dict.fromkeys(SLAComplianceCube.METRICAS, 0)
+        for row in rows:
+            valores_dim = dict(zip(nomes, row[:len(nomes)]))
+            metricas = dict(zip(SLAComplianceCube.METRICAS, (valor or 0 for valor in row[len(nomes):])))
+
+            dims = {}
+            for dimensao in dimensoes:
+                if dimensao == "dia":
+                    dims["dia"] = valores_dim["data"].isoformat()
+                elif dimensao == "mes":
+                    dims["mes"] = valores_dim["data"].strftime("%Y-%m")
+                else:
+                    dims[dimensao] = valores_dim[dimensao]
+
+            fatia = fatias.setdefault(tuple(dims.items()), dict.fromkeys(SLAComplianceCube.METRICAS, 0))
+            for metrica, valor in metricas.items():
+                fatia[metrica] += valor
+                total[metrica] += valor
+
+        linhas = [
+            {**dict(chave), **SLAComplianceCube._indicadores(valores)}
+            for chave, valores in sorted(fatias.items())
+        ]
+        return {
+            "inicio": inicio.isoformat(),
+            "fim": fim.isoformat(),
+            "dimensoes": dimensoes,
+            "total": SLAComplianceCube._indicadores(total),
+            "linhas": linhas,
+        }
@@ -0,0 +1,41 @@
+"""
+Efeitos de uma mudança na configuração de SLA (sla_configuration)
+
+Todo caminho que altera limites de SLA (CRUD de /sla/config, recálculo por
+P90 completo ou incremental) chama SLAConfigChanges.aplicar depois do
+commit, com as prioridades afetadas:
+- recalcula os prazos materializados dos chamados abertos dessas
+  prioridades (SLADeadlines.recalcular_abertos)
+- agenda a reconstrução do cubo de cumprimento, cuja classificação
+  dentro/fora do SLA depende dos limites
+
+A invalidação dos caches de SLA continua na transação da alteração
+(SLACacheManager.invalidate_all_sla).
+"""
+
+from __future__ import annotations
+from typing import Iterable
+from sqlalchemy.orm import Session
+
+
+class SLAConfigChanges:
+    """Ganchos executados após alterar a configuração de SLA"""
+
+    @staticmethod
+    def aplicar(db: Session, prioridades: Iterable[str]) -> None:
+        """Recalcula prazos dos chamados abertos das prioridades e reconstrói o cubo"""
+        from ti.services.sla_deadlines import SLADeadlines
+        from ti.services.sla_compliance_cube import SLAComplianceCube
+
+        prioridades = [p for p in dict.fromkeys(prioridades) if p]
+        if not prioridades:
+            return
+
+        for prioridade in prioridades:
+            try:
+                SLADeadlines.recalcular_abertos(db, prioridade)
+            except Exception as e:
+                db.rollback()
+                print(f"[SLA DEADLINES] Erro ao recalcular prazos da prioridade {prioridade}: {e}")
+
+        SLAComplianceCube.reconstruir_em_background()
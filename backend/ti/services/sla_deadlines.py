@@ -0,0 +1,195 @@
+"""
+Prazos de SLA materializados no chamado (sla_prazo_resposta, sla_prazo_resolucao)
+
+Os prazos são calculados somando horas úteis a partir da abertura (resposta)
+ou da última transição do relógio de SLA (resolução) e gravados em colunas
+indexadas. Consultas como "o que vence nas próximas 2 horas" viram um range
+scan no índice, sem recalcular o tempo decorrido de cada chamado.
+
+Regras:
+- Calculados na criação do chamado
+- Recalculados a cada mudança de status: ao sair de "Em análise" o prazo
+  de resolução é empurrado pelo tempo útil pausado
+- Enquanto pausado, sla_prazo_resolucao fica NULL (não vence)
+- Recalculados em lote quando a configuração de SLA muda e pelo scheduler
+"""
+
+from __future__ import annotations
+from datetime import datetime, timedelta
+from sqlalchemy.orm import Session
+from sqlalchemy import and_, or_
+from core.utils import now_brazil_naive
+from ti.models.chamado import Chamado
+from ti.models.sla_config import SLAConfiguration
+from ti.services.sla_calendar import SLACalendarIndex
+
+
+class SLADeadlines:
+    """Calcula, grava e consulta os prazos de SLA dos chamados"""
+
+    CLOSED_STATUSES = ["Concluído", "Concluido", "Cancelado"]
+
+    @staticmethod
+    def calcular(
+        db: Session,
+        chamado: Chamado,
+        sla_config: SLAConfiguration | None = None,
+        agora: datetime | None = None,
+    ) -> tuple[datetime | None, datetime | None]:
+        """
+        Calcula (prazo_resposta, prazo_resolucao) do chamado.
+
+        Resolução: a partir do relógio de SLA (minutos já consumidos até a
+        última transição); sem relógio, a partir do tempo decorrido até agora.
+        """
+        from ti.services.sla import SLACalculator
+        from ti.services.sla_clock import SLAClock
+        from ti.models.sla_clock import ChamadoSLAClock
+
+        if agora is None:
+            agora = now_brazil_naive()
+        if sla_config is None:
+            sla_config = SLACalculator.get_sla_config_by_priority(db, chamado.prioridade)
+        if not sla_config:
+            return None, None
+
+        calendar = SLACalendarIndex.get(db)
+        data_abertura = chamado.data_abertura or agora
+
+        prazo_resposta = calendar.add_business_seconds(
+            data_abertura, sla_config.tempo_resposta_horas * 3600
+        )
+
+        limite_resolucao = sla_config.tempo_resolucao_horas * 3600
+        SLAClock.ensure_table()
+        clock = db.get(ChamadoSLAClock, chamado.id)
+        if clock is not None:
+            if clock.estado == SLAClock.PAUSED:
+                return prazo_resposta, None
+            consumido = (clock.minutos_uteis or 0.0) * 60
+            referencia = clock.ultima_transicao
+        else:
+            consumido = SLACalculator.calculate_business_hours_excluding_paused(
+                chamado.id, data_abertura, agora, db
+            ) * 3600
+            referencia = agora
+
+        prazo_resolucao = calendar.add_business_seconds(referencia, limite_resolucao - consumido)
+        return prazo_resposta, prazo_resolucao
+
+    @staticmethod
+    def atualizar(db: Session, chamado: Chamado, agora: datetime | None = None) -> None:
+        """Recalcula e grava os prazos do chamado (sem commit)"""
+        prazo_resposta, prazo_resolucao = SLADeadlines.calcular(db, chamado, agora=agora)
+        chamado.sla_prazo_resposta = prazo_resposta
+        chamado.sla_prazo_resolucao = prazo_resolucao
+        db.add(chamado)
+
+    @staticmethod
+    def recalcular_abertos(db: Session, prioridade: str | None = None, batch_size: int = 500) -> int:
+        """
+        Recalcula os prazos dos chamados em aberto (opcionalmente de uma prioridade).
+
+        Usado no backfill, após mudanças na configuração de SLA e pelo scheduler.
+        """
+        sla_configs = {
+            config.prioridade: config
+            for config in db.query(SLAConfiguration).filter(
+                SLAConfiguration.ativo == True
+            ).all()
+        }
+
+        filtros = [
+            Chamado.deletado_em.is_(None),
+            Chamado.status.notin_(SLADeadlines.CLOSED_STATUSES),
+        ]
+        if prioridade:
+            filtros.append(Chamado.prioridade == prioridade)
+
+        ids = [row[0] for row in db.query(Chamado.id).filter(and_(*filtros)).order_by(Chamado.id).all()]
+        agora = now_brazil_naive()
+        total = 0
+
+        for offset in range(0, len(ids), batch_size):
+            chamados = db.query(Chamado).filter(
+                Chamado.id.in_(ids[offset:offset + batch_size])
+            ).all()
+            for chamado in chamados:
+                try:
+                    sla_config = sla_configs.get(chamado.prioridade)
+                    prazo_resposta, prazo_resolucao = (None, None)
+                    if sla_config:
+                        prazo_resposta, prazo_resolucao = SLADeadlines.calcular(
+                            db, chamado, sla_config, agora
+                        )
+                    chamado.sla_prazo_resposta = prazo_resposta
+                    chamado.sla_prazo_resolucao = prazo_resolucao
+                    db.add(chamado)
+                    total += 1
+                except Exception as e:
+                    print(f"[SLA DEADLINES] Erro ao calcular prazos do chamado {chamado.id}: {e}")
+            db.commit()
+
+        return total
+
+    @staticmethod
+    def _query_abertos(db: Session):
+        return db.query(Chamado).filter(
+            and_(
+                Chamado.deletado_em.is_(None),
+                Chamado.status.notin_(SLADeadlines.CLOSED_STATUSES),
+            )
+        )
+
+    @staticmethod
+    def proximos_a_vencer(db: Session, horas: float = 2, agora: datetime | None = None) -> list[Chamado]:
+        """
+        Chamados abertos cujo prazo de resposta ou de resolução vence entre
+        agora e agora + horas (range scan nos índices de prazo).
+        """
+        if agora is None:
+            agora = now_brazil_naive()
+        limite = agora + timedelta(hours=horas)
+
+        return SLADeadlines._query_abertos(db).filter(
+            or_(
+                and_(
+                    Chamado.data_primeira_resposta.is_(None),
+                    Chamado.sla_prazo_resposta > agora,
+                    Chamado.sla_prazo_resposta <= limite,
+                ),
+                and_(
+                    Chamado.sla_prazo_resolucao > agora,
+                    Chamado.sla_prazo_resolucao <= limite,
+                ),
+            )
+        ).order_by(Chamado.sla_prazo_resolucao.asc()).all()
+
+    @staticmethod
+    def vencidos(db: Session, agora: datetime | None = None) -> list[Chamado]:
+        """Chamados abertos com prazo de resposta ou de resolução já vencido"""
+        if agora is None:
+            agora = now_brazil_naive()
+
+        return SLADeadlines._query_abertos(db).filter(
+            or_(
+                and_(
+                    Chamado.data_primeira_resposta.is_(None),
+                    Chamado.sla_prazo_resposta <= agora,
+                ),
+                Chamado.sla_prazo_resolucao <= agora,
+            )
+        ).order_by(Chamado.sla_prazo_resolucao.asc()).all()
+
+    @staticmethod
+    def to_dict(chamado: Chamado) -> dict:
+        return {
+            "id": chamado.id,
+            "codigo": chamado.codigo,
+            "prioridade": chamado.prioridade,
+            "status": chamado.status,
+            "unidade": chamado.unidade,
+            "data_abertura": chamado.data_abertura.isoformat() if chamado.data_abertura else None,
+            "sla_prazo_resposta": chamado.sla_prazo_resposta.isoformat() if chamado.sla_prazo_resposta else None,
+            "sla_prazo_resolucao": chamado.sla_prazo_resolucao.isoformat() if chamado.sla_prazo_resolucao else None,
+        }
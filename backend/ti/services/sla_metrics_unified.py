@@ -114,47 +114,37 @@ class UnifiedSLAMetricsCalculator:
                 # Carrega chunk de chamados
                 chamados_chunk = query.offset(offset).limit(chunk_size).all()
 
-                # PRÉ-CARREGA históricos APENAS para este chunk
+                # PRÉ-CARREGA períodos em "Em análise" APENAS para este chunk
                 chamado_ids = [c.id for c in chamados_chunk]
-                historicos_bulk = db.query(HistoricoStatus).filter(
-                    HistoricoStatus.chamado_id.in_(chamado_ids)
-                ).all()
+                pausas_por_chamado = SLACalculator.get_paused_intervals_bulk(db, chamado_ids)
 
-                historicos_cache = {}
-                for hist in historicos_bulk:
-                    if hist.chamado_id not in historicos_cache:
-                        historicos_cache[hist.chamado_id] = []
-                    historicos_cache[hist.chamado_id].append(hist)
-
-                # Processa chamados deste chunk
+                # Monta os intervalos do chunk e calcula todos em lote
+                limites = []
+                starts = []
+                ends = []
+                pausas = []
                 for chamado in chamados_chunk:
-                    try:
-                        sla_config = sla_configs.get(chamado.prioridade)
-                        if not sla_config:
-                            continue
+                    sla_config = sla_configs.get(chamado.prioridade)
+                    if not sla_config:
+                        continue
 
-                        # Determina data final para cálculo
-                        data_abertura = chamado.data_abertura or end_date
-                        data_final = chamado.data_conclusao if chamado.data_conclusao else end_date
+                    # Determina data final para cálculo
+                    starts.append(chamado.data_abertura or end_date)
+                    ends.append(chamado.data_conclusao if chamado.data_conclusao else end_date)
+                    pausas.append(pausas_por_chamado.get(chamado.id))
+                    limites.append(sla_config.tempo_resolucao_horas)
 
-                        # Calcula tempo de resolução excluindo pausas
-                        tempo_resolucao = SLACalculator.calculate_business_hours_excluding_paused(
-                            chamado.id,
-                            data_abertura,
-                            data_final,
-                            db,
-                            historicos_cache
-                        )
-
-                        # Classifica
-                        if tempo_resolucao <= sla_config.tempo_resolucao_horas:
-                            dentro_sla += 1
-                        else:
-                            fora_sla += 1
+                # Calcula tempo de resolução excluindo pausas
+                tempos_resolucao = SLACalculator.calculate_business_hours_many(
+                    starts, ends, pausas, db
+                )
 
-                    except Exception as e:
-                        print(f"Erro ao processar chamado {chamado.id}: {e}")
-                        continue
+                # Classifica
+                for tempo_resolucao, limite in zip(tempos_resolucao, limites):
+                    if tempo_resolucao <= limite:
+                        dentro_sla += 1
+                    else:
+                        fora_sla += 1
 
                 # Limpa sessão entre chunks para liberar memória
                 db.expunge_all()
@@ -201,7 +201,10 @@ class SLAP90Calculator:
         db.commit()
 
         from ti.services.sla_cache import SLACacheManager
+        from ti.services.sla_config_changes import SLAConfigChanges
         SLACacheManager.invalidate_all_sla(db)
+        # Limites mudaram: prazos dos chamados abertos e cubo de cumprimento
+        SLAConfigChanges.aplicar(db, resultado["prioridades_atualizadas"])
 
         print(f"[P90] Recálculo concluído. Atualizadas {len(resultado['prioridades_atualizadas'])} prioridades")
 
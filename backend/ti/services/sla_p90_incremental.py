@@ -1,32 +1,34 @@
 from __future__ import annotations
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_
+from sqlalchemy import and_, or_, func
 from ti.models.chamado import Chamado
 from ti.models.historico_status import HistoricoStatus
 from ti.models.sla_config import SLAConfiguration
 from ti.models.metrics_cache import MetricsCacheDB
 from ti.services.sla import SLACalculator
 from ti.services.sla_cache import SLACacheManager
+from ti.services.sla_config_changes import SLAConfigChanges
+from ti.services.quantile_sketch import DDSketch
+from ti.services.cache_codec import CacheCodec
 from core.utils import now_brazil_naive
-import json
 
 
 class SLAP90Incremental:
     """
     Sistema incremental de cálculo de SLA com P90.
-    
-    Funciona armazenando em cache:
-    1. Lista de tempos já processados
-    2. ID do último chamado processado
-    
-    Na próxima atualização, busca apenas chamados novos.
+
+    Funciona armazenando em cache, por prioridade e por dia de conclusão,
+    um sketch de quantis (DDSketch) dos tempos de resposta e de resolução.
+
+    O P90 da janela de 30 dias é a mescla dos 30 sketches diários: memória
+    limitada, sem lista de tempos crescendo e sem ordenação. Dias passados
+    são construídos uma vez; a cada atualização só o dia corrente (e dias
+    ainda sem sketch) consulta o banco. Dias fora da janela expiram.
     """
 
-    CACHE_KEY_TEMPOS_RESPOSTA = "sla_p90_tempos_resposta"
-    CACHE_KEY_TEMPOS_RESOLUCAO = "sla_p90_tempos_resolucao"
-    CACHE_KEY_ULTIMO_ID = "sla_p90_ultimo_chamado_id"
-    CACHE_KEY_TIMESTAMP = "sla_p90_timestamp"
+    CACHE_KEY_SKETCH = "sla_p90_sketch"
+    JANELA_DIAS = 30
 
     @staticmethod
     def calcular_percentil_90(valores: list[float]) -> float:
@@ -43,186 +45,172 @@ class SLAP90Incremental:
         return float(valores_ordenados[indice])
 
     @staticmethod
-    def obter_tempo_primeira_resposta(chamado: Chamado, db: Session) -> float:
-        """Obtém tempo de primeira resposta em horas."""
-        if not chamado.data_abertura:
-            return 0.0
-
-        historicos = db.query(HistoricoStatus).filter(
-            HistoricoStatus.chamado_id == chamado.id
-        ).order_by(HistoricoStatus.data_inicio.asc()).all()
-
-        if not historicos or not historicos[0].data_inicio:
+    def percentil_90_sketch(sketch: DDSketch) -> float:
+        """P90 de um sketch (mesmo critério de calcular_percentil_90, erro relativo <= 1%)"""
+        if sketch.count < 2:
             return 0.0
-
-        primeira_mudanca = historicos[0].data_inicio
-        
-        tempo_horas = SLACalculator.calculate_business_hours_excluding_paused(
-            chamado.id,
-            chamado.data_abertura,
-            primeira_mudanca,
-            db
-        )
-        
-        return tempo_horas
+        return sketch.quantile(0.9)
 
     @staticmethod
-    def obter_tempo_resolucao(chamado: Chamado, db: Session) -> float:
-        """Obtém tempo de resolução em horas."""
-        if not chamado.data_abertura:
-            return 0.0
-
-        data_conclusao = chamado.data_conclusao or chamado.cancelado_em
-        if not data_conclusao:
-            return 0.0
+    def _cache_key(prioridade: str, dia: date) -> str:
+        return f"{SLAP90Incremental.CACHE_KEY_SKETCH}:{prioridade}:{dia.isoformat()}"
 
-        tempo_horas = SLACalculator.calculate_business_hours_excluding_paused(
-            chamado.id,
-            chamado.data_abertura,
-            data_conclusao,
-            db
-        )
-        
-        return tempo_horas
+    @staticmethod
+    def _data_fechamento(chamado: Chamado) -> datetime | None:
+        return chamado.data_conclusao or chamado.cancelado_em
 
     @staticmethod
-    def carregar_cache_prioridade(db: Session, prioridade: str) -> dict:
+    def calcular_tempos_em_lote(db: Session, chamados: list[Chamado]) -> dict[int, tuple[float, float]]:
         """
-        Carrega dados do cache para uma prioridade.
-        Retorna dict com tempos anteriores e último ID processado.
-        """
-        cache_key_resposta = f"{SLAP90Incremental.CACHE_KEY_TEMPOS_RESPOSTA}:{prioridade}"
-        cache_key_resolucao = f"{SLAP90Incremental.CACHE_KEY_TEMPOS_RESOLUCAO}:{prioridade}"
-        cache_key_ultimo_id = f"{SLAP90Incremental.CACHE_KEY_ULTIMO_ID}:{prioridade}"
-
-        try:
-            cache_resposta = db.query(MetricsCacheDB).filter(
-                MetricsCacheDB.cache_key == cache_key_resposta
-            ).first()
+        Tempos (resposta, resolução) em horas úteis, sem "Em análise", por chamado.
 
-            cache_resolucao = db.query(MetricsCacheDB).filter(
-                MetricsCacheDB.cache_key == cache_key_resolucao
-            ).first()
+        Resposta: da abertura até o primeiro registro de histórico.
+        Resolução: da abertura até a conclusão/cancelamento.
+        Três queries no total (primeiro histórico, pausas) e cálculo em lote.
+        """
+        chamados = [c for c in chamados if c.data_abertura]
+        if not chamados:
+            return {}
+        ids = [c.id for c in chamados]
+
+        primeiros = dict(
+            db.query(HistoricoStatus.chamado_id, func.min(HistoricoStatus.data_inicio)).filter(
+                HistoricoStatus.chamado_id.in_(ids)
+            ).group_by(HistoricoStatus.chamado_id).all()
+        )
+        pausas = SLACalculator.get_paused_intervals_bulk(db, ids)
 
-            cache_ultimo_id = db.query(MetricsCacheDB).filter(
-                MetricsCacheDB.cache_key == cache_key_ultimo_id
-            ).first()
+        com_resposta = [c for c in chamados if primeiros.get(c.id)]
+        respostas = SLACalculator.calculate_business_hours_many(
+            [c.data_abertura for c in com_resposta],
+            [primeiros[c.id] for c in com_resposta],
+            [pausas.get(c.id) for c in com_resposta],
+        )
+        resposta_por_id = dict(zip([c.id for c in com_resposta], respostas))
 
-            tempos_resposta = []
-            tempos_resolucao = []
-            ultimo_id = 0
+        com_fechamento = [c for c in chamados if SLAP90Incremental._data_fechamento(c)]
+        resolucoes = SLACalculator.calculate_business_hours_many(
+            [c.data_abertura for c in com_fechamento],
+            [SLAP90Incremental._data_fechamento(c) for c in com_fechamento],
+            [pausas.get(c.id) for c in com_fechamento],
+        )
+        resolucao_por_id = dict(zip([c.id for c in com_fechamento], resolucoes))
 
-            if cache_resposta and cache_resposta.cache_value:
-                try:
-                    tempos_resposta = json.loads(cache_resposta.cache_value)
-                except:
-                    tempos_resposta = []
+        return {
+            c.id: (resposta_por_id.get(c.id, 0.0), resolucao_por_id.get(c.id, 0.0))
+            for c in chamados
+        }
 
-            if cache_resolucao and cache_resolucao.cache_value:
-                try:
-                    tempos_resolucao = json.loads(cache_resolucao.cache_value)
-                except:
-                    tempos_resolucao = []
+    @staticmethod
+    def carregar_cache_prioridade(db: Session, prioridade: str, dias: list[date]) -> dict:
+        """
+        Carrega os sketches diários de uma prioridade (uma query).
 
-            if cache_ultimo_id and cache_ultimo_id.cache_value:
+        Retorna {dia: {"resposta": DDSketch, "resolucao": DDSketch, "calculado_em": datetime}}
+        """
+        chaves = {SLAP90Incremental._cache_key(prioridade, dia): dia for dia in dias}
+        resultado = {}
+        try:
+            rows = db.query(MetricsCacheDB).filter(
+                MetricsCacheDB.cache_key.in_(list(chaves))
+            ).all()
+            for row in rows:
                 try:
-                    ultimo_id = int(cache_ultimo_id.cache_value)
-                except:
-                    ultimo_id = 0
-
-            return {
-                "tempos_resposta": tempos_resposta,
-                "tempos_resolucao": tempos_resolucao,
-                "ultimo_id": ultimo_id,
-                "total_anterior": len(tempos_resposta)
-            }
+                    dados = CacheCodec.decode(row.cache_value)
+                except Exception:
+                    continue
+                resultado[chaves[row.cache_key]] = {
+                    "resposta": DDSketch.from_dict(dados.get("resposta")),
+                    "resolucao": DDSketch.from_dict(dados.get("resolucao")),
+                    "calculado_em": row.calculated_at,
+                }
         except Exception as e:
             print(f"[P90 INCREMENTAL] Erro ao carregar cache: {e}")
-            return {
-                "tempos_resposta": [],
-                "tempos_resolucao": [],
-                "ultimo_id": 0,
-                "total_anterior": 0
-            }
+        return resultado
 
     @staticmethod
     def salvar_cache_prioridade(
         db: Session,
         prioridade: str,
-        tempos_resposta: list[float],
-        tempos_resolucao: list[float],
-        ultimo_id: int
-    ) -> bool:
-        """Salva dados no cache para uma prioridade."""
-        try:
-            agora = now_brazil_naive()
-            ttl_segundos = 30 * 24 * 60 * 60
-            expira_em = agora + timedelta(seconds=ttl_segundos)
-
-            cache_key_resposta = f"{SLAP90Incremental.CACHE_KEY_TEMPOS_RESPOSTA}:{prioridade}"
-            cache_key_resolucao = f"{SLAP90Incremental.CACHE_KEY_TEMPOS_RESOLUCAO}:{prioridade}"
-            cache_key_ultimo_id = f"{SLAP90Incremental.CACHE_KEY_ULTIMO_ID}:{prioridade}"
-
-            # Resposta
-            cache_resposta = db.query(MetricsCacheDB).filter(
-                MetricsCacheDB.cache_key == cache_key_resposta
-            ).first()
-
-            if cache_resposta:
-                cache_resposta.cache_value = json.dumps(tempos_resposta)
-                cache_resposta.calculated_at = agora
-                cache_resposta.expires_at = expira_em
-            else:
-                cache_resposta = MetricsCacheDB(
-                    cache_key=cache_key_resposta,
-                    cache_value=json.dumps(tempos_resposta),
-                    calculated_at=agora,
-                    expires_at=expira_em,
-                )
-            db.add(cache_resposta)
-
-            # Resolução
-            cache_resolucao = db.query(MetricsCacheDB).filter(
-                MetricsCacheDB.cache_key == cache_key_resolucao
-            ).first()
-
-            if cache_resolucao:
-                cache_resolucao.cache_value = json.dumps(tempos_resolucao)
-                cache_resolucao.calculated_at = agora
-                cache_resolucao.expires_at = expira_em
-            else:
-                cache_resolucao = MetricsCacheDB(
-                    cache_key=cache_key_resolucao,
-                    cache_value=json.dumps(tempos_resolucao),
-                    calculated_at=agora,
-                    expires_at=expira_em,
-                )
-            db.add(cache_resolucao)
-
-            # Último ID
-            cache_ultimo_id = db.query(MetricsCacheDB).filter(
-                MetricsCacheDB.cache_key == cache_key_ultimo_id
-            ).first()
+        dia: date,
+        sketch_resposta: DDSketch,
+        sketch_resolucao: DDSketch,
+    ) -> None:
+        """Grava o sketch diário de uma prioridade (sem commit); expira quando sai da janela"""
+        agora = now_brazil_naive()
+        expira_em = datetime.combine(dia, datetime.min.time()) + timedelta(
+            days=SLAP90Incremental.JANELA_DIAS + 1
+        )
+        cache_key = SLAP90Incremental._cache_key(prioridade, dia)
+        valor = CacheCodec.encode({
+            "resposta": sketch_resposta.to_dict(),
+            "resolucao": sketch_resolucao.to_dict(),
+        })
+
+        cache = db.query(MetricsCacheDB).filter(MetricsCacheDB.cache_key == cache_key).first()
+        if cache:
+            cache.cache_value = valor
+            cache.calculated_at = agora
+            cache.expires_at = expira_em
+        else:
+            cache = MetricsCacheDB(
+                cache_key=cache_key,
+                cache_value=valor,
+                calculated_at=agora,
+                expires_at=expira_em,
+            )
+        db.add(cache)
 
-            if cache_ultimo_id:
-                cache_ultimo_id.cache_value = str(ultimo_id)
-                cache_ultimo_id.calculated_at = agora
-                cache_ultimo_id.expires_at = expira_em
-            else:
-                cache_ultimo_id = MetricsCacheDB(
-                    cache_key=cache_key_ultimo_id,
-                    cache_value=str(ultimo_id),
-                    calculated_at=agora,
-                    expires_at=expira_em,
-                )
-            db.add(cache_ultimo_id)
+    @staticmethod
+    def construir_sketches_dias(
+        db: Session,
+        prioridade: str,
+        dias: list[date],
+        desde: datetime | None = None,
+    ) -> tuple[dict[date, tuple[DDSketch, DDSketch]], int]:
+        """
+        Constrói os sketches dos dias informados a partir do banco (uma query
+        de chamados para o intervalo todo). Retorna ({dia: (resposta, resolucao)}, chamados).
 
-            db.commit()
-            return True
-        except Exception as e:
-            print(f"[P90 INCREMENTAL] Erro ao salvar cache: {e}")
-            db.rollback()
-            return False
+        desde: ignora chamados abertos antes (último reset da prioridade).
+        """
+        sketches = {dia: (DDSketch(), DDSketch()) for dia in dias}
+        if not dias:
+            return sketches, 0
+
+        inicio = datetime.combine(min(dias), datetime.min.time())
+        fim = datetime.combine(max(dias), datetime.min.time()) + timedelta(days=1)
+        filtros = [
+            Chamado.prioridade == prioridade,
+            Chamado.deletado_em.is_(None),
+            Chamado.status.in_(["Concluído", "Cancelado"]),
+            or_(
+                and_(Chamado.data_conclusao >= inicio, Chamado.data_conclusao < fim),
+                and_(
+                    Chamado.data_conclusao.is_(None),
+                    Chamado.cancelado_em >= inicio,
+                    Chamado.cancelado_em < fim,
+                ),
+            ),
+        ]
+        if desde:
+            filtros.append(Chamado.data_abertura >= desde)
+
+        chamados = [
+            c for c in db.query(Chamado).filter(and_(*filtros)).all()
+            if SLAP90Incremental._data_fechamento(c).date() in sketches
+        ]
+        tempos = SLAP90Incremental.calcular_tempos_em_lote(db, chamados)
+
+        for chamado in chamados:
+            tempo_resposta, tempo_resolucao = tempos.get(chamado.id, (0.0, 0.0))
+            sketch_resposta, sketch_resolucao = sketches[SLAP90Incremental._data_fechamento(chamado).date()]
+            if tempo_resposta > 0:
+                sketch_resposta.add(tempo_resposta)
+            if tempo_resolucao > 0:
+                sketch_resolucao.add(tempo_resolucao)
+
+        return sketches, len(chamados)
 
     @staticmethod
     def recalcular_incremental(db: Session) -> dict:
@@ -254,65 +242,44 @@ class SLAP90Incremental:
 
             print(f"\n[P90 INCREMENTAL] Processando prioridade: {prioridade}")
 
-            cache_anterior = SLAP90Incremental.carregar_cache_prioridade(db, prioridade)
-            ultimo_id = cache_anterior["ultimo_id"]
+            hoje = agora.date()
+            dias = [hoje - timedelta(days=i) for i in range(SLAP90Incremental.JANELA_DIAS)]
+            cache_anterior = SLAP90Incremental.carregar_cache_prioridade(db, prioridade, dias)
 
-            print(f"  - Total anterior em cache: {cache_anterior['total_anterior']}")
-            print(f"  - Último ID processado: {ultimo_id}")
+            print(f"  - Dias em cache: {len(cache_anterior)}/{len(dias)}")
 
             if config.ultimo_reset_em:
                 print(f"  - Último reset em: {config.ultimo_reset_em.isoformat()}")
 
-            tempos_resposta = cache_anterior["tempos_resposta"].copy()
-            tempos_resolucao = cache_anterior["tempos_resolucao"].copy()
-
-            # Se houver reset, ignora dados anteriores e começa do zero
-            if config.ultimo_reset_em:
-                print(f"  - Sistema foi resetado! Iniciando cálculos do zero a partir de {config.ultimo_reset_em}")
-                tempos_resposta = []
-                tempos_resolucao = []
-                ultimo_id = 0
-
-            chamados_novos = db.query(Chamado).filter(
-                and_(
-                    Chamado.prioridade == prioridade,
-                    Chamado.data_abertura >= data_inicio,
-                    Chamado.data_abertura <= agora,
-                    Chamado.deletado_em.is_(None),
-                    Chamado.status.in_(["Concluído", "Cancelado"]),
-                    Chamado.id > ultimo_id,
-                    # Se houver reset, apenas chamados APÓS o reset
-                    Chamado.data_abertura >= (config.ultimo_reset_em if config.ultimo_reset_em else data_inicio)
+            # Reconstrói: dia corrente, dias sem sketch e dias calculados antes do último reset
+            dias_reconstruir = [
+                dia for dia in dias
+                if dia == hoje
+                or dia not in cache_anterior
+                or (
+                    config.ultimo_reset_em
+                    and (cache_anterior[dia]["calculado_em"] or datetime.min) < config.ultimo_reset_em
                 )
-            ).order_by(Chamado.id.asc()).all()
-
-            print(f"  - Novos chamados encontrados: {len(chamados_novos)}")
-
-            novo_maximo_id = ultimo_id
-            chamados_processados = 0
-
-            for chamado in chamados_novos:
-                try:
-                    tempo_resposta = SLAP90Incremental.obter_tempo_primeira_resposta(chamado, db)
-                    tempo_resolucao = SLAP90Incremental.obter_tempo_resolucao(chamado, db)
-
-                    if tempo_resposta > 0:
-                        tempos_resposta.append(tempo_resposta)
-
-                    if tempo_resolucao > 0:
-                        tempos_resolucao.append(tempo_resolucao)
-
-                    novo_maximo_id = max(novo_maximo_id, chamado.id)
-                    chamados_processados += 1
+            ]
+            novos, chamados_processados = SLAP90Incremental.construir_sketches_dias(
+                db, prioridade, dias_reconstruir, config.ultimo_reset_em
+            )
+            for dia, (sketch_resposta, sketch_resolucao) in novos.items():
+                SLAP90Incremental.salvar_cache_prioridade(
+                    db, prioridade, dia, sketch_resposta, sketch_resolucao
+                )
+                cache_anterior[dia] = {"resposta": sketch_resposta, "resolucao": sketch_resolucao}
+            db.commit()
 
-                except Exception as e:
-                    print(f"  ⚠️  Erro ao processar chamado {chamado.id}: {e}")
+            print(f"  - Dias reconstruídos: {len(dias_reconstruir)} ({chamados_processados} chamados)")
 
-            print(f"  - Chamados processados com sucesso: {chamados_processados}")
+            # Janela de 30 dias = mescla dos sketches diários
+            sketch_resposta = DDSketch.merged(cache_anterior[dia]["resposta"] for dia in dias if dia in cache_anterior)
+            sketch_resolucao = DDSketch.merged(cache_anterior[dia]["resolucao"] for dia in dias if dia in cache_anterior)
 
-            if len(tempos_resposta) > 0 and len(tempos_resolucao) > 0:
-                p90_resposta = SLAP90Incremental.calcular_percentil_90(tempos_resposta)
-                p90_resolucao = SLAP90Incremental.calcular_percentil_90(tempos_resolucao)
+            if sketch_resposta.count > 0 and sketch_resolucao.count > 0:
+                p90_resposta = SLAP90Incremental.percentil_90_sketch(sketch_resposta)
+                p90_resolucao = SLAP90Incremental.percentil_90_sketch(sketch_resolucao)
 
                 margem_seguranca = 1.15
                 tempo_resposta_final = p90_resposta * margem_seguranca
@@ -328,22 +295,14 @@ class SLAP90Incremental:
                 db.add(config)
                 db.commit()
 
-                SLAP90Incremental.salvar_cache_prioridade(
-                    db,
-                    prioridade,
-                    tempos_resposta,
-                    tempos_resolucao,
-                    novo_maximo_id
-                )
-
                 print(f"  ✅ SLA Atualizado!")
-                print(f"     - Total de tempos: {len(tempos_resposta)}")
+                print(f"     - Total de tempos: {sketch_resposta.count}")
                 print(f"     - P90 Resposta: {p90_resposta:.2f}h → {tempo_resposta_horas}h")
                 print(f"     - P90 Resolução: {p90_resolucao:.2f}h → {tempo_resolucao_horas}h")
 
                 resultado["prioridades"][prioridade] = {
                     "sucesso": True,
-                    "total_tempos_acumulados": len(tempos_resposta),
+                    "total_tempos_acumulados": sketch_resposta.count,
                     "novos_chamados": chamados_processados,
                     "p90_resposta_horas": round(p90_resposta, 2),
                     "p90_resolucao_horas": round(p90_resolucao, 2),
@@ -356,10 +315,14 @@ class SLAP90Incremental:
                 resultado["prioridades"][prioridade] = {
                     "sucesso": False,
                     "motivo": "Dados insuficientes para calcular P90",
-                    "total_tempos": len(tempos_resposta)
+                    "total_tempos": sketch_resposta.count
                 }
 
         SLACacheManager.invalidate_all_sla(db)
+        # Limites mudaram: prazos dos chamados abertos e cubo de cumprimento
+        SLAConfigChanges.aplicar(db, [
+            prioridade for prioridade, detalhe in resultado["prioridades"].items() if detalhe.get("sucesso")
+        ])
 
         print(f"\n[P90 INCREMENTAL] Recálculo concluído!")
         return resultado
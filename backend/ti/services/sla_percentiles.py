@@ -0,0 +1,460 @@
+"""
+Percentis semanais (P50/P90/P99) de tempo de resposta e de resolução
+
+Tabela sla_percentile_weekly: uma linha por (semana da conclusão, prioridade,
+unidade) com dois sketches de quantis (DDSketch). Cada chamado concluído
+contribui com seus tempos em horas úteis:
+- resposta: abertura -> primeira resposta (ou primeiro registro em
+  historico_status para chamados antigos), sem períodos "Em análise"
+- resolução: abertura -> conclusão pelo relógio de SLA (ou pelo histórico
+  de pausas quando não há relógio)
+
+Conclusão, reabertura e exclusão aplicam a diferença entre a contribuição
+anterior e a atual na mesma transação da alteração do chamado (mesmo modelo
+do agregado diário). A contribuição aplicada fica registrada por chamado
+(sla_percentile_contribuicao): a reabertura remove dos sketches exatamente
+os valores somados, mesmo que o calendário, as pausas ou a primeira
+resposta tenham mudado depois.
+
+A série (até SEMANAS_MAXIMO semanas, o que o backfill cobre) é a mescla
+dos sketches das linhas filtradas, sem recalcular horas úteis; a série
+montada fica em memória até a próxima escrita em chamados (DataVersion) ou
+CACHE_TTL segundos.
+
+Backfill: python -m ti.scripts.create_sla_percentiles_table
+"""
+
+from __future__ import annotations
+import json
+import threading
+import time
+from datetime import date, datetime, timedelta
+from sqlalchemy.orm import Session
+from sqlalchemy import and_, func
+from core.db import engine
+from core.utils import now_brazil_naive
+from ti.models.chamado import Chamado
+from ti.models.historico_status import HistoricoStatus
+from ti.models.sla_percentile import SLAPercentileWeekly, SLAPercentileContribution
+from ti.services.quantile_sketch import DDSketch
+
+
+class SLAPercentiles:
+    """Mantém e consulta os sketches semanais de tempos de SLA"""
+
+    RESOLVED_STATUSES = {"Concluído", "Concluido"}
+    QUANTIS = {"p50": 0.5, "p90": 0.9, "p99": 0.99}
+    AGRUPAMENTOS = ("prioridade", "unidade", "nenhum")
+
+    # Janela padrão da série (semanas)
+    SEMANAS_PADRAO = 52
+    # Maior série aceita pelo endpoint; o backfill cobre toda essa janela,
+    # senão as semanas mais antigas sairiam vazias como se não houvesse volume
+    SEMANAS_MAXIMO = 104
+
+    # Séries já montadas: {(parâmetros): (versão dos dados, instante, série)}
+    CACHE_TTL = 300
+    CACHE_MAX = 32
+    _cache: dict[tuple, tuple[int, float, dict]] = {}
+    _cache_lock = threading.Lock()
+
+    _table_ready = False
+
+    @classmethod
+    def ensure_table(cls) -> None:
+        if cls._table_ready:
+            return
+        try:
+            SLAPercentileWeekly.__table__.create(bind=engine, checkfirst=True)
+            SLAPercentileContribution.__table__.create(bind=engine, checkfirst=True)
+            cls._table_ready = True
+        except Exception as e:
+            print(f"[SLA PERCENTIS] Erro ao criar tabela: {e}")
+
+    @staticmethod
+    def semana(dia: date | datetime) -> date:
+        """Segunda-feira da semana do dia"""
+        if isinstance(dia, datetime):
+            dia = dia.date()
+        return dia - timedelta(days=dia.weekday())
+
+    @staticmethod
+    def chave(chamado: Chamado) -> tuple:
+        """(semana da conclusão, prioridade, unidade) da linha do chamado"""
+        return (
+            SLAPercentiles.semana(chamado.data_conclusao),
+            chamado.prioridade or "Normal",
+            chamado.unidade or "",
+        )
+
+    @staticmethod
+    def _conta(chamado: Chamado) -> bool:
+        return (
+            chamado.deletado_em is None
+            and chamado.status in SLAPercentiles.RESOLVED_STATUSES
+            and chamado.data_abertura is not None
+            and chamado.data_conclusao is not None
+        )
+
+    @staticmethod
+    def calcular_tempos(db: Session, chamados: list[Chamado]) -> dict[int, tuple[float | None, float]]:
+        """
+        Tempos (resposta, resolução) em horas úteis de chamados concluídos, em lote.
+
+        Resposta é None quando o chamado não tem registro de primeira resposta.
+        """
+        from ti.services.sla import SLACalculator
+        from ti.services.sla_clock import SLAClock
+
+        chamados = [c for c in chamados if SLAPercentiles._conta(c)]
+        if not chamados:
+            return {}
+        ids = [c.id for c in chamados]
+        pausas = SLACalculator.get_paused_intervals_bulk(db, ids)
+
+        primeira_resposta = {c.id: c.data_primeira_resposta for c in chamados if c.data_primeira_resposta}
+        sem_resposta = [c.id for c in chamados if c.id not in primeira_resposta]
+        if sem_resposta:
+            primeira_resposta.update(
+                db.query(HistoricoStatus.chamado_id, func.min(HistoricoStatus.data_inicio)).filter(
+                    HistoricoStatus.chamado_id.in_(sem_resposta)
+                ).group_by(HistoricoStatus.chamado_id).all()
+            )
+        respondidos = [c for c in chamados if primeira_resposta.get(c.id)]
+        horas_resposta = SLACalculator.calculate_business_hours_many(
+            [c.data_abertura for c in respondidos],
+            [primeira_resposta[c.id] for c in respondidos],
+            [pausas.get(c.id) for c in respondidos],
+        )
+        resposta_por_id = {c.id: h for c, h in zip(respondidos, horas_resposta)}
+
+        clocks = SLAClock.get_many(db, ids)
+        resolucao_por_id: dict[int, float] = {}
+        sem_clock = []
+        for c in chamados:
+            clock = clocks.get(c.id)
+            if clock is not None:
+                minutos = SLAClock.minutos_decorridos(clock, c.data_conclusao, db)
+                resolucao_por_id[c.id] = int(minutos + 1e-6) / 60.0
+            else:
+                sem_clock.append(c)
+        if sem_clock:
+            horas = SLACalculator.calculate_business_hours_many(
+                [c.data_abertura for c in sem_clock],
+                [c.data_conclusao for c in sem_clock],
+                [pausas.get(c.id) for c in sem_clock],
+            )
+            resolucao_por_id.update({c.id: h for c, h in zip(sem_clock, horas)})
+
+        return {c.id: (resposta_por_id.get(c.id), resolucao_por_id[c.id]) for c in chamados}
+
+    @staticmethod
+    def contribuicao(db: Session, chamado: Chamado) -> tuple[tuple, float | None, float] | None:
+        """
+        Contribuição atual do chamado: (chave, horas de resposta, horas de resolução).
+
+        Retorna None para chamados não concluídos ou excluídos.
+        """
+        if not SLAPercentiles._conta(chamado):
+            return None
+        resposta, resolucao = SLAPercentiles.calcular_tempos(db, [chamado])[chamado.id]
+        return SLAPercentiles.chave(chamado), resposta, resolucao
+
+    @staticmethod
+    def registrada(db: Session, chamado: Chamado) -> tuple | None | bool:
+        """
+        Contribuição registrada do chamado (a que está nos sketches).
+
+        None se o chamado não está nos sketches; False se não há registro
+        (chamado concluído antes do registro existir: use contribuicao()).
+        Leitura com trava, como SLAComplianceCube.registrada.
+        """
+        SLAPercentiles.ensure_table()
+        registro = db.query(SLAPercentileContribution).filter(
+            SLAPercentileContribution.chamado_id == chamado.id
+        ).populate_existing().with_for_update().first()
+        if registro is None:
+            return False
+        return (
+            (registro.semana, registro.prioridade, registro.unidade),
+            registro.horas_resposta,
+            registro.horas_resolucao,
+        )
+
+    @staticmethod
+    def anterior(db: Session, chamado: Chamado) -> tuple | None:
+        """Contribuição do chamado antes de uma alteração: a registrada ou, sem registro, a recalculada"""
+        registrada = SLAPercentiles.registrada(db, chamado)
+        if registrada is not False:
+            return registrada
+        return SLAPercentiles.contribuicao(db, chamado)
+
+    @staticmethod
+    def _registrar(db: Session, chamado_id: int, contribuicao: tuple | None) -> None:
+        """Grava (ou remove) o registro da contribuição aplicada (sem commit)"""
+        registro = db.get(SLAPercentileContribution, chamado_id)
+        if contribuicao is None:
+            if registro is not None:
+                db.delete(registro)
+            return
+        (semana, prioridade, unidade), resposta, resolucao = contribuicao
+        if registro is None:
+            registro = SLAPercentileContribution(chamado_id=chamado_id)
+            db.add(registro)
+        registro.semana = semana
+        registro.prioridade = prioridade
+        registro.unidade = unidade
+        registro.horas_resposta = resposta
+        registro.horas_resolucao = resolucao
+        registro.atualizado_em = now_brazil_naive()
+
+    @staticmethod
+    def aplicar(db: Session, contribuicao: tuple | None, sinal: int = 1) -> None:
+        """Soma (sinal=1) ou remove (sinal=-1) uma contribuição dos sketches (sem commit)"""
+        if contribuicao is None:
+            return
+        SLAPercentiles.ensure_table()
+        (semana, prioridade, unidade), resposta, resolucao = contribuicao
+        filtro = and_(
+            SLAPercentileWeekly.semana == semana,
+            SLAPercentileWeekly.prioridade == prioridade,
+            SLAPercentileWeekly.unidade == unidade,
+        )
+
+        if db.get_bind().dialect.name == "mysql":
+            # Garante a linha e a trava: duas conclusões na mesma semana/unidade
+            # não sobrescrevem o sketch uma da outra
+            from sqlalchemy.dialects.mysql import insert as mysql_insert
+
+            vazio = json.dumps(DDSketch().to_dict(), separators=(",", ":"))
+            db.execute(
+                mysql_insert(SLAPercentileWeekly).values(
+                    semana=semana,
+                    prioridade=prioridade,
+                    unidade=unidade,
+                    total=0,
+                    sketch_resposta=vazio,
+                    sketch_resolucao=vazio,
+                ).prefix_with("IGNORE")
+            )
+
+        linha = db.query(SLAPercentileWeekly).filter(filtro).with_for_update().first()
+        if linha is None:
+            if sinal < 0:
+                return
+            linha = SLAPercentileWeekly(semana=semana, prioridade=prioridade, unidade=unidade, total=0)
+            db.add(linha)
+            sketch_resposta, sketch_resolucao = DDSketch(), DDSketch()
+        else:
+            sketch_resposta = DDSketch.from_dict(json.loads(linha.sketch_resposta or "{}"))
+            sketch_resolucao = DDSketch.from_dict(json.loads(linha.sketch_resolucao or "{}"))
+
+        if sinal > 0:
+            if resposta is not None:
+                sketch_resposta.add(resposta)
+            sketch_resolucao.add(resolucao)
+        else:
+            if resposta is not None:
+                sketch_resposta.remove(resposta)
+            sketch_resolucao.remove(resolucao)
+
+        linha.total = max(0, (linha.total or 0) + sinal)
+        linha.sketch_resposta = json.dumps(sketch_resposta.to_dict(), separators=(",", ":"))
+        linha.sketch_resolucao = json.dumps(sketch_resolucao.to_dict(), separators=(",", ":"))
+        linha.atualizado_em = now_brazil_naive()
+
+    @staticmethod
+    def registrar_alteracao(db: Session, anterior: tuple | None, chamado: Chamado) -> None:
+        """
+        Chamado alterado (conclusão/reabertura/exclusão): troca a contribuição
+        anterior (anterior(), capturada antes da alteração) pela atual e
+        registra a atual (sem commit).
+        """
+        atual = SLAPercentiles.contribuicao(db, chamado)
+        if anterior != atual:
+            SLAPercentiles.aplicar(db, anterior, -1)
+            SLAPercentiles.aplicar(db, atual, 1)
+        SLAPercentiles._registrar(db, chamado.id, atual)
+
+    @staticmethod
+    def backfill(db: Session, semanas: int = SEMANAS_MAXIMO, batch_size: int = 500) -> int:
+        """Reconstrói os sketches das últimas `semanas` semanas a partir dos chamados"""
+        SLAPercentiles.ensure_table()
+        inicio = SLAPercentiles.semana(now_brazil_naive()) - timedelta(weeks=semanas)
+        inicio_dt = datetime.combine(inicio, datetime.min.time())
+
+        ids = [
+            row[0] for row in db.query(Chamado.id).filter(
+                and_(
+                    Chamado.deletado_em.is_(None),
+                    Chamado.status.in_(list(SLAPercentiles.RESOLVED_STATUSES)),
+                    Chamado.data_conclusao >= inicio_dt,
+                )
+            ).order_by(Chamado.id).all()
+        ]
+
+        sketches: dict[tuple, list] = {}
+        registros = []
+        for offset in range(0, len(ids), batch_size):
+            chamados = db.query(Chamado).filter(Chamado.id.in_(ids[offset:offset + batch_size])).all()
+            tempos = SLAPercentiles.calcular_tempos(db, chamados)
+            for c in chamados:
+                if c.id not in tempos:
+                    continue
+                resposta, resolucao = tempos[c.id]
+                chave = SLAPercentiles.chave(c)
+                linha = sketches.setdefault(chave, [0, DDSketch(), DDSketch()])
+                linha[0] += 1
+                if resposta is not None:
+                    linha[1].add(resposta)
+                linha[2].add(resolucao)
+                registros.append((c.id, chave, resposta, resolucao))
+
+        agora = now_brazil_naive()
+        db.query(SLAPercentileWeekly).filter(
+            SLAPercentileWeekly.semana >= inicio
+        ).delete(synchronize_session=False)
+        db.query(SLAPercentileContribution).filter(
+            SLAPercentileContribution.semana >= inicio
+        ).delete(synchronize_session=False)
+        linhas = [
+            {
+                "semana": semana,
+                "prioridade": prioridade,
+                "unidade": unidade,
+                "total": total,
+                "sketch_resposta": json.dumps(resposta.to_dict(), separators=(",", ":")),
+                "sketch_resolucao": json.dumps(resolucao.to_dict(), separators=(",", ":")),
+                "atualizado_em": agora,
+            }
+            for (semana, prioridade, unidade), (total, resposta, resolucao) in sketches.items()
+        ]
+        for offset in range(0, len(linhas), batch_size):
+            db.execute(SLAPercentileWeekly.__table__.insert(), linhas[offset:offset + batch_size])
+        linhas_registro = [
+            {
+                "chamado_id": chamado_id,
+                "semana": semana,
+                "prioridade": prioridade,
+                "unidade": unidade,
+                "horas_resposta": resposta,
+                "horas_resolucao": resolucao,
+                "atualizado_em": agora,
+            }
+            for chamado_id, (semana, prioridade, unidade), resposta, resolucao in registros
+        ]
+        for offset in range(0, len(linhas_registro), batch_size):
+            db.execute(SLAPercentileContribution.__table__.insert(), linhas_registro[offset:offset + batch_size])
+        db.commit()
+        return len(linhas)
+
+    @staticmethod
+    def is_empty(db: Session) -> bool:
+        """Sem registros de contribuição (sketches vazios ou anteriores ao registro por chamado)"""
+        SLAPercentiles.ensure_table()
+        return db.query(SLAPercentileContribution.chamado_id).first() is None
+
+    @staticmethod
+    def _resumo(sketch: DDSketch) -> dict:
+        resumo = {
+            nome: round(sketch.quantile(q), 2) if sketch.count else None
+            for nome, q in SLAPercentiles.QUANTIS.items()
+        }
+        resumo["amostras"] = sketch.count
+        return resumo
+
+    @staticmethod
+    def serie(
+        db: Session,
+        semanas: int = SEMANAS_PADRAO,
+        agrupar: str = "prioridade",
+        prioridade: str | None = None,
+        unidade: str | None = None,
+    ) -> dict:
+        """
+        Série semanal de P50/P90/P99 (horas úteis) por grupo.
+
+        Args:
+            semanas: quantidade de semanas (inclui a semana corrente)
+            agrupar: "prioridade", "unidade" ou "nenhum"
+            prioridade / unidade: filtros opcionais
+
+        Returns:
+            {"semanas": [...], "grupos": {grupo: [{"semana", "total", "resposta", "resolucao"}]}}
+        """
+        from ti.services.data_version import DataVersion
+
+        if agrupar not in SLAPercentiles.AGRUPAMENTOS:
+            raise ValueError(f"Agrupamento inválido: {agrupar}")
+
+        chave = (semanas, agrupar, prioridade, unidade)
+        versao = DataVersion.current()
+        with SLAPercentiles._cache_lock:
+            em_cache = SLAPercentiles._cache.get(chave)
+        if (
+            em_cache is not None
+            and em_cache[0] == versao
+            and time.monotonic() - em_cache[1] < SLAPercentiles.CACHE_TTL
+        ):
+            return em_cache[2]
+
+        resultado = SLAPercentiles._montar_serie(db, semanas, agrupar, prioridade, unidade)
+        with SLAPercentiles._cache_lock:
+            if len(SLAPercentiles._cache) >= SLAPercentiles.CACHE_MAX:
+                SLAPercentiles._cache.clear()
+            SLAPercentiles._cache[chave] = (versao, time.monotonic(), resultado)
+        return resultado
+
+    @staticmethod
+    def _montar_serie(
+        db: Session,
+        semanas: int,
+        agrupar: str,
+        prioridade: str | None,
+        unidade: str | None,
+    ) -> dict:
+        SLAPercentiles.ensure_table()
+
+        inicio = SLAPercentiles.semana(now_brazil_naive()) - timedelta(weeks=semanas - 1)
+        filtros = [SLAPercentileWeekly.semana >= inicio]
+        if prioridade:
+            filtros.append(SLAPercentileWeekly.prioridade == prioridade)
+        if unidade:
+            filtros.append(SLAPercentileWeekly.unidade == unidade)
+
+        rows = db.query(
+            SLAPercentileWeekly.semana,
+            SLAPercentileWeekly.prioridade,
+            SLAPercentileWeekly.unidade,
+            SLAPercentileWeekly.total,
+            SLAPercentileWeekly.sketch_resposta,
+            SLAPercentileWeekly.sketch_resolucao,
+        ).filter(and_(*filtros)).all()
+
+        mesclados: dict[tuple[str, date], list] = {}
+        for semana, prio, unid, total, resposta, resolucao in rows:
+            grupo = {"prioridade": prio, "unidade": unid, "nenhum": "todos"}[agrupar]
+            item = mesclados.setdefault((grupo, semana), [0, DDSketch(), DDSketch()])
+            item[0] += total or 0
+            item[1].merge_dict(json.loads(resposta or "{}"))
+            item[2].merge_dict(json.loads(resolucao or "{}"))
+
+        todas_semanas = [inicio + timedelta(weeks=i) for i in range(semanas)]
+        grupos: dict[str, list] = {}
+        for grupo in sorted({grupo for grupo, _ in mesclados}):
+            pontos = []
+            for semana in todas_semanas:
+                total, resposta, resolucao = mesclados.get((grupo, semana), (0, DDSketch(), DDSketch()))
+                pontos.append({
+                    "semana": semana.isoformat(),
+                    "total": total,
+                    "resposta": SLAPercentiles._resumo(resposta),
+                    "resolucao": SLAPercentiles._resumo(resolucao),
+                })
+            grupos[grupo] = pontos
+
+        return {
+            "semanas": [semana.isoformat() for semana in todas_semanas],
+            "agrupar": agrupar,
+            "grupos": grupos,
+        }
@@ -4,6 +4,7 @@ Sistema de agendamento para recalcular SLA automaticamente.
 Características:
 - Roda automaticamente todos os dias às 00:00 (horário de Brasília)
 - Atualiza cache de métricas
+- Grava a foto horária do dashboard (DashboardHistory)
 - Registra logs de execução
 - Thread-safe
 
@@ -66,11 +67,17 @@ class SLAScheduler:
         import time
 
         last_execution_date = None
+        last_snapshot_hour = None
 
         while self.running:
             try:
                 agora = now_brazil_naive()
 
+                # Foto horária do dashboard (na primeira verificação de cada hora)
+                hora_atual = agora.replace(minute=0, second=0, microsecond=0)
+                if last_snapshot_hour != hora_atual and self._snapshot_dashboard():
+                    last_snapshot_hour = hora_atual
+
                 # Verifica se é um novo dia
                 if last_execution_date != agora.date():
                     # Verifica se chegou no horário agendado
@@ -108,6 +115,11 @@ class SLAScheduler:
                 f"Tempo médio de resolução: {stats['tempo_medio_resolucao_horas']:.2f}h"
             )
 
+            # Recalcula prazos de SLA (reflete mudanças de horários e feriados)
+            from ti.services.sla_deadlines import SLADeadlines
+            total_prazos = SLADeadlines.recalcular_abertos(db)
+            logger.info(f"✅ Prazos de SLA recalculados para {total_prazos} chamados em aberto")
+
             # Também aquece o cache com as métricas principais
             self._warmup_cache(db)
 
@@ -119,6 +131,20 @@ class SLAScheduler:
         finally:
             db.close()
 
+    def _snapshot_dashboard(self) -> bool:
+        """Grava a foto da hora corrente do dashboard; False para tentar de novo"""
+        db = SessionLocal()
+        try:
+            from ti.services.dashboard_history import DashboardHistory
+
+            return DashboardHistory.capturar(db) is not None
+        except Exception as e:
+            logger.warning(f"Erro ao gravar foto horária do dashboard: {e}")
+            db.rollback()
+            return False
+        finally:
+            db.close()
+
     def _warmup_cache(self, db: Session):
         """Pré-aquece o cache com métricas principais"""
         try: